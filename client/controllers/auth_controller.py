@@ -21,14 +21,15 @@ class AuthController:
     Tất cả auth được xử lý bởi server
     """
 
-    def __init__(self, host_address='localhost', host_port=65432):
+    def __init__(self, host_address='localhost', host_port=65432, session=None):
         """Khởi tạo với server info
         
         Args:
             host_address: Địa chỉ server
             host_port: Port server
+            session: SessionClient dùng chung (None: mỗi request 1 socket tạm)
         """
-        self.auth_client = AuthClient(host_address, host_port)
+        self.auth_client = AuthClient(host_address, host_port, session)
 
     def login(self, username, password):
         """Xác thực đăng nhập qua server
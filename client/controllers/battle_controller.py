@@ -6,6 +6,7 @@ import tkinter as tk
 from tkinter import messagebox
 import threading
 from networking.room_client import RoomClient
+from networking.network import SHIPS_NAMES, decode_fleet
 from views.battle_view import BattleView
 from views.opponent_info_view import show_opponent_info
 
@@ -29,7 +30,7 @@ class BattleController:
        - process_events() → handle_event() → update()
        - Nếu my_turn: click chuột → attack_cell() → gửi server
        - Server trả về hit/miss → update lưới
-       - Sync game_data từ server mỗi frame
+       - Xử lý event server push (không polling): turn_change, attack_result, ship_sunk, winner
        - Kiểm tra winner → hiển game_over_message 2s → kết thúc
     3. Return states để chuyển sang BattleStatsView
     
@@ -127,6 +128,11 @@ class BattleController:
         # Flag ngăn gọi ship_sinked nhiều lần
         self.game_ended = False
         
+        # Kết quả từ event server push
+        self.winner_name = None  # Tên người thắng (event 'winner')
+        self.opponent_left = False  # Đối thủ đã rời phòng (event 'opponent_left')
+        self.attack_pending = False  # Đã gửi attack_tile, đang chờ response
+        
         # Thống kê trận đấu
         self.my_hits_count = 0  # Số lần tôi bắn trúng
         self.my_misses_count = 0  # Số lần tôi bắn trượt
@@ -148,10 +154,19 @@ class BattleController:
         - client: Để gửi/nhận dữ liệu qua socket
         - my_username: Tên đăng nhập
         - my_user_id: ID người dùng (cho database)
+        
+        Bật chế độ pipelined của client: từ đây mọi response/event do thread nền nhận,
+        vòng lặp pygame chỉ lấy ra trong update() nên không bao giờ chờ mạng
         """
         self.client = client
         self.my_username = client.username
         self.my_user_id = client.user_id
+        client.start_receiver()
+        
+        # Đăng ký nhận event push, khởi tạo lượt/đối thủ từ snapshot
+        snapshot = client.subscribe_events()
+        if snapshot:
+            self._apply_snapshot(snapshot)
     
     def load_my_grid(self, grid):
         """Tải lưới tàu của người chơi (10x10)
@@ -169,6 +184,25 @@ class BattleController:
         self.my_grid = grid
         self.my_ship_positions = self._find_ship_positions(grid)  # Tìm vị trí tất cả tàu
     
+    def load_my_fleet(self, fleet):
+        """Tải hạm đội dạng gọn (cùng định dạng gửi lên server)
+        
+        Args:
+            fleet: List theo thứ tự SHIPS_NAMES, mỗi tàu = [col, row, vertical, length]
+        
+        Xử lý:
+        - my_grid dựng lại từ fleet (chỉ dùng để vẽ)
+        - my_ship_positions lấy thẳng từ fleet, không cần quét lưới
+        """
+        self.my_grid = decode_fleet(fleet)
+        self.my_ship_positions = {}
+        for ship_name, ship in zip(SHIPS_NAMES, fleet):
+            if ship is None:
+                continue
+            col, row, vertical, length = ship
+            cells = [(row + i, col) if vertical else (row, col + i) for i in range(length)]
+            self.my_ship_positions[ship_name] = [{'cells': cells, 'horizontal': not vertical}]
+    
     def _find_ship_positions(self, grid):
         """Tìm vị trí và hướng của tất cả tàu trên lưới
         
@@ -280,15 +314,12 @@ class BattleController:
              * Tăng my_timeout_count
              * Nếu >= 3 lần → thua game
              * Chuyển lượt đối thủ
-        4. Sync với server:
+        4. Sync với server (chỉ đọc event đã được push, trận đấu đứng yên = 0 traffic):
+           - turn_change → cập nhật my_turn, timeout_count, reset timer
+           - attack_result của đối thủ → đánh dấu my_hits, thống kê, kiểm tra tàu chìm
+           - ship_sunk → thông báo tàu của tôi chìm
            - CHECK WINNER FIRST (quan trọng nhất)
-           - Lấy game_data (turn, timeout_count, enemy_username)
            - Kiểm tra đối thủ disconnect
-           - Cập nhật my_turn, reset timer khi chuyển lượt
-           - Kiểm tra enemy_attacks → đánh dấu my_hits
-           - Cập nhật enemy statistics
-           - Kiểm tra tàu của tôi chìm
-           - Xử lý ship_sunk notification từ server
         
         Returns:
             True: Game kết thúc (có winner hoặc timeout 3 lần)
@@ -321,7 +352,7 @@ class BattleController:
                 print("[CONTROLLER] Hết giờ! Kết thúc lượt")
                 if self.client:
                     try:
-                        self.client.send_data_to_server({'request': 'timeout'})  # Gửi timeout lên server
+                        self.client.send_request({'request': 'timeout'})  # Gửi timeout lên server (không chờ)
                     except:
                         pass
                 
@@ -347,150 +378,195 @@ class BattleController:
                 self.turn_transition_message = "⏳ OPPONENT'S TURN"
                 self.turn_transition_timer = pygame.time.get_ticks()
         
-        # Sync with server
+        # Sync with server: chỉ xử lý event server push tới (và chạy callback của response đã về)
         if self.client:
             try:
+                for event in self.client.poll_events():
+                    self._apply_event(event)
+                
                 # CHECK WINNER FIRST - This is the most important check
-                # Must check before anything else to catch opponent quit immediately
-                winner = self.client.get_winner()
-                if winner:
-                    if not self.game_over_message:
-                        if winner == self.client.username:
-                            self.game_over_message = "YOU WON!"
-                            print(f"[CONTROLLER] ========================================")
-                            print(f"[CONTROLLER] YOU WON! Winner from server: {winner}")
-                            print(f"[CONTROLLER] ========================================")
-                        else:
-                            self.game_over_message = "YOU LOST!"
-                            print(f"[CONTROLLER] ========================================")
-                            print(f"[CONTROLLER] YOU LOST! Winner from server: {winner}")
-                            print(f"[CONTROLLER] ========================================")
-                        self.game_over_timer = pygame.time.get_ticks()
+                if self.winner_name:
+                    self._show_winner_message(self.winner_name)
                     return True  # Game finished
                 
-                game_data = self.client.get_game_data()
-                
-                # Check opponent disconnect
-                if game_data is None or len(game_data) < 2:
+                # Check opponent disconnect (hoặc mất kết nối tới server)
+                if self.opponent_left or self.client.is_disconnected:
                     if not self.game_over_message:
                         self.game_over_message = "YOU WON!"
                         print("[CONTROLLER] Opponent disconnected - You win!")
                     return True  # Game finished
                 
-                if game_data:
-                    username = self.client.username
-                    if username in game_data:
-                        new_turn = game_data[username]['my_turn']
-                        
-                        # Update timeout counts
-                        self.my_timeout_count = game_data[username].get('timeout_count', 0)
-                        
-                        # Khởi tạo timer nếu chưa có (lần đầu vào game)
-                        if self.turn_start_time == 0:
-                            self.turn_start_time = pygame.time.get_ticks()
-                            self.time_remaining = 30
-                            print("[CONTROLLER] Khởi tạo timer lần đầu")
-                        
-                        # Update turn
-                        if new_turn != self.my_turn:
-                            self.my_turn = new_turn
-                            # Reset timer khi chuyển lượt
-                            self.turn_start_time = pygame.time.get_ticks()
-                            self.time_remaining = 30
-                            if self.my_turn:
-                                # Show turn transition
-                                self.turn_transition_message = "➡️ YOUR TURN!"
-                                self.turn_transition_timer = pygame.time.get_ticks()
-                            else:
-                                # Show opponent turn transition
-                                self.turn_transition_message = "⏳ OPPONENT'S TURN"
-                                self.turn_transition_timer = pygame.time.get_ticks()
-                        
-                        # Get enemy info
-                        for player_name in game_data.keys():
-                            if player_name != username:
-                                self.enemy_username = player_name
-                                self.enemy_timeout_count = game_data[player_name].get('timeout_count', 0)
-                                break
-                        
-                        # Check if anyone has 3 timeouts (game over condition)
-                        if self.my_timeout_count >= 3:
-                            if not self.game_over_message:
-                                print("[CONTROLLER] 3 timeouts! You lose.")
-                                self.game_over_message = "YOU LOST!"
-                                self.game_over_timer = pygame.time.get_ticks()
-                                self.game_ended = True  # Đánh dấu kết thúc
-                            
-                            # KHÔNG GỌI ship_sinked() - Server đã xử lý game_over rồi
-                            return True  # Game finished
-                        
-                        if self.enemy_timeout_count >= 3:
-                            if not self.game_over_message:
-                                print("[CONTROLLER] Opponent has 3 timeouts! You win.")
-                                self.game_over_message = "YOU WON!"
-                                self.game_over_timer = pygame.time.get_ticks()
-                                self.game_ended = True  # Đánh dấu kết thúc
-                            
-                            # KHÔNG GỌI ship_sinked() - Server đã xử lý game_over rồi
-                            return True  # Game finished
-                        
-                        # Check enemy attacks
-                        enemy_data = [v for k, v in game_data.items() if k != username]
-                        if enemy_data and enemy_data[0]['attacked_tile']['position']:
-                            pos = enemy_data[0]['attacked_tile']['position']
-                            col, row = pos
-                            
-                            # Check if this is a new attack (not already marked)
-                            if not self.my_hits[row][col]:
-                                self.my_hits[row][col] = True
-                                
-                                # IMPORTANT: Enemy just attacked, reset timer
-                                # This happens when it's opponent's turn and they make an attack
-                                if not self.my_turn:
-                                    self.turn_start_time = pygame.time.get_ticks()
-                                    self.time_remaining = 30
-                                    print("[CONTROLLER] Enemy attacked - timer reset to 30s")
-                                
-                                # Track enemy statistics
-                                is_hit = self.my_grid[row][col] is not None
-                                
-                                if is_hit:
-                                    self.enemy_hits_count += 1
-                                    self.enemy_current_streak += 1
-                                    if self.enemy_current_streak > self.enemy_max_streak:
-                                        self.enemy_max_streak = self.enemy_current_streak
-                                else:
-                                    self.enemy_misses_count += 1
-                                    self.enemy_current_streak = 0
-                                
-                                # Check if any of my ships got sunk
-                                self._check_my_sunk_ships()
+                # Check if anyone has 3 timeouts (game over condition)
+                if self.my_timeout_count >= 3:
+                    if not self.game_over_message:
+                        print("[CONTROLLER] 3 timeouts! You lose.")
+                        self.game_over_message = "YOU LOST!"
+                        self.game_over_timer = pygame.time.get_ticks()
+                        self.game_ended = True  # Đánh dấu kết thúc
+                    
+                    # KHÔNG GỌI ship_sinked() - Server đã xử lý game_over rồi
+                    return True  # Game finished
                 
-                # Check for ship sunk notifications from opponent
-                if 'ship_sunk' in game_data.get(username, {}):
-                    sunk_ship = game_data[username].get('ship_sunk')
-                    print(f"[CONTROLLER] Received ship_sunk notification: {sunk_ship}")
-                    print(f"[CONTROLLER] Already sunk: {self.my_sunk_ships}")
-                    if sunk_ship and sunk_ship not in self.my_sunk_ships:
-                        # Show notification that our ship was sunk
-                        self.ship_sunk_message = f"YOUR {sunk_ship.upper()} SUNK!"
-                        self.ship_sunk_timer = pygame.time.get_ticks()
-                        self.my_sunk_ships.add(sunk_ship)
-                        self.ships_sunk += 1  # Cập nhật số tàu bị chìm
-                        print(f"[CONTROLLER] My ship sunk: {sunk_ship} ({self.ships_sunk}/5)")
-                        
-                        # Clear notification on server to prevent re-processing
-                        try:
-                            self.client.send_data_to_server({'request': 'clear_ship_sunk'})
-                            print(f"[CONTROLLER] Sent clear_ship_sunk request")
-                        except Exception as e:
-                            print(f"[CONTROLLER] Failed to clear ship_sunk: {e}")
+                if self.enemy_timeout_count >= 3:
+                    if not self.game_over_message:
+                        print("[CONTROLLER] Opponent has 3 timeouts! You win.")
+                        self.game_over_message = "YOU WON!"
+                        self.game_over_timer = pygame.time.get_ticks()
+                        self.game_ended = True  # Đánh dấu kết thúc
+                    
+                    # KHÔNG GỌI ship_sinked() - Server đã xử lý game_over rồi
+                    return True  # Game finished
                     
             except Exception as e:
                 print(f"[CONTROLLER] Error: {e}")
         
         return False  # Game continues
     
+    def _apply_snapshot(self, snapshot):
+        """Khởi tạo trạng thái từ snapshot trả về khi subscribe_events
+        
+        Args:
+            snapshot: {'players': {username: {my_turn, timeout_count, ...}}, 'winner': ...}
+        """
+        players = snapshot.get('players') or {}
+        for player_name, player_data in players.items():
+            if player_name != self.my_username:
+                self.enemy_username = player_name
+                self.enemy_timeout_count = player_data.get('timeout_count', 0)
+        
+        if self.my_username in players:
+            self.my_timeout_count = players[self.my_username].get('timeout_count', 0)
+            self._set_turn(players[self.my_username]['my_turn'])
+        
+        if len(players) < 2:
+            self.opponent_left = True
+        self.winner_name = snapshot.get('winner')
+    
+    def _apply_event(self, event):
+        """Xử lý 1 event server push
+        
+        Event:
+        - turn_change: {'turn': username, 'timeout_counts': {...}} → đổi lượt, reset timer
+        - attack_result: {'attacker', 'position', 'ship_name'} → đối thủ vừa bắn tôi
+        - ship_sunk: {'owner', 'ship_name'} → tàu của tôi bị chìm
+        - winner: {'winner'} → kết thúc game
+        - opponent_left: {'username'} → đối thủ thoát
+        """
+        event_type = event.get('event')
+        
+        if event_type == 'turn_change':
+            timeout_counts = event.get('timeout_counts', {})
+            self.my_timeout_count = timeout_counts.get(self.my_username, self.my_timeout_count)
+            for player_name, count in timeout_counts.items():
+                if player_name != self.my_username:
+                    self.enemy_username = player_name
+                    self.enemy_timeout_count = count
+            self._set_turn(event.get('turn') == self.my_username)
+        
+        elif event_type == 'attack_result':
+            # Kết quả phát bắn của chính tôi đã xử lý trong attack_cell()
+            if event.get('attacker') != self.my_username:
+                self._on_enemy_attack(event['position'])
+        
+        elif event_type == 'ship_sunk':
+            if event.get('owner') == self.my_username:
+                self._on_my_ship_sunk(event.get('ship_name'))
+        
+        elif event_type == 'winner':
+            self.winner_name = event.get('winner')
+        
+        elif event_type == 'opponent_left':
+            if event.get('username') != self.my_username:
+                self.opponent_left = True
+    
+    def _set_turn(self, new_turn):
+        """Cập nhật lượt chơi, reset timer và hiện hiệu ứng khi chuyển lượt"""
+        # Khởi tạo timer nếu chưa có (lần đầu vào game)
+        if self.turn_start_time == 0:
+            self.turn_start_time = pygame.time.get_ticks()
+            self.time_remaining = 30
+            print("[CONTROLLER] Khởi tạo timer lần đầu")
+        
+        if new_turn != self.my_turn:
+            self.my_turn = new_turn
+            # Reset timer khi chuyển lượt
+            self.turn_start_time = pygame.time.get_ticks()
+            self.time_remaining = 30
+            if self.my_turn:
+                # Show turn transition
+                self.turn_transition_message = "➡️ YOUR TURN!"
+                self.turn_transition_timer = pygame.time.get_ticks()
+            else:
+                # Show opponent turn transition
+                self.turn_transition_message = "⏳ OPPONENT'S TURN"
+                self.turn_transition_timer = pygame.time.get_ticks()
+    
+    def _on_enemy_attack(self, position):
+        """Đối thủ vừa bắn vào ô position (col, row) trên lưới của tôi"""
+        col, row = position
+        
+        # Check if this is a new attack (not already marked)
+        if self.my_hits[row][col]:
+            return
+        self.my_hits[row][col] = True
+        
+        # IMPORTANT: Enemy just attacked, reset timer
+        # This happens when it's opponent's turn and they make an attack
+        if not self.my_turn:
+            self.turn_start_time = pygame.time.get_ticks()
+            self.time_remaining = 30
+            print("[CONTROLLER] Enemy attacked - timer reset to 30s")
+        
+        # Track enemy statistics
+        is_hit = self.my_grid[row][col] is not None
+        
+        if is_hit:
+            self.enemy_hits_count += 1
+            self.enemy_current_streak += 1
+            if self.enemy_current_streak > self.enemy_max_streak:
+                self.enemy_max_streak = self.enemy_current_streak
+        else:
+            self.enemy_misses_count += 1
+            self.enemy_current_streak = 0
+        
+        # Check if any of my ships got sunk
+        self._check_my_sunk_ships()
+    
+    def _on_my_ship_sunk(self, sunk_ship):
+        """Server báo tàu của tôi đã chìm"""
+        print(f"[CONTROLLER] Received ship_sunk notification: {sunk_ship}")
+        if sunk_ship and sunk_ship not in self.my_sunk_ships:
+            # Show notification that our ship was sunk
+            self.ship_sunk_message = f"YOUR {sunk_ship.upper()} SUNK!"
+            self.ship_sunk_timer = pygame.time.get_ticks()
+            self.my_sunk_ships.add(sunk_ship)
+            self.ships_sunk += 1  # Cập nhật số tàu bị chìm
+            print(f"[CONTROLLER] My ship sunk: {sunk_ship} ({self.ships_sunk}/5)")
+    
+    def _show_winner_message(self, winner):
+        """Hiện "YOU WON!" / "YOU LOST!" theo winner server gửi"""
+        if self.game_over_message:
+            return
+        if winner == self.my_username:
+            self.game_over_message = "YOU WON!"
+            print(f"[CONTROLLER] ========================================")
+            print(f"[CONTROLLER] YOU WON! Winner from server: {winner}")
+            print(f"[CONTROLLER] ========================================")
+        else:
+            self.game_over_message = "YOU LOST!"
+            print(f"[CONTROLLER] ========================================")
+            print(f"[CONTROLLER] YOU LOST! Winner from server: {winner}")
+            print(f"[CONTROLLER] ========================================")
+        self.game_over_timer = pygame.time.get_ticks()
+    
+    def _final_winner(self):
+        """Winner cuối cùng: từ event đã nhận, hỏi server nếu chưa có"""
+        if not self.client:
+            return self.winner_name
+        for event in self.client.poll_events():
+            self._apply_event(event)
+        return self.winner_name or self.client.get_winner()
+    
     def handle_event(self, event):
         """Handle pygame events"""
         if event.type == pygame.QUIT:
@@ -547,30 +623,10 @@ class BattleController:
         root.destroy()
         
         if result:  # User clicked Yes
-            print("[CONTROLLER] Player quit - saving loss to database")
+            print("[CONTROLLER] Player quit - notifying server")
             if self.client:
                 try:
-                    # Save game result as loss
-                    opponent_username = self.enemy_username or 'Unknown'
-                    
-                    save_request = {
-                        'request': 'save_game_history',
-                        'opponent_username': opponent_username,
-                        'result': 'lose',
-                        'ships_sunk': self.enemy_ships_sunk,
-                        'hits': self.total_hits,
-                        'misses': self.total_misses,
-                        'accuracy': (self.total_hits / (self.total_hits + self.total_misses) * 100) if (self.total_hits + self.total_misses) > 0 else 0,
-                        'max_streak': self.max_streak
-                    }
-                    
-                    try:
-                        self.client.send_data_to_server(save_request)
-                        print(f"[CONTROLLER] ✓ Game history save request sent!")
-                    except Exception as e:
-                        print(f"[CONTROLLER] Error sending save request: {e}")
-                    
-                    # Notify server that player quit
+                    # Notify server that player quit (server ghi lịch sử trận)
                     try:
                         quit_notification = {'request': 'player_quit'}
                         response = self.client.send_data_to_server(quit_notification)
@@ -663,7 +719,7 @@ class BattleController:
         """Handle attack on enemy grid"""
         cell = self.get_clicked_cell(mouse_pos, (430, 170))
         
-        if cell and not self.enemy_hits[cell[1]][cell[0]]:
+        if cell and not self.enemy_hits[cell[1]][cell[0]] and not self.attack_pending:
             self.attack_cell(cell)
         
         return None
@@ -699,121 +755,105 @@ class BattleController:
             cell: (col, row) - Tọa độ ô muốn bắn
         
         Luồng:
-        1. Gửi request 'attack_tile' + position đến server
-        2. Server kiểm tra lưới đối thủ
-        3. Nhận response:
-           - ship_name khác rỗng → TRÚNG:
-             * Lưu tên tàu vào enemy_grid[row][col]
-             * Gọi check_ship_sunk() kiểm tra chìm
-             * Tăng my_hits_count, my_current_streak
-             * Cập nhật my_max_streak
-             * Reset timer (tiếp tục lượt)
-           - ship_name rỗng → TRƯỢT:
-             * Lưu None vào enemy_grid[row][col]
-             * Tăng my_misses_count
-             * Reset streak = 0
-             * Chuyển lượt (server tự động xử lý)
-        4. Đánh dấu enemy_hits[row][col] = True
+        1. Gửi request 'attack_tile' + position đến server (không chờ response)
+        2. Đánh dấu enemy_hits[row][col] = True, khóa bắn tiếp tới khi có kết quả
+        3. Response về → _on_attack_result() chạy trong update() của frame sau
         """
         col, row = cell
         
         if self.client:
-            try:
-                ship_name = self.client.attack_enemy_tile((col, row))
-                
-                print(f"[CONTROLLER] Attacked ({col}, {row}) -> '{ship_name}'")
-                
-                self.enemy_hits[row][col] = True
+            self.enemy_hits[row][col] = True
+            self.attack_pending = True
+            self.client.send_request(
+                {'request': 'attack_tile', 'position': (col, row)},
+                lambda response: self._on_attack_result(cell, response)
+            )
+    
+    def _on_attack_result(self, cell, response):
+        """Xử lý kết quả bắn từ server
+        
+        Args:
+            cell: (col, row) đã bắn
+            response: {'attacked': ship_name, 'sunk': bool, 'game_over': bool}
+                hoặc None nếu mất kết nối (winner đến qua event 'winner')
+        
+        Kết quả:
+        - ship_name khác rỗng → TRÚNG:
+          * Lưu tên tàu vào enemy_grid[row][col]
+          * Gọi check_ship_sunk() với cờ sunk của server
+          * Tăng my_hits_count, my_current_streak
+          * Cập nhật my_max_streak
+          * Reset timer (tiếp tục lượt)
+        - ship_name rỗng → TRƯỢT:
+          * Lưu None vào enemy_grid[row][col]
+          * Tăng my_misses_count
+          * Reset streak = 0
+          * Chuyển lượt (server tự động xử lý)
+        """
+        col, row = cell
+        self.attack_pending = False
+        
+        if response is None:
+            # Không có kết quả → cho phép bắn lại ô này
+            self.enemy_hits[row][col] = False
+            return
+        
+        try:
+            ship_name = response.get('attacked')
+            
+            print(f"[CONTROLLER] Attacked ({col}, {row}) -> '{ship_name}'")
+            
+            is_hit = ship_name is not None and ship_name != '' and ship_name.strip() != ''
+            
+            if is_hit:
+                print(f"[CONTROLLER] HIT! Ship: '{ship_name}'")
+                self.enemy_grid[row][col] = ship_name
+                self.check_ship_sunk(ship_name, response.get('sunk', False))
                 
-                is_hit = ship_name is not None and ship_name != '' and ship_name.strip() != ''
+                # Update hit statistics
+                self.my_hits_count += 1
+                self.my_current_streak += 1
+                if self.my_current_streak > self.my_max_streak:
+                    self.my_max_streak = self.my_current_streak
                 
-                if is_hit:
-                    print(f"[CONTROLLER] HIT! Ship: '{ship_name}'")
-                    self.enemy_grid[row][col] = ship_name
-                    self.check_ship_sunk(ship_name)
-                    
-                    # Update hit statistics
-                    self.my_hits_count += 1
-                    self.my_current_streak += 1
-                    if self.my_current_streak > self.my_max_streak:
-                        self.my_max_streak = self.my_current_streak
-                    
-                    # Reset timer for next shot
-                    self.turn_start_time = pygame.time.get_ticks()
-                    self.time_remaining = 30
-                else:
-                    print(f"[CONTROLLER] MISS!")
-                    self.enemy_grid[row][col] = None
-                    
-                    # Update miss statistics
-                    self.my_misses_count += 1
-                    self.my_current_streak = 0
+                # Reset timer for next shot
+                self.turn_start_time = pygame.time.get_ticks()
+                self.time_remaining = 30
+            else:
+                print(f"[CONTROLLER] MISS!")
+                self.enemy_grid[row][col] = None
                 
-            except Exception as e:
-                print(f"[CONTROLLER] Attack error: {e}")
+                # Update miss statistics
+                self.my_misses_count += 1
+                self.my_current_streak = 0
+            
+        except Exception as e:
+            print(f"[CONTROLLER] Attack error: {e}")
     
-    def check_ship_sunk(self, ship_name):
-        """Kiểm tra tàu địch có chìm hoàn toàn không
+    def check_ship_sunk(self, ship_name, sunk):
+        """Ghi nhận tàu địch vừa chìm
         
         Args:
             ship_name: Tên tàu vừa bắn trúng ('battleship', 'cruiser', ...)
+            sunk: Cờ 'sunk' server trả về trong response attack_tile
         
-        Logic:
-        1. Lấy kích thước tàu từ ship_sizes dict
-        2. Đếm số ô của tàu này đã bị bắn (enemy_hits = True)
-        3. Nếu hits >= kích thước tàu:
-           - Thêm vào enemy_sunk_ships
-           - Tăng enemy_ships_sunk
-           - Hiển thông báo ship_sunk_message
-           - Gửi 'ship_sunk_notification' lên server
-           - Gọi ship_sinked() đến server
-        4. Nếu chìm hết 5 tàu → thắng game
-        
-        Ship sizes:
-        - battleship: 5 ô
-        - cruiser: 4 ô
-        - destroyer1, destroyer2: 3 ô
-        - plane: 2 ô
+        Server tự kiểm tra chìm bằng bitboard và tự đếm sinked_ships / game over,
+        nên client chỉ cập nhật hiển thị, không gửi thêm request nào:
+        - Thêm vào enemy_sunk_ships
+        - Tăng enemy_ships_sunk
+        - Hiển thông báo ship_sunk_message
         """
-        ship_sizes = {
-            'battleship': 5, 
-            'cruiser': 4, 
-            'destroyer1': 3, 
-            'destroyer2': 3, 
-            'plane': 2
-        }
-        
-        if ship_name in ship_sizes and ship_name not in self.enemy_sunk_ships:
-            hits = 0
-            for row in range(10):
-                for col in range(10):
-                    if self.enemy_grid[row][col] == ship_name and self.enemy_hits[row][col]:
-                        hits += 1
+        if sunk and ship_name not in self.enemy_sunk_ships:
+            print(f"[CONTROLLER] {ship_name} SUNK!")
+            self.enemy_sunk_ships.add(ship_name)
+            self.enemy_ships_sunk += 1
             
-            print(f"[CONTROLLER] {ship_name}: {hits}/{ship_sizes[ship_name]} hits")
+            # Show ship sunk notification
+            self.ship_sunk_message = f"{ship_name.upper()} SUNK!"
+            self.ship_sunk_timer = pygame.time.get_ticks()
             
-            if hits >= ship_sizes[ship_name]:
-                print(f"[CONTROLLER] {ship_name} SUNK!")
-                self.enemy_sunk_ships.add(ship_name)
-                self.enemy_ships_sunk += 1
-                
-                # Show ship sunk notification
-                self.ship_sunk_message = f"{ship_name.upper()} SUNK!"
-                self.ship_sunk_timer = pygame.time.get_ticks()
-                
-                if self.client:
-                    # Notify server about ship sunk (will sync to both players)
-                    try:
-                        self.client.send_data_to_server({
-                            'request': 'ship_sunk_notification',
-                            'ship_name': ship_name
-                        })
-                    except:
-                        pass
-                    self.client.ship_sinked()
-                
-                if self.enemy_ships_sunk >= self.total_ships:
-                    print("[CONTROLLER] ALL ENEMY SHIPS SUNK! YOU WIN!")
+            if self.enemy_ships_sunk >= self.total_ships:
+                print("[CONTROLLER] ALL ENEMY SHIPS SUNK! YOU WIN!")
     
     def draw(self, window: pygame.display):
         """Draw battle screen using view"""
@@ -828,29 +868,9 @@ class BattleController:
             
             if result == 'force_quit':
                 # Force quit - same as normal quit but without confirmation
-                print("[CONTROLLER] Force quit - saving loss and disconnecting")
+                print("[CONTROLLER] Force quit - notifying server and disconnecting")
                 if self.client:
                     try:
-                        # Save game result as loss
-                        opponent_username = self.states.get('enemy_username', 'Unknown')
-                        
-                        save_request = {
-                            'request': 'save_game_history',
-                            'opponent_username': opponent_username,
-                            'result': 'lose',
-                            'ships_sunk': self.states.get('enemy_ships_sunk', 0),
-                            'hits': self.total_hits,
-                            'misses': self.total_misses,
-                            'accuracy': (self.total_hits / (self.total_hits + self.total_misses) * 100) if (self.total_hits + self.total_misses) > 0 else 0,
-                            'max_streak': self.max_streak
-                        }
-                        
-                        try:
-                            self.client.send_data_to_server(save_request)
-                            print(f"[CONTROLLER] ✓ Game history save request sent on force quit!")
-                        except Exception as e:
-                            print(f"[CONTROLLER] Error sending save request: {e}")
-                        
                         # IMPORTANT: Notify server that this player quit (opponent wins)
                         # WAIT for response to ensure server processed it
                         try:
@@ -893,7 +913,7 @@ class BattleController:
             if elapsed >= 2000:
                 print("[CONTROLLER] 2 seconds passed - setting game_finished flag")
                 self.states['game_finished'] = True
-                self.states['winner_name'] = self.client.get_winner() if self.client else None
+                self.states['winner_name'] = self._final_winner()
                 return self.states
             
             # Continue showing game over message overlay
@@ -906,7 +926,7 @@ class BattleController:
         if game_finished and not self.game_over_message:
             # Only for unexpected endings (like disconnect without message)
             self.states['game_finished'] = True
-            self.states['winner_name'] = self.client.get_winner() if self.client else None
+            self.states['winner_name'] = self._final_winner()
             return self.states
         
         return self.states
@@ -3,6 +3,7 @@ Main Controller - MVC Architecture (Client Side)
 Handles all business logic via networking - NO direct database access
 """
 from networking.room_client import RoomClient
+from networking.session_client import SessionClient
 from controllers.auth_controller import AuthController
 from data.user_session import UserSession
 
@@ -23,9 +24,14 @@ class MainController:
     
     Quản lý:
     - self.user: UserSession object (lưu local)
-    - self.lobby_client: Kết nối lobby server
-    - self.room_client: Kết nối room server
+    - self.session: 1 kết nối duy nhất tới server (kênh auth, lobby, room)
+    - self.lobby_client: Kênh lobby trên session
+    - self.room_client: Kênh room trên session
     - self.room: Phòng hiện tại
+    - self.room_list: {room_id: room} bản sao danh sách phòng, ghép dần từ event
+      của subscribe_rooms (room_list_version: version server của bản sao)
+    - self.room_status: Trạng thái phòng chờ, cập nhật từ event của subscribe_events
+      (room_status_pushed=False: server cũ, poll_room_status phải hỏi server)
     """
     
     def __init__(self):
@@ -36,13 +42,19 @@ class MainController:
         - lobby_client: None (chưa kết nối)
         - room_client: None (chưa vào phòng)
         - room: None (chưa có phòng)
-        - auth_controller: AuthController() (xử lý xác thực qua networking)
+        - session: SessionClient (mở kết nối ở request đầu tiên)
+        - auth_controller: AuthController() (xác thực qua kênh auth của session)
         """
         self.user = None
         self.lobby_client = None
         self.room_client = None
         self.room = None
-        self.auth_controller = AuthController()
+        self.room_list = {}
+        self.room_list_version = 0
+        self.room_status = None
+        self.room_status_pushed = False
+        self.session = SessionClient('localhost', 65432)
+        self.auth_controller = AuthController(session=self.session)
     
     # Authentication methods
     def login(self, username, password):
@@ -56,9 +68,11 @@ class MainController:
             Dict: {'success': True/False, 'message': ..., 'user': ...}
         
         Luồng:
-        1. Gửi auth request trực tiếp qua AuthClient
-        2. Nhận user data từ server
-        3. Kết nối lobby với user info
+        1. Gửi auth request qua kênh auth của session
+        2. Nhận user data và token từ server (server đã đưa session vào lobby)
+        3. Tạo lobby_client trên kênh lobby
+        
+        Token được session giữ lại: mất kết nối thì tự resume, không login lại
         """
         if not username or not password:
             return {'success': False, 'message': 'Please fill all fields'}
@@ -98,26 +112,24 @@ class MainController:
         """Xử lý đăng xuất (Client Side)
         
         Luồng:
-        1. Gửi logout request tới server (server sẽ set offline)
-        2. Ngắt kết nối lobby_client
+        1. Gửi logout request tới server (server set offline, thu hồi token, rời phòng và lobby)
+        2. Đóng kết nối session
         3. Xóa tất cả session data
         """
         # Gửi logout request tới server
-        if self.lobby_client and self.user:
+        if self.session.connected and self.user:
             try:
-                self.lobby_client.send_data_to_server({
+                self.session.request('auth', {
                     'action': 'auth:logout',
-                    'user_id': self.user.id if hasattr(self.user, 'id') else self.user['id']
+                    'user_id': self.user.id if hasattr(self.user, 'id') else self.user['id'],
+                    'token': self.session.token
                 })
             except Exception as e:
                 print(f"[CONTROLLER] Logout error: {e}")
         
-        # Ngắt kết nối
-        if self.lobby_client:
-            try:
-                self.lobby_client.disconnect()
-            except:
-                pass
+        # Ngắt kết nối (login sau sẽ tự mở lại)
+        self.session.token = None
+        self.session.close()
         
         self.lobby_client = None
         self.user = None
@@ -128,11 +140,10 @@ class MainController:
     def _connect_to_lobby(self):
         """Kết nối tới lobby server với authenticated user
         
-        Tạo RoomClient với:
+        Tạo RoomClient trên kênh lobby của session với:
         - username: Tên người dùng
         - user_id: ID người dùng
         - room_id: None (chưa vào phòng)
-        - host: localhost:65432
         
         Returns:
             True: Kết nối thành công
@@ -146,7 +157,8 @@ class MainController:
                 user_id=self.user.id if isinstance(self.user, UserSession) else self.user['id'],
                 room_id=None,
                 host_address='localhost',
-                host_port=65432
+                host_port=65432,
+                session=self.session
             )
             
             if self.lobby_client.connect_to_server():
@@ -164,10 +176,11 @@ class MainController:
         Args:
             room_id: ID của phòng muốn tham gia
         
-        Tạo RoomClient mới với:
+        Tạo RoomClient trên kênh room của session với:
         - username, user_id: Từ self.user
         - room_id: ID phòng
-        - host: localhost:65432
+        
+        Không mở socket mới: chỉ 1 request 'join_room' trên kết nối sẵn có
         
         Returns:
             True: Kết nối thành công
@@ -181,7 +194,8 @@ class MainController:
                 user_id=self.user['id'],
                 room_id=room_id,
                 host_address='localhost',
-                host_port=65432
+                host_port=65432,
+                session=self.session
             )
             
             if self.room_client.connect_to_server():
@@ -264,6 +278,89 @@ class MainController:
             print(f"[CONTROLLER] Error getting rooms: {e}")
             return {'success': False, 'message': str(e), 'rooms': []}
     
+    def subscribe_rooms(self):
+        """Đăng ký nhận thay đổi danh sách phòng (thay cho polling get_rooms)
+        
+        Returns:
+            Dict: {'success': True/False, 'rooms': [...], 'message': ...}
+            rooms là snapshot hiện tại, thay đổi sau đó lấy bằng poll_room_list()
+        
+        Server cũ không hỗ trợ subscribe_rooms → trả về kết quả get_rooms()
+        """
+        if not self.lobby_client:
+            return {'success': False, 'message': 'Not connected to server', 'rooms': []}
+        
+        try:
+            response = self.lobby_client.send_data_to_server({'request': 'subscribe_rooms'})
+            if not response or 'rooms' not in response:
+                return self.get_rooms()
+            self.room_list = {room['id']: room for room in response['rooms']}
+            self.room_list_version = response.get('version', 0)
+            return {'success': True, 'rooms': response['rooms']}
+        except Exception as e:
+            print(f"[CONTROLLER] Error subscribing rooms: {e}")
+            return {'success': False, 'message': str(e), 'rooms': []}
+    
+    def unsubscribe_rooms(self):
+        """Ngừng nhận thay đổi danh sách phòng (rời màn hình danh sách phòng)"""
+        self.room_list = {}
+        self.room_list_version = 0
+        if not self.lobby_client:
+            return
+        try:
+            self.lobby_client.send_request({'request': 'unsubscribe_rooms'})
+        except Exception as e:
+            print(f"[CONTROLLER] Error unsubscribing rooms: {e}")
+    
+    def poll_room_list(self):
+        """Lấy các thay đổi danh sách phòng server đã push (không gửi request)
+        
+        Returns:
+            Dict: {'events': List event (room_added / room_updated / room_removed),
+                   'rooms': None, hoặc cả danh sách nếu phải đồng bộ lại}
+        
+        Luồng:
+        1. Lấy event trong hàng đợi kênh lobby
+        2. Event có version <= version đã có → bỏ qua (đã nằm trong snapshot)
+        3. Event version + 1 → áp vào room_list
+        4. Nhảy version (mất event) → get_rooms lấy lại cả danh sách
+        """
+        result = {'events': [], 'rooms': None}
+        if not self.lobby_client:
+            return result
+        
+        resync = False
+        for event in self.lobby_client.poll_events():
+            if not isinstance(event, dict):
+                continue
+            kind = event.get('event')
+            if kind not in ('room_added', 'room_updated', 'room_removed'):
+                continue
+            version = event.get('version', 0)
+            if version <= self.room_list_version:
+                continue
+            if version != self.room_list_version + 1:
+                resync = True
+                continue
+            room = event['room']
+            if kind == 'room_removed':
+                self.room_list.pop(room['id'], None)
+            else:
+                self.room_list[room['id']] = room
+            self.room_list_version = version
+            result['events'].append(event)
+        
+        if resync:
+            try:
+                response = self.lobby_client.send_data_to_server({'request': 'get_rooms'})
+                if response and 'rooms' in response:
+                    self.room_list = {room['id']: room for room in response['rooms']}
+                    self.room_list_version = response.get('version', self.room_list_version)
+                    result = {'events': [], 'rooms': response['rooms']}
+            except Exception as e:
+                print(f"[CONTROLLER] Error resyncing rooms: {e}")
+        return result
+    
     def join_room(self, room_data):
         """Tham gia một phòng đã tồn tại
         
@@ -304,21 +401,99 @@ class MainController:
         
         self.room_client = None
         self.room = None
+        self.room_status = None
         return {'success': True}
     
+    def subscribe_room_events(self):
+        """Đăng ký nhận event của phòng chờ (thay cho polling get_room_status)
+        
+        Returns:
+            Dict: {'success': True/False, 'status': {player_count, game_status, game_started}}
+            Thay đổi sau đó lấy bằng poll_room_status()
+        
+        Server cũ không có event player_joined → dùng get_room_status()
+        """
+        if not self.room_client:
+            return {'success': False, 'message': 'Not in a room'}
+        
+        try:
+            self.room_client.start_receiver()
+            snapshot = self.room_client.subscribe_events()
+            if not snapshot or 'players' not in snapshot:
+                self.room_status_pushed = False
+                result = self.get_room_status()
+                self.room_status = result.get('status')
+                return result
+            self.room_status_pushed = True
+            self.room_status = self._room_status(len(snapshot['players']), snapshot.get('game_status'))
+            return {'success': True, 'status': self.room_status}
+        except Exception as e:
+            print(f"[CONTROLLER] Error subscribing room events: {e}")
+            return {'success': False, 'message': str(e)}
+    
+    def poll_room_status(self):
+        """Áp các event phòng chờ server đã push (không gửi request)
+        
+        Returns:
+            Dict: {'success': True, 'status': {...}, 'changed': True/False}
+            success=False nếu mất kết nối phòng
+        
+        Event: player_joined (player_count, game_status), opponent_left (player_count)
+        Server cũ (room_status_pushed=False): 1 request get_room_status mỗi lần gọi
+        """
+        if not self.room_client or self.room_client.is_disconnected:
+            return {'success': False, 'message': 'Room closed'}
+        
+        if not self.room_status_pushed:
+            result = self.get_room_status()
+            if result['success']:
+                changed = result['status'] != self.room_status
+                self.room_status = result['status']
+                result['changed'] = changed
+            return result
+        
+        changed = False
+        for event in self.room_client.poll_events():
+            if not isinstance(event, dict):
+                continue
+            kind = event.get('event')
+            if kind == 'player_joined':
+                self.room_status = self._room_status(event.get('player_count', 2),
+                                                     event.get('game_status'))
+                changed = True
+            elif kind == 'opponent_left' and 'player_count' in event:
+                self.room_status = self._room_status(event['player_count'],
+                                                     (self.room_status or {}).get('game_status'))
+                changed = True
+        return {'success': True, 'status': self.room_status, 'changed': changed}
+    
+    @staticmethod
+    def _room_status(player_count, game_status):
+        return {
+            'player_count': player_count,
+            'game_status': game_status,
+            'game_started': game_status == 'ship_lock'
+        }
+    
     def get_room_status(self):
-        """Get current room status"""
+        """Get current room status
+        
+        1 request 'game_data' theo version: thường chỉ nhận về not_modified
+        """
         if not self.room_client:
             return {'success': False, 'message': 'Not in a room'}
         
         try:
-            # Get player count
-            response = self.room_client.send_data_to_server({'request': 'game_data'})
-            player_count = len(response) if isinstance(response, dict) else 0
+            room_state = self.room_client.sync_room_state()
+            if room_state is None:
+                return {'success': False, 'message': 'Room closed'}
+            player_count = len(room_state['clients'])
             
-            # Get game status
-            status_response = self.room_client.send_data_to_server({'request': 'game_status'})
-            game_status = status_response.get('game_status', 'waiting')
+            game_status = room_state['game_status']
+            if game_status is None:
+                # Server cũ không gửi kèm status
+                status_response = self.room_client.send_data_to_server({'request': 'game_status'})
+                game_status = status_response.get('game_status', 'waiting')
             
             status = {
                 'player_count': player_count,
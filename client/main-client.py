@@ -4,8 +4,6 @@ Modern design with dark theme and better UX
 """
 import tkinter as tk
 from tkinter import messagebox
-import threading
-import time
 import pygame
 import subprocess
 import sys
@@ -24,6 +22,12 @@ from controllers.battle_controller import BattleController
 from views.battle_stats_view import BattleStatsView
 
 
+# Chu kỳ (ms) lấy event đã nhận từ hàng đợi của client (không gửi request)
+EVENT_DRAIN_INTERVAL = 200
+# Chu kỳ (ms) hỏi trạng thái phòng khi server cũ không push event phòng chờ
+LEGACY_POLL_INTERVAL = 1000
+
+
 class BattleshipApp:
     """Ứng dụng chính - Kiến trúc MVC
     
@@ -32,15 +36,17 @@ class BattleshipApp:
     - Kết nối Controller với View
     - Xử lý chuyển đổi giữa Tkinter UI và Pygame battle
     - Quản lý luồng game: đăng nhập → tạo/vào phòng → chiến đấu → thống kê
-    - Polling room status để phát hiện khi trận đấu bắt đầu
-    - Lưu lịch sử trận đấu vào database
+    - Nhận event push (danh sách phòng, người vào phòng chờ) thay vì polling:
+      Tk after() định kỳ lấy event đã có trong hàng đợi, không gửi request
+    - Hiển thị thống kê trận vừa chơi (lịch sử do server ghi)
     
     Thuộc tính:
     - root: Tkinter window chính
     - controller: MainController (MVC)
     - current_view: View hiện tại đang hiển thị
-    - lobby_poll_thread: Thread polling trạng thái phòng chờ
-    - lobby_poll_active: Flag điều khiển polling
+    - lobby_poll_job: after() id của vòng lấy event phòng chờ
+    - lobby_poll_active: Flag điều khiển vòng lấy event phòng chờ
+    - room_list_job: after() id của vòng lấy event danh sách phòng (None = không xem)
     """
     
     def __init__(self):
@@ -71,9 +77,10 @@ class BattleshipApp:
         # Current view
         self.current_view = None
         
-        # Room lobby polling
-        self.lobby_poll_thread = None
+        # Vòng lấy event (phòng chờ, danh sách phòng)
+        self.lobby_poll_job = None
         self.lobby_poll_active = False
+        self.room_list_job = None
         
         # Show login
         self.show_login()
@@ -219,7 +226,8 @@ class BattleshipApp:
         
         - Tạo RoomListView
         - Gán callback: refresh → _refresh_rooms, join → _handle_join_room, back → show_home
-        - Tự động refresh danh sách phòng lần đầu
+        - subscribe_rooms: lấy snapshot, sau đó server push từng thay đổi
+          (_drain_room_list áp vào view, không polling get_rooms)
         """
         self._destroy_current_view()
         
@@ -229,7 +237,27 @@ class BattleshipApp:
         view.on_back = self.show_home
         
         self.current_view = view
-        self._refresh_rooms(view)
+        result = self.controller.subscribe_rooms()
+        if result['success']:
+            view.update_rooms(result['rooms'])
+            self.room_list_job = self.root.after(EVENT_DRAIN_INTERVAL, self._drain_room_list, view)
+        else:
+            messagebox.showerror("Error", result['message'])
+    
+    def _drain_room_list(self, view):
+        """Áp các thay đổi danh sách phòng đã nhận vào view rồi hẹn lần sau
+        
+        Args:
+            view: RoomListView đang hiển thị
+        """
+        if self.current_view is not view:
+            return
+        changes = self.controller.poll_room_list()
+        if changes['rooms'] is not None:
+            view.update_rooms(changes['rooms'])
+        for event in changes['events']:
+            view.apply_room_event(event)
+        self.room_list_job = self.root.after(EVENT_DRAIN_INTERVAL, self._drain_room_list, view)
     
     def _refresh_rooms(self, view):
         """Làm mới danh sách phòng chơi
@@ -237,11 +265,12 @@ class BattleshipApp:
         Args:
             view: RoomListView instance để update
         
-        - Gọi controller.get_rooms() để lấy danh sách từ server
+        - Gọi controller.subscribe_rooms() lấy lại cả danh sách kèm version
+          (đồng bộ lại từ đầu, event push sau đó tiếp tục từ version mới)
         - Update view với danh sách mới
         - Hiển thị lỗi nếu thất bại
         """
-        result = self.controller.get_rooms()
+        result = self.controller.subscribe_rooms()
         
         if result['success']:
             view.update_rooms(result['rooms'])
@@ -274,7 +303,7 @@ class BattleshipApp:
         
         - Tạo RoomLobbyView
         - Gán callback: on_leave → _handle_leave_room
-        - Bắt đầu polling để kiểm tra số người và trạng thái game
+        - Đăng ký event phòng để biết số người và lúc trận đấu bắt đầu
         """
         self._destroy_current_view()
         
@@ -285,52 +314,59 @@ class BattleshipApp:
         self._start_lobby_polling(view)
     
     def _start_lobby_polling(self, view):
-        """Bắt đầu polling trạng thái phòng chờ
+        """Bắt đầu theo dõi phòng chờ
         
         Args:
             view: RoomLobbyView instance để update
         
         Luồng:
-        1. Tạo thread polling chạy mỗi 1 giây
-        2. Gọi controller.get_room_status()
-        3. Update số người chơi lên view
-        4. Nếu game_started=True → gọi _start_battle()
-        5. Nếu room closed → quay về home
+        1. controller.subscribe_room_events(): snapshot số người + trạng thái
+        2. Sau đó server push player_joined / opponent_left, _drain_room_lobby
+           lấy từ hàng đợi mỗi EVENT_DRAIN_INTERVAL ms (không gửi request)
+        3. game_started=True → _start_battle()
+        4. Room closed → quay về home
         
-        Lưu ý: Dùng self.root.after(0, ...) để update UI từ thread an toàn
+        Chạy trên thread Tk (after), không cần thread riêng
         """
         self.lobby_poll_active = True
+        result = self.controller.subscribe_room_events()
+        self._apply_room_status(view, result)
+    
+    def _drain_room_lobby(self, view):
+        """Lấy event phòng chờ đã nhận, áp vào view rồi hẹn lần sau"""
+        self.lobby_poll_job = None
+        if not self.lobby_poll_active or self.current_view is not view:
+            return
+        self._apply_room_status(view, self.controller.poll_room_status())
+    
+    def _apply_room_status(self, view, result):
+        """Cập nhật view theo trạng thái phòng, chuyển sang trận đấu hoặc về home"""
+        if not result['success']:
+            self.lobby_poll_active = False
+            messagebox.showinfo("Info", "Room closed")
+            self.show_home()
+            return
         
-        def poll():
-            while self.lobby_poll_active:
-                result = self.controller.get_room_status()
-                
-                if result['success']:
-                    status = result['status']
-                    self.root.after(0, lambda: view.update_player_count(status['player_count']))
-                    
-                    if status.get('game_started'):
-                        self.root.after(0, self._start_battle)
-                        break
-                else:
-                    self.root.after(0, lambda: messagebox.showinfo("Info", "Room closed"))
-                    self.root.after(0, self.show_home)
-                    break
-                
-                time.sleep(1)
+        status = result['status']
+        if result.get('changed', True):
+            view.apply_status(status)
+        if status.get('game_started'):
+            self.lobby_poll_active = False
+            self.root.after(0, self._start_battle)
+            return
         
-        self.lobby_poll_thread = threading.Thread(target=poll, daemon=True)
-        self.lobby_poll_thread.start()
+        interval = EVENT_DRAIN_INTERVAL if self.controller.room_status_pushed else LEGACY_POLL_INTERVAL
+        self.lobby_poll_job = self.root.after(interval, self._drain_room_lobby, view)
     
     def _handle_leave_room(self):
         """Xử lý rời khỏi phòng chờ
         
         Luồng:
-        1. Dừng polling thread (lobby_poll_active = False)
+        1. Dừng vòng lấy event phòng chờ
         2. Gọi controller.leave_room() để ngắt kết nối
         3. Quay về màn hình home
         """
-        self.lobby_poll_active = False
+        self._stop_event_drain()
         
         result = self.controller.leave_room()
         
@@ -356,7 +392,7 @@ class BattleshipApp:
            - Hiển thị hit/miss, tàu bị chìm, streak
         5. GIAI ĐOẠN 3 - Kết thúc:
            - Khi 1 người mất hết tàu → hiển thị winner
-           - Lưu lịch sử trận đấu vào database ngay lập tức
+           - Server tự ghi lịch sử trận (client không gửi thống kê)
            - Hiển thị BattleStatsView với biểu đồ thống kê
         6. Dọn dẹp:
            - Đóng Pygame
@@ -367,7 +403,7 @@ class BattleshipApp:
         - Try-catch toàn bộ để không crash app
         - Finally luôn disconnect và quay về home
         """
-        self.lobby_poll_active = False
+        self._stop_event_drain()
         
         print("[APP] Starting Pygame battle...")
         
@@ -402,14 +438,14 @@ class BattleshipApp:
                 
                 if states['ship_locked']:
                     ship_locked = True
-                    my_grid = ship_location_stage.get_grid()
+                    my_fleet = ship_location_stage.get_fleet()
                     break
             
             if ship_locked:
                 # Start battle stage
                 battle_stage = BattleController()
                 battle_stage.load_client(self.controller.room_client)
-                battle_stage.load_my_grid(my_grid)
+                battle_stage.load_my_fleet(my_fleet)
                 
                 game_finished = False
                 battle_stats_data = None
@@ -462,11 +498,8 @@ class BattleshipApp:
                         'enemy_max_streak': battle_stage.enemy_max_streak
                     }
                     
-                    # Save game history IMMEDIATELY
-                    print("[APP] Saving game history immediately...")
-                    self._save_game_history(battle_stats_data)
-                    
-                    # Then show battle stats view if user didn't quit
+                    # Lịch sử trận do server ghi (GameRoom.build_match_record)
+                    # Show battle stats view if user didn't quit
                     if running:
                         try:
                             print("[APP] Creating BattleStatsView...")
@@ -501,7 +534,7 @@ class BattleshipApp:
                             import traceback
                             traceback.print_exc()
                     else:
-                        print("[APP] User quit during game over, stats already saved")
+                        print("[APP] User quit during game over")
                 else:
                     print(f"[APP] Game did not finish normally: game_finished={game_finished}")
                 
@@ -532,101 +565,6 @@ class BattleshipApp:
             self.root.deiconify()
             self.show_home()
     
-    def _save_game_history(self, battle_stats_data):
-        """Lưu lịch sử trận đấu vào database qua server
-        
-        Args:
-            battle_stats_data: Dict chứa:
-                - winner_name: Tên người thắng
-                - my_username, enemy_username: Tên 2 người chơi
-                - my_ships_sunk, enemy_ships_sunk: Số tàu bị chìm
-                - my_hits, my_misses: Số phát trúng/trượt
-                - my_max_streak, enemy_max_streak: Streak dài nhất
-        
-        Luồng:
-        1. Kiểm tra user đã đăng nhập
-        2. Reconnect lobby client nếu bị disconnect
-        3. Tính toán:
-           - result: 'win'/'lose' dựa vào winner_name
-           - accuracy: (hits / total_shots) * 100
-        4. Gửi request 'save_game_history' đến lobby server
-        5. Server lưu vào bảng game_history
-        
-        Lưu ý: 
-        - Mỗi trận lưu 2 records (1 cho mỗi người chơi)
-        - Được gọi NGAY SAU khi game kết thúc
-        """
-        user = self.controller.get_user()
-        
-        if not user:
-            print("[APP] Cannot save game history - no user")
-            return
-        
-        # Reconnect to lobby if needed
-        if not self.controller.lobby_client:
-            print("[APP] Lobby client disconnected, reconnecting...")
-            self.controller._connect_to_lobby()
-        
-        if not self.controller.lobby_client:
-            print("[APP] Cannot save game history - failed to connect to lobby")
-            return
-        
-        print(f"[APP] Saving game history for user {user.get('username')}")
-        print(f"[APP] Battle stats data: {battle_stats_data}")
-        
-        try:
-            # Determine result for current player
-            winner_name = battle_stats_data.get('winner_name')
-            my_username = battle_stats_data.get('my_username')
-            result = 'win' if winner_name == my_username else 'lose'
-            
-            print(f"[APP] Winner: {winner_name}, My username: {my_username}, Result: {result}")
-            
-            # Calculate accuracy
-            my_total_shots = battle_stats_data['my_hits'] + battle_stats_data['my_misses']
-            accuracy = (battle_stats_data['my_hits'] / my_total_shots * 100) if my_total_shots > 0 else 0
-            
-            # Calculate enemy accuracy
-            enemy_total_shots = battle_stats_data['enemy_hits'] + battle_stats_data['enemy_misses']
-            enemy_accuracy = (battle_stats_data['enemy_hits'] / enemy_total_shots * 100) if enemy_total_shots > 0 else 0
-            
-            game_data = {
-                'user_id': user['id'],
-                'username': my_username,
-                'opponent_username': battle_stats_data.get('enemy_username'),
-                'result': result,
-                'ships_sunk': battle_stats_data['enemy_ships_sunk'],  # Enemy ships I sunk
-                'enemy_ships_sunk': battle_stats_data['my_ships_sunk'],  # My ships enemy sunk
-                'hits': battle_stats_data['my_hits'],
-                'misses': battle_stats_data['my_misses'],
-                'accuracy': round(accuracy, 2),
-                'max_streak': battle_stats_data['my_max_streak'],
-                'enemy_hits': battle_stats_data['enemy_hits'],
-                'enemy_misses': battle_stats_data['enemy_misses'],
-                'enemy_accuracy': round(enemy_accuracy, 2),
-                'enemy_max_streak': battle_stats_data['enemy_max_streak']
-            }
-            
-            print(f"[APP] Sending game data to server: {game_data}")
-            
-            # Send save request to server
-            response = self.controller.lobby_client.send_data_to_server({
-                'request': 'save_game_history',
-                'game_data': game_data
-            })
-            
-            print(f"[APP] Server response: {response}")
-            
-            if response and response.get('success'):
-                print(f"[APP] ✓ Game history saved successfully for user {my_username}")
-            else:
-                error = response.get('error') if response else 'No response'
-                print(f"[APP] ✗ Failed to save game history: {error}")
-        except Exception as e:
-            print(f"[APP] ✗ Error saving game history: {e}")
-            import traceback
-            traceback.print_exc()
-    
     def _handle_statistics(self):
         """Hiển thị thống kê trận đấu của người chơi
         
@@ -670,16 +608,27 @@ class BattleshipApp:
     def _destroy_current_view(self):
         """Hủy view hiện tại trước khi chuyển sang view mới
         
-        - Dừng lobby polling nếu đang chạy
+        - Dừng vòng lấy event (phòng chờ, danh sách phòng) nếu đang chạy
         - Gọi destroy() trên view hiện tại
         - Set current_view = None
         """
         if self.current_view:
-            self.lobby_poll_active = False
+            self._stop_event_drain()
             if hasattr(self.current_view, 'destroy'):
                 self.current_view.destroy()
             self.current_view = None
     
+    def _stop_event_drain(self):
+        """Hủy các after() đang hẹn, hủy đăng ký danh sách phòng nếu đang xem"""
+        self.lobby_poll_active = False
+        if self.lobby_poll_job is not None:
+            self.root.after_cancel(self.lobby_poll_job)
+            self.lobby_poll_job = None
+        if self.room_list_job is not None:
+            self.root.after_cancel(self.room_list_job)
+            self.room_list_job = None
+            self.controller.unsubscribe_rooms()
+    
     def _on_closing(self):
         """Xử lý khi đóng window (click X)
         
@@ -4,7 +4,7 @@ Handles auth requests to server without full RoomClient connection
 """
 import socket
 import logging
-from networking.network import Network, BUFFER_SIZE
+from networking.network import Network, MessageBuffer, LEGACY_FRAMING
 
 logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S')
 logging.root.setLevel(logging.INFO)
@@ -14,11 +14,15 @@ class AuthClient(Network):
     """Lightweight client cho authentication requests
     
     Kế thừa Network để dùng create_datagram và decode_data
+    
+    Có session (SessionClient): gửi qua kênh 'auth' của kết nối chung,
+    không mở socket tạm cho mỗi request
     """
     
-    def __init__(self, host_address='localhost', host_port=65432):
+    def __init__(self, host_address='localhost', host_port=65432, session=None):
         self.host_address = host_address
         self.host_port = host_port
+        self.session = session
     
     def send_auth_request(self, action, username, password):
         """Gửi auth request tới server
@@ -31,27 +35,32 @@ class AuthClient(Network):
         Returns:
             Dict response từ server
         """
+        request = {
+            'action': f'auth:{action}',
+            'username': username,
+            'password': password
+        }
+        
+        if self.session is not None:
+            response = self.session.request('auth', request)
+            if response is not None:
+                return response
+            return {'success': False, 'message': 'No response from server'}
+        
         try:
             # Tạo socket connection tạm thời
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.connect((self.host_address, self.host_port))
             
-            # Gửi auth request với datagram format
-            request = {
-                'action': f'auth:{action}',
-                'username': username,
-                'password': password
-            }
-            
-            datagram = self.create_datagram(BUFFER_SIZE, request)
-            sock.sendall(datagram)
+            # Gửi auth request dạng frame
+            sock.sendall(self.encode_message(request, LEGACY_FRAMING))
             
             # Nhận response
-            response_data = sock.recv(BUFFER_SIZE)
+            response = self.receive_message(sock, MessageBuffer(LEGACY_FRAMING))
             sock.close()
             
-            if response_data:
-                return self.decode_data(response_data)
+            if response is not None:
+                return response
             else:
                 return {'success': False, 'message': 'No response from server'}
                 
@@ -1,39 +1,269 @@
 import json
+import socket
+import struct
+from threading import Lock
+from typing import Dict, List, Optional
 
 
 # Các hằng số cho game networking
 CONN_LIMIT = 2  # Số kết nối tối đa mỗi phòng (2 người chơi)
 BUFFER_SIZE = 4096  # Kích thước buffer cho socket communication
 SHIPS_NAMES = ['battleship', 'cruiser', 'destroyer1', 'destroyer2', 'plane']  # 5 loại tàu
+SHIP_SIZES = {'battleship': 5, 'cruiser': 4, 'destroyer1': 3, 'destroyer2': 3, 'plane': 2}
+GRID_SIZE = 10  # Lưới 10x10
+
+# Framing: [độ dài payload 4 bytes big-endian][JSON payload]
+HEADER_FORMAT = '!I'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024  # < 2^24 nên byte đầu tiên của header luôn là 0x00
+LEGACY_FRAMING = False  # True: gửi datagram 4096 bytes kiểu cũ (nói chuyện với server cũ)
+
+
+def encode_fleet(grid: List[list]) -> List[Optional[List[int]]]:
+    """Chuyển lưới 10x10 thành fleet gọn để gửi qua mạng
+
+    Args:
+        grid: Lưới 10x10, mỗi ô là None hoặc tên tàu
+
+    Returns:
+        List theo thứ tự SHIPS_NAMES, mỗi tàu = [col, row, vertical, length]
+        (None nếu tàu không có trên lưới)
+
+    Ví dụ:
+        battleship nằm ngang từ (0, 0) → [0, 0, 0, 5]
+        → cả hạm đội ~60 bytes JSON thay vì ~1.5KB cho lưới 10x10
+    """
+    fleet = []
+    for ship_name in SHIPS_NAMES:
+        cells = [
+            (col, row)
+            for row in range(len(grid))
+            for col in range(len(grid[row]))
+            if grid[row][col] == ship_name
+        ]
+        if not cells:
+            fleet.append(None)
+            continue
+        col, row = min(cells, key=lambda cell: (cell[1], cell[0]))
+        vertical = int(len(cells) > 1 and all(c == col for c, _ in cells))
+        fleet.append([col, row, vertical, len(cells)])
+    return fleet
+
+
+def decode_fleet(fleet: List[Optional[List[int]]]) -> List[list]:
+    """Dựng lại lưới 10x10 từ fleet (client dùng để vẽ)"""
+    grid = [[None for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+    for ship_name, ship in zip(SHIPS_NAMES, fleet):
+        if ship is None:
+            continue
+        col, row, vertical, length = ship
+        for i in range(length):
+            if vertical:
+                grid[row + i][col] = ship_name
+            else:
+                grid[row][col + i] = ship_name
+    return grid
+
+
+def fleet_masks(fleet: List[Optional[List[int]]]) -> Dict[str, int]:
+    """Chuyển fleet thành bitmask chiếm chỗ của từng tàu (bit row * 10 + col)
+
+    Returns:
+        {ship_name: mask}, mỗi mask là 1 int 100 bit
+
+    Raises:
+        ValueError: Fleet sai định dạng, tàu sai kích thước, ra ngoài lưới hoặc chồng nhau
+    """
+    if not isinstance(fleet, list) or len(fleet) != len(SHIPS_NAMES):
+        raise ValueError('Invalid fleet')
+
+    masks = {}
+    occupied = 0
+    for ship_name, ship in zip(SHIPS_NAMES, fleet):
+        if ship is None:
+            continue
+        col, row, vertical, length = ship
+        if length != SHIP_SIZES[ship_name]:
+            raise ValueError(f'Invalid length for {ship_name}: {length}')
+        end_col, end_row = (col, row + length - 1) if vertical else (col + length - 1, row)
+        if not (0 <= col and 0 <= row and end_col < GRID_SIZE and end_row < GRID_SIZE):
+            raise ValueError(f'{ship_name} is outside the grid')
+
+        step = GRID_SIZE if vertical else 1
+        mask = 0
+        for i in range(length):
+            mask |= 1 << (row * GRID_SIZE + col + i * step)
+        if mask & occupied:
+            raise ValueError(f'{ship_name} overlaps another ship')
+        occupied |= mask
+        masks[ship_name] = mask
+    return masks
+
+
+class MessageBuffer:
+    """Bộ đệm tái sử dụng để tách message từ luồng TCP
+
+    Chức năng:
+    - Giữ 1 bytearray cố định, recv_into() trực tiếp vào đó (không tạo bytes mới mỗi lần)
+    - Tách từng message hoàn chỉnh (1 recv có thể chứa nửa message hoặc nhiều message)
+    - Tự nhận diện định dạng ở byte đầu tiên:
+      * 0x00 → frame có header độ dài (định dạng mới)
+      * '*' hoặc '{' → datagram padding 4096 bytes (client cũ)
+
+    Dữ liệu chưa đủ 1 message được giữ lại, nên socket.timeout giữa chừng không làm mất dữ liệu
+    """
+
+    def __init__(self, legacy: Optional[bool] = None, size: int = BUFFER_SIZE):
+        """
+        Args:
+            legacy: True/False để cố định định dạng, None để tự nhận diện
+            size: Kích thước ban đầu của buffer (tự mở rộng khi message lớn hơn)
+        """
+        self.legacy = legacy
+        self.buffer = bytearray(size)
+        self.start = 0  # Vị trí bắt đầu dữ liệu chưa xử lý
+        self.end = 0    # Vị trí kết thúc dữ liệu đã nhận
+
+    def writable(self, min_free: int = BUFFER_SIZE) -> memoryview:
+        """Trả về vùng trống phía sau dữ liệu để recv_into() ghi vào
+
+        Dồn dữ liệu chưa xử lý về đầu buffer, mở rộng buffer nếu vẫn không đủ chỗ
+        """
+        if len(self.buffer) - self.end < min_free:
+            pending = self.end - self.start
+            if self.start:
+                self.buffer[:pending] = self.buffer[self.start:self.end]
+                self.start, self.end = 0, pending
+            if len(self.buffer) - self.end < min_free:
+                self.buffer.extend(bytes(min_free - (len(self.buffer) - self.end)))
+        return memoryview(self.buffer)[self.end:]
+
+    def commit(self, nbytes: int) -> None:
+        """Đánh dấu nbytes vừa được ghi vào vùng writable()"""
+        self.end += nbytes
+
+    def feed(self, data: bytes) -> None:
+        """Chép dữ liệu nhận được (dùng cho asyncio Protocol.data_received)"""
+        self.writable(len(data))[:len(data)] = data
+        self.commit(len(data))
+
+    def pop_message(self) -> Optional[bytes]:
+        """Lấy ra JSON payload của 1 message hoàn chỉnh
+
+        Returns:
+            bytes JSON nếu đã đủ 1 message, None nếu cần nhận thêm dữ liệu
+
+        Raises:
+            ValueError: Header khai báo độ dài vượt MAX_MESSAGE_SIZE
+        """
+        pending = self.end - self.start
+        if pending == 0:
+            return None
+
+        if self.legacy is None:
+            self.legacy = self.buffer[self.start] != 0
+
+        if self.legacy:
+            # Datagram cũ: đúng BUFFER_SIZE bytes, padding '*' ở đầu
+            if pending < BUFFER_SIZE:
+                return None
+            payload = bytes(self.buffer[self.start:self.start + BUFFER_SIZE]).lstrip(b'*')
+            self.start += BUFFER_SIZE
+        else:
+            if pending < HEADER_SIZE:
+                return None
+            (length,) = struct.unpack_from(HEADER_FORMAT, self.buffer, self.start)
+            if length > MAX_MESSAGE_SIZE:
+                raise ValueError(f'Message too large: {length} bytes')
+            if pending < HEADER_SIZE + length:
+                return None
+            payload_start = self.start + HEADER_SIZE
+            payload = bytes(self.buffer[payload_start:payload_start + length])
+            self.start = payload_start + length
+
+        if self.start == self.end:
+            self.start = self.end = 0
+        return payload
 
 
 class Network:
     """Class xử lý logic mạng chung
-    
+
     Chức năng:
-    - Tạo datagram với kích thước cố định (padding bằng *)
-    - Encode dữ liệu thành JSON bytes
+    - Tạo frame: header 4 bytes (độ dài) + JSON payload
+    - Tạo datagram với kích thước cố định (padding bằng *) cho client/server cũ
+    - Đọc message từ socket qua MessageBuffer tái sử dụng
     - Decode bytes thành Python object
-    
-    Sử dụng: Kế thừa bởi Client và RoomServer
+
+    Sử dụng: Kế thừa bởi Client, RoomClient và RoomServer
     """
 
+    def create_frame(self, data: object) -> bytes:
+        """Tạo frame có header độ dài
+
+        Args:
+            data: Python object (Dict, List, str, ...)
+
+        Returns:
+            bytes = [len(payload) 4 bytes big-endian][payload UTF-8]
+
+        Ví dụ:
+        data={'a': 1} → payload = b'{"a": 1}' (8 bytes)
+        → frame = b'\\x00\\x00\\x00\\x08{"a": 1}' (12 bytes thay vì 4096)
+        """
+
+        payload = json.dumps(data).encode('utf-8')
+        return struct.pack(HEADER_FORMAT, len(payload)) + payload
+
+    def encode_message(self, data: object, legacy: bool = False) -> bytes:
+        """Encode message theo định dạng của kết nối (frame mới hoặc datagram cũ)"""
+
+        if legacy:
+            return self.create_datagram(BUFFER_SIZE, data)
+        return self.create_frame(data)
+
+    def receive_message(self, sock: socket.socket, buffer: MessageBuffer) -> object:
+        """Đọc đúng 1 message từ socket
+
+        Args:
+            sock: Socket đang kết nối
+            buffer: MessageBuffer của kết nối này (giữ phần dữ liệu thừa cho lần đọc sau)
+
+        Returns:
+            Python object, hoặc None nếu kết nối đã đóng
+
+        Luồng:
+        1. Nếu buffer đã có sẵn 1 message hoàn chỉnh → trả về luôn
+        2. Ngược lại recv_into() vào buffer cho tới khi đủ 1 message
+        3. recv trả về 0 bytes → kết nối đóng → None
+        """
+
+        while True:
+            payload = buffer.pop_message()
+            if payload is not None:
+                return json.loads(payload)
+
+            nbytes = sock.recv_into(buffer.writable())
+            if not nbytes:
+                return None
+            buffer.commit(nbytes)
+
     def create_datagram(self, buffer_size: int, data: object) -> bytes:
-        """Tạo datagram với chiều dài cố định
-        
+        """Tạo datagram với chiều dài cố định (định dạng cũ)
+
         Args:
             buffer_size: Kích thước buffer (4096 bytes)
             data: Python object (Dict, List, str, ...)
-        
+
         Returns:
             bytes với độ dài = buffer_size
-        
+
         Luồng:
         1. Chuyển data thành JSON string
         2. Tính header_size = buffer_size - len(message)
         3. Thêm padding '*' vào đầu
         4. Encode thành UTF-8 bytes
-        
+
         Ví dụ:
         buffer_size=20, data={'a': 1}
         → message = '{"a": 1}' (8 bytes)
@@ -49,18 +279,18 @@ class Network:
 
     def decode_data(self, data: bytes) -> object:
         """Giải mã dữ liệu nhận từ server
-        
+
         Args:
             data: bytes nhận từ socket.recv()
-        
+
         Returns:
             Python object (Dict, List, ...)
-        
+
         Luồng:
         1. Decode bytes thành UTF-8 string
         2. Xóa tất cả ký tự padding '*'
         3. Parse JSON string thành Python object
-        
+
         Ví dụ:
         data = b'************{"a": 1}'
         → decoded = '************{"a": 1}'
@@ -72,3 +302,54 @@ class Network:
         cleaned_data = decoded_data.replace('*', '')
 
         return json.loads(cleaned_data)
+
+
+class Connection(Network):
+    """1 kết nối TCP phía server kèm buffer đọc và khóa gửi
+
+    Thuộc tính:
+    - socket: Socket của client
+    - buffer: MessageBuffer (tự nhận diện frame mới / datagram cũ từ message đầu tiên)
+    - send_lock: Khóa để nhiều thread có thể gửi vào cùng 1 socket an toàn
+
+    Server trả lời theo đúng định dạng mà client đã dùng để gửi
+    TCP_NODELAY: event + response nhỏ gửi liền nhau không bị Nagle giữ lại chờ ACK
+    """
+
+    def __init__(self, client_socket: socket.socket, legacy: Optional[bool] = None):
+        self.socket = client_socket
+        self.buffer = MessageBuffer(legacy)
+        self.send_lock = Lock()
+        try:
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+
+    @property
+    def legacy(self) -> bool:
+        """True nếu client dùng datagram 4096 bytes kiểu cũ"""
+        return bool(self.buffer.legacy)
+
+    def receive(self) -> object:
+        """Đọc 1 message, None nếu client đã đóng kết nối"""
+        return self.receive_message(self.socket, self.buffer)
+
+    def send(self, data: object) -> None:
+        """Gửi 1 message theo định dạng của kết nối"""
+        message = self.encode_message(data, self.legacy)
+        with self.send_lock:
+            self.socket.sendall(message)
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        self.socket.settimeout(timeout)
+
+    def close(self) -> None:
+        """Shutdown và đóng socket, bỏ qua lỗi nếu socket đã đóng"""
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.socket.close()
+        except OSError:
+            pass
@@ -2,16 +2,24 @@
 Room-based Client
 Enhanced client for room-based multiplayer
 """
+import json
+import select
 import socket
 import logging
-from typing import Union, List, Tuple
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import partial
+from threading import Thread, Lock
+from typing import Callable, Dict, Optional, Union, List, Tuple
 
-from networking.network import Network, BUFFER_SIZE
+from networking.network import Network, MessageBuffer, LEGACY_FRAMING
 
 
 logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S')
 logging.root.setLevel(logging.INFO)
 
+REQUEST_TIMEOUT = 10  # Giây chờ response của send_data_to_server ở chế độ pipelined
+
 
 class RoomClient(Network):
     """Client kết nối với server, hỗ trợ phòng chơi
@@ -21,18 +29,62 @@ class RoomClient(Network):
     - Gửi/nhận dữ liệu qua Socket
     - Gửi lưới tàu (đặt tàu xong)
     - Bắn vào ô đối thủ
-    - Lấy dữ liệu game (mỗi frame)
+    - Nhận event push từ server (attack_result, turn_change, ship_sunk, winner, opponent_left)
+      thay vì hỏi game_data mỗi frame
+    - Đồng bộ trạng thái phòng theo version (server chỉ gửi phần thay đổi)
+    
+    Chế độ pipelined (sau start_receiver()):
+    - Thread nền đọc socket, không thread nào khác gọi recv
+    - Mỗi request có request_id, server gửi kèm lại trong response
+    - send_request() trả về Future ngay, callback chạy trên thread gọi poll_events()
+    - Nhiều request có thể cùng chờ (vd: xem stats đối thủ trong lúc đánh)
+    - send_data_to_server() vẫn dùng được (chờ Future), nhưng không nên gọi mỗi frame
+    
+    Chế độ session (truyền session=SessionClient):
+    - Không mở socket riêng, chạy trên kênh 'lobby' (room_id None) hoặc 'room' của session
+    - Luôn pipelined, events dùng chung hàng đợi của kênh trong session
+    - disconnect() chỉ rời kênh (vd: rời phòng), socket session vẫn giữ
     """
 
-    def __init__(self, username: str, user_id: int, room_id: int, host_address: str, host_port: int):
-        self.is_disconnected = False
+    def __init__(self, username: str, user_id: int, room_id: int, host_address: str, host_port: int,
+                 session=None):
+        self.session = session  # SessionClient dùng chung (None: socket riêng như cũ)
+        self.channel = 'lobby' if room_id is None else 'room'
+        self._disconnected = False
         self.username = username  # Tên đăng nhập
         self.user_id = user_id    # ID người dùng
         self.room_id = room_id    # ID phòng
         
         self.server_socket = None  # Socket kết nối
+        self.buffer = MessageBuffer(LEGACY_FRAMING)  # Buffer đọc tái sử dụng
+        self.events = deque()  # Event server push tới (và callback chờ chạy), chờ controller xử lý
+        # Bản sao trạng thái phòng, ghép dần từ các delta của server
+        self.room_state = {'version': 0, 'clients': {}, 'game_status': None, 'winner': None}
         self.host_port = host_port        # Port server (7777)
         self.host_address = host_address  # IP server (localhost)
+        
+        # Chế độ pipelined
+        self.pipelined = False
+        self.receiver_thread: Optional[Thread] = None
+        self.pending: Dict[int, Tuple[Future, Optional[Callable]]] = {}  # request_id -> (future, callback)
+        self.pending_lock = Lock()
+        self.send_lock = Lock()
+        self.next_request_id = 0
+        
+        if session is not None:
+            self.events = session.queues[self.channel]
+            self.pipelined = True
+
+    @property
+    def is_disconnected(self) -> bool:
+        """Mất kết nối (hoặc đã disconnect) - ở chế độ session tính cả socket của session"""
+        if self.session is not None and not self.session.connected:
+            return True
+        return self._disconnected
+
+    @is_disconnected.setter
+    def is_disconnected(self, value: bool) -> None:
+        self._disconnected = value
 
     def connect_to_server(self) -> bool:
         """Kết nối tới server game
@@ -46,7 +98,17 @@ class RoomClient(Network):
         Returns:
             True: Kết nối thành công
             False: Kết nối thất bại
+        
+        Chế độ session: lobby đã đăng ký lúc login, vào phòng = 1 request 'join_room'
         """
+        if self.session is not None:
+            if self.channel == 'lobby':
+                return self.session.connected
+            self.events.clear()  # Bỏ event còn sót của phòng trước
+            ack = self.send_data_to_server({'request': 'join_room', 'room_id': self.room_id})
+            logging.info(f'Server ACK: {ack}')
+            return bool(ack and ack.get('status') == 'connected')
+        
         try:
             self.host_port = int(self.host_port)
 
@@ -84,6 +146,14 @@ class RoomClient(Network):
         Đóng socket
         Đánh dấu is_disconnected = True
         """
+        if self.session is not None:
+            # Chỉ rời kênh, session vẫn giữ kết nối
+            if not self.is_disconnected:
+                self.send_data_to_server({'request': 'disconnect'})
+            self.is_disconnected = True
+            logging.info(f'Left {self.channel} channel')
+            return
+        
         self.is_disconnected = True
         try:
             self.send_data_to_server({'request': 'disconnect'})
@@ -118,24 +188,176 @@ class RoomClient(Network):
             Dict response từ server hoặc None nếu lỗi
         
         Luồng:
-        1. Encode data thành JSON bytes
+        1. Encode data thành frame (header độ dài + JSON)
         2. Gửi qua socket
-        3. Chờ nhận response
+        3. Đọc đúng 1 message response (có thể qua nhiều lần recv)
         4. Decode response
         """
+        if self.pipelined:
+            try:
+                return self.send_request(data).result(timeout=REQUEST_TIMEOUT)
+            except FutureTimeoutError:
+                logging.error(f'Request timed out: {data}')
+                return None
+        
         try:
-            message = self.create_datagram(BUFFER_SIZE, data)
+            message = self.encode_message(data, LEGACY_FRAMING)
             self.server_socket.sendall(message)
 
-            response = self.server_socket.recv(BUFFER_SIZE)
-            if response:
-                return self.decode_data(response)
-        except socket.error as e:
+            # Event push có thể đến trước response → xếp vào hàng đợi
+            response = self.receive_message(self.server_socket, self.buffer)
+            while isinstance(response, dict) and 'event' in response:
+                self.events.append(response)
+                response = self.receive_message(self.server_socket, self.buffer)
+            if response is not None:
+                return response
+        except (socket.error, ValueError) as e:
             logging.error(f'Socket error: {e}')
             self.is_disconnected = True
 
         return None
 
+    def start_receiver(self) -> None:
+        """Chuyển sang chế độ pipelined: thread nền nhận mọi message từ server
+        
+        Gọi 1 lần khi không còn request đồng bộ nào đang chờ
+        """
+        if self.pipelined or not self.server_socket or self.is_disconnected:
+            return
+        self.pipelined = True
+        self.receiver_thread = Thread(target=self._receive_loop, daemon=True)
+        self.receiver_thread.start()
+
+    def send_request(self, data: dict, callback: Callable[[Union[dict, None]], None] = None) -> Future:
+        """Gửi request mà không chờ response
+        
+        Args:
+            data: Dict request, ví dụ {'request': 'attack_tile', 'position': (5, 3)}
+            callback: Hàm nhận response (None nếu lỗi), chạy trong poll_events()
+        
+        Returns:
+            Future có result là response (None nếu mất kết nối)
+        
+        Chưa start_receiver() → gửi đồng bộ như send_data_to_server()
+        """
+        if self.session is not None:
+            return self.session.send_request(self.channel, data, callback)
+        
+        future = Future()
+        
+        if not self.pipelined:
+            response = self.send_data_to_server(data)
+            future.set_result(response)
+            if callback:
+                self.events.append(partial(callback, response))
+            return future
+        
+        with self.pending_lock:
+            self.next_request_id += 1
+            request_id = self.next_request_id
+            self.pending[request_id] = (future, callback)
+        
+        try:
+            message = self.encode_message(dict(data, request_id=request_id), LEGACY_FRAMING)
+            with self.send_lock:
+                self.server_socket.sendall(message)
+        except (socket.error, AttributeError) as e:
+            logging.error(f'Socket error: {e}')
+            self.is_disconnected = True
+            # Thread nhận có thể đã trả None cho request này (mất kết nối cùng lúc)
+            with self.pending_lock:
+                entry = self.pending.pop(request_id, None)
+            if entry:
+                self._resolve(future, callback, None)
+        
+        return future
+
+    def _receive_loop(self) -> None:
+        """Thread nền: đọc message, ghép response với request_id, xếp event vào hàng đợi"""
+        while True:
+            try:
+                message = self.receive_message(self.server_socket, self.buffer)
+            except (socket.error, ValueError, OSError) as e:
+                logging.error(f'Socket error: {e}')
+                message = None
+            
+            if message is None:
+                self.is_disconnected = True
+                break
+            
+            if isinstance(message, dict) and 'request_id' in message:
+                with self.pending_lock:
+                    future, callback = self.pending.pop(message.pop('request_id'), (None, None))
+                if future:
+                    self._resolve(future, callback, message)
+            else:
+                self.events.append(message)
+        
+        # Mất kết nối → trả None cho mọi request còn chờ
+        with self.pending_lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for future, callback in pending:
+            self._resolve(future, callback, None)
+
+    def _resolve(self, future: Future, callback: Optional[Callable], response: Union[dict, None]) -> None:
+        future.set_result(response)
+        if callback:
+            self.events.append(partial(callback, response))
+
+    def subscribe_events(self) -> Union[dict, None]:
+        """Đăng ký nhận event push của phòng
+        
+        Returns:
+            Snapshot hiện tại: {'players': {...}, 'winner': ..., 'game_status': ...}
+            Sau đó server tự push event mỗi khi trạng thái phòng thay đổi
+        """
+        return self.send_data_to_server({'request': 'subscribe_events'})
+
+    def poll_events(self) -> List[dict]:
+        """Lấy tất cả event đã nhận mà không block
+        
+        Luồng:
+        1. select() với timeout 0: chỉ recv khi socket đã có dữ liệu
+        2. Tách mọi message hoàn chỉnh trong buffer thành event
+        3. Trả về và xóa hàng đợi
+        
+        Khi không có gì thay đổi: không gửi gì lên server, chi phí ~0
+        
+        Chế độ pipelined: thread nền đã nhận sẵn, chỉ cần lấy khỏi hàng đợi
+        và chạy callback của các response đã về (theo đúng thứ tự nhận)
+        """
+        if self.pipelined:
+            events = []
+            while self.events:
+                item = self.events.popleft()
+                if callable(item):
+                    item()
+                else:
+                    events.append(item)
+            return events
+        
+        if self.server_socket and not self.is_disconnected:
+            try:
+                while select.select([self.server_socket], [], [], 0)[0]:
+                    nbytes = self.server_socket.recv_into(self.buffer.writable())
+                    if not nbytes:
+                        self.is_disconnected = True
+                        break
+                    self.buffer.commit(nbytes)
+                
+                payload = self.buffer.pop_message()
+                while payload is not None:
+                    self.events.append(json.loads(payload))
+                    payload = self.buffer.pop_message()
+            except (socket.error, ValueError) as e:
+                logging.error(f'Socket error: {e}')
+                self.is_disconnected = True
+        
+        events = list(self.events)
+        self.events.clear()
+        return events
+
     def get_opponent_stats(self, opponent_username: str) -> Union[dict, None]:
         """Lấy thông tin thống kê của đối thủ từ server
         
@@ -177,20 +399,19 @@ class RoomClient(Network):
             logging.error(f"Error getting opponent stats: {e}")
             return None
     
-    def lock_ships(self, game_grid: List[list]) -> None:
-        """Gửi lưới tàu lên server (sau khi đặt tàu xong)
+    def lock_ships(self, fleet: List[list]) -> None:
+        """Gửi hạm đội lên server (sau khi đặt tàu xong)
         
         Args:
-            game_grid: Lười 10x10, mỗi ô là:
-                - None: Nước
-                - 'battleship', 'cruiser', ...: Tên tàu
+            fleet: List theo thứ tự SHIPS_NAMES, mỗi tàu = [col, row, vertical, length]
+                (xem encode_fleet() trong network.py)
         
         Ví dụ:
-            [['battleship', 'battleship', None, ...],
-             [None, 'cruiser', None, ...],
+            [[0, 0, 0, 5],   # battleship ngang từ (0, 0)
+             [9, 2, 1, 4],   # cruiser dọc từ (9, 2)
              ...]
         """
-        self.send_data_to_server({'request': 'ship_locked', 'grid': game_grid})
+        self.send_data_to_server({'request': 'ship_locked', 'fleet': fleet})
 
     def attack_enemy_tile(self, position: Tuple[int, int]) -> str:
         """Bắn vào ô đối thủ
@@ -222,13 +443,50 @@ class RoomClient(Network):
         return False
 
     def ship_sinked(self) -> None:
-        """Notify that a ship is sinked"""
-        self.send_data_to_server({'request': 'ship_sinked'})
+        """Notify that a ship is sinked (không chờ response)"""
+        self.send_request({'request': 'ship_sinked'})
 
     def get_game_data(self) -> Union[dict, None]:
         """Request current game data from server"""
-        response = self.send_data_to_server({'request': 'game_data'})
-        return response
+        room_state = self.sync_room_state()
+        if room_state:
+            return room_state['clients']
+        return None
+
+    def sync_room_state(self) -> Union[dict, None]:
+        """Cập nhật room_state từ server
+        
+        Returns:
+            room_state: {'version', 'clients', 'game_status', 'winner'}, None nếu lỗi
+        
+        Luồng:
+        1. Gửi 'game_data' kèm since_version = version đã có
+        2. not_modified → giữ nguyên (server không serialize lại gì)
+        3. Delta → ghép clients đã đổi, xóa người đã rời phòng
+        4. Server cũ (không có 'version') → response chính là toàn bộ clients
+        """
+        response = self.send_data_to_server({
+            'request': 'game_data',
+            'since_version': self.room_state['version']
+        })
+        if not isinstance(response, dict):
+            return None
+        
+        if 'version' not in response:
+            self.room_state['clients'] = response
+            return self.room_state
+        
+        if not response.get('not_modified'):
+            if response.get('full'):
+                self.room_state['clients'] = {}
+            self.room_state['clients'].update(response.get('clients', {}))
+            for username in response.get('removed', []):
+                self.room_state['clients'].pop(username, None)
+            self.room_state['game_status'] = response.get('game_status')
+            self.room_state['winner'] = response.get('winner')
+        
+        self.room_state['version'] = response['version']
+        return self.room_state
 
     def get_game_status(self) -> Union[dict, None]:
         """Request game status from server"""
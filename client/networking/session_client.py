@@ -0,0 +1,210 @@
+"""
+Session Client
+1 kết nối TCP lâu dài cho auth, lobby và phòng (các kênh logic trên cùng socket)
+"""
+import socket
+import logging
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import partial
+from threading import Thread, Lock
+from typing import Callable, Deque, Dict, Optional, Tuple, Union
+
+from networking.network import Network, MessageBuffer
+
+
+logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S')
+logging.root.setLevel(logging.INFO)
+
+CHANNELS = ('auth', 'lobby', 'room')
+REQUEST_TIMEOUT = 10  # Giây chờ response của request()
+
+
+class SessionClient(Network):
+    """1 kết nối dùng chung cho cả phiên chơi
+
+    Thay cho:
+    - 1 socket mới mỗi lần AuthClient.send_auth_request
+    - 1 socket lobby giữ suốt phiên
+    - 1 socket riêng mỗi lần vào phòng
+
+    Mỗi message gửi đi có:
+    - channel: 'auth' | 'lobby' | 'room' (server chọn handler theo kênh)
+    - request_id: server gửi kèm lại trong response để ghép với Future
+
+    Thread nền là nơi duy nhất đọc socket:
+    - Response có request_id → resolve Future, callback xếp vào hàng đợi của kênh
+    - Event push (không có request_id) → hàng đợi của kênh (mặc định 'room')
+
+    Thuộc tính:
+    - queues: {channel: deque} event và callback chờ chạy, RoomClient của kênh
+      dùng chung deque này làm events (xem RoomClient(session=...))
+    - connected: Socket còn mở
+    - token: Session token server cấp lúc login (lấy từ response kênh auth)
+
+    Mất kết nối giữa chừng: request kế tiếp tự mở lại socket và gửi 'auth:resume'
+    kèm token trước mọi request khác → server khôi phục session mà không cần
+    mật khẩu hay query database
+    """
+
+    def __init__(self, host_address: str = 'localhost', host_port: int = 65432):
+        self.host_address = host_address
+        self.host_port = host_port
+
+        self.server_socket = None
+        self.connected = False
+        self.token: Optional[str] = None
+        self.queues: Dict[str, Deque] = {channel: deque() for channel in CHANNELS}
+
+        self.receiver_thread: Optional[Thread] = None
+        self.pending: Dict[int, Tuple[Future, str, Optional[Callable]]] = {}  # request_id -> (future, channel, callback)
+        self.pending_lock = Lock()
+        self.send_lock = Lock()
+        self.connect_lock = Lock()
+        self.next_request_id = 0
+
+    def connect(self) -> bool:
+        """Mở kết nối nếu chưa có (gọi lại được sau close() hoặc khi mất kết nối)
+
+        Returns:
+            True nếu đã/đang kết nối
+        """
+        with self.connect_lock:
+            if self.connected:
+                return True
+            try:
+                sock = socket.create_connection((self.host_address, int(self.host_port)))
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except socket.error as error:
+                logging.error(f'Session connect error: {error}')
+                return False
+
+            self.server_socket = sock
+            self.pending = {}  # Request của socket cũ do thread nhận cũ trả None
+            for queue in self.queues.values():
+                queue.clear()
+            self.connected = True
+            # Mỗi socket 1 buffer riêng: thread nhận cũ không đọc lẫn frame của socket mới
+            self.receiver_thread = Thread(target=self._receive_loop,
+                                          args=(sock, MessageBuffer(False), self.pending), daemon=True)
+            self.receiver_thread.start()
+
+            if self.token:
+                # Server xử lý tuần tự → resume xong trước request đang chờ gửi
+                resumed = Future()
+                resumed.add_done_callback(self._on_resumed)
+                self._send('auth', {'action': 'auth:resume', 'token': self.token}, resumed, None)
+            return True
+
+    def _on_resumed(self, future: Future) -> None:
+        response = future.result()
+        if response is not None and not response.get('success'):
+            logging.info('Session token expired, login required')
+            self.token = None
+
+    def close(self) -> None:
+        """Đóng kết nối, mọi request đang chờ nhận None"""
+        with self.connect_lock:
+            sock = self.server_socket
+            self.connected = False
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            sock.close()
+
+    def send_request(self, channel: str, data: dict,
+                     callback: Callable[[Union[dict, None]], None] = None) -> Future:
+        """Gửi request trên 1 kênh mà không chờ response
+
+        Args:
+            channel: 'auth' | 'lobby' | 'room'
+            data: Dict request, ví dụ {'request': 'get_rooms'}
+            callback: Hàm nhận response (None nếu lỗi), chạy khi kênh được poll
+
+        Returns:
+            Future có result là response (None nếu mất kết nối)
+        """
+        future = Future()
+        if not self.connect():
+            self._resolve(future, channel, callback, None)
+            return future
+
+        self._send(channel, data, future, callback)
+        return future
+
+    def _send(self, channel: str, data: dict, future: Future, callback: Optional[Callable]) -> None:
+        """Ghi request (kèm channel, request_id) vào socket hiện tại"""
+        with self.pending_lock:
+            self.next_request_id += 1
+            request_id = self.next_request_id
+            pending = self.pending
+            pending[request_id] = (future, channel, callback)
+
+        try:
+            message = self.encode_message(dict(data, channel=channel, request_id=request_id))
+            with self.send_lock:
+                self.server_socket.sendall(message)
+        except (socket.error, AttributeError) as e:
+            logging.error(f'Socket error: {e}')
+            # Thread nhận có thể đã trả None cho request này (mất kết nối cùng lúc)
+            with self.pending_lock:
+                entry = pending.pop(request_id, None)
+            if entry:
+                self._resolve(future, channel, callback, None)
+
+    def request(self, channel: str, data: dict) -> Union[dict, None]:
+        """Gửi request và chờ response (None nếu lỗi/timeout)"""
+        try:
+            return self.send_request(channel, data).result(timeout=REQUEST_TIMEOUT)
+        except FutureTimeoutError:
+            logging.error(f'Request timed out: {data}')
+            return None
+
+    def _receive_loop(self, sock: socket.socket, buffer: MessageBuffer,
+                      pending: Dict[int, Tuple[Future, str, Optional[Callable]]]) -> None:
+        """Thread nền: ghép response với request_id, chia event theo kênh
+
+        buffer và pending thuộc riêng socket này (reconnect tạo cặp mới)
+        """
+        while True:
+            try:
+                message = self.receive_message(sock, buffer)
+            except (socket.error, ValueError, OSError) as e:
+                if self.connected:
+                    logging.error(f'Socket error: {e}')
+                message = None
+
+            if message is None:
+                break
+            if not isinstance(message, dict):
+                continue
+
+            channel = message.pop('channel', None)
+            if 'request_id' in message:
+                with self.pending_lock:
+                    future, channel, callback = pending.pop(message.pop('request_id'), (None, None, None))
+                if channel == 'auth' and message.get('token'):
+                    self.token = message['token']
+                if future:
+                    self._resolve(future, channel, callback, message)
+            else:
+                self.queues.get(channel, self.queues['room']).append(message)
+
+        with self.connect_lock:
+            if self.server_socket is sock:
+                self.connected = False
+
+        # Mất kết nối → trả None cho mọi request còn chờ
+        with self.pending_lock:
+            waiting = list(pending.values())
+            pending.clear()
+        for future, channel, callback in waiting:
+            self._resolve(future, channel, callback, None)
+
+    def _resolve(self, future: Future, channel: str, callback: Optional[Callable],
+                 response: Union[dict, None]) -> None:
+        future.set_result(response)
+        if callback:
+            self.queues[channel].append(partial(callback, response))
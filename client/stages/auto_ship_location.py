@@ -19,6 +19,8 @@ class AutoShipLocation:
         self.client: RoomClient = None
         self.grid_size = 10
         self.game_grid = [[None for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+        # Hạm đội dạng gọn: {ship_name: [col, row, vertical, length]}
+        self.fleet = {}
         self.ships_placed = False
         
         # Ship sizes: 1 tàu 5 (battleship), 1 tàu 4 (cruiser), 2 tàu 3 (destroyer), 1 tàu 2 (plane)
@@ -76,6 +78,7 @@ class AutoShipLocation:
     
     def place_ship(self, row, col, size, ship_name, horizontal):
         """Place ship on grid"""
+        self.fleet[ship_name] = [col, row, int(not horizontal), size]
         if horizontal:
             for c in range(col, col + size):
                 self.game_grid[row][c] = ship_name
@@ -110,7 +113,7 @@ class AutoShipLocation:
         # Auto lock ships after placement
         if self.ships_placed and not self.states['ship_locked']:
             if self.client:
-                self.client.lock_ships(self.game_grid)
+                self.client.lock_ships(self.get_fleet())
                 print("[DEBUG] Ships locked and sent to server")
             self.states['ship_locked'] = True
         
@@ -119,3 +122,7 @@ class AutoShipLocation:
     def get_grid(self):
         """Return the game grid"""
         return self.game_grid
+    
+    def get_fleet(self):
+        """Return the compact fleet (thứ tự SHIPS_NAMES, None nếu tàu chưa đặt được)"""
+        return [self.fleet.get(ship_name) for ship_name in SHIPS_NAMES]
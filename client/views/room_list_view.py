@@ -39,6 +39,9 @@ class RoomListView:
     - Bảng danh sách các phòng đang chờ người chơi
     - Thông tin: Room ID, Room Name, Host, Players (1/2 hoặc 2/2)
     - Nút: Refresh, Join, Back
+    
+    Mỗi dòng có iid = room id: update_rooms() / apply_room_event() chỉ sửa
+    dòng thay đổi (giữ nguyên dòng đang chọn và vị trí cuộn)
     """
     
     def __init__(self, parent):
@@ -146,20 +149,48 @@ class RoomListView:
                    Mỗi dict có keys: id, room_name, host_username, 
                    current_players, max_players
         
-        Xóa dữ liệu cũ và thêm dữ liệu mới vào Treeview
+        So với các dòng đang có: xóa phòng không còn, sửa phòng đổi, thêm phòng mới
         """
-        # Clear existing
+        room_ids = {str(room['id']) for room in rooms}
         for item in self.tree.get_children():
-            self.tree.delete(item)
+            if item not in room_ids:
+                self.tree.delete(item)
         
-        # Add new
         for room in rooms:
-            self.tree.insert('', tk.END, values=(
-                room['id'],
-                room['room_name'],
-                room['host_username'],
-                f"{room['current_players']}/{room['max_players']}"
-            ))
+            self._set_room(room)
+    
+    def apply_room_event(self, event):
+        """Áp 1 thay đổi danh sách phòng do server push
+        
+        Args:
+            event: {'event': 'room_added' | 'room_updated' | 'room_removed', 'room': {...}}
+        """
+        room = event['room']
+        if event['event'] == 'room_removed':
+            if self.tree.exists(str(room['id'])):
+                self.tree.delete(str(room['id']))
+        else:
+            self._set_room(room)
+    
+    def _set_room(self, room):
+        """Thêm hoặc sửa dòng của 1 phòng (giữ thứ tự theo room id)"""
+        iid = str(room['id'])
+        values = (
+            room['id'],
+            room['room_name'],
+            room['host_username'],
+            f"{room['current_players']}/{room['max_players']}"
+        )
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=values)
+            return
+        
+        index = tk.END
+        for position, item in enumerate(self.tree.get_children()):
+            if int(item) > room['id']:
+                index = position
+                break
+        self.tree.insert('', index, iid=iid, values=values)
     
     def destroy(self):
         self.frame.destroy()
@@ -111,6 +111,16 @@ class RoomLobbyView:
         
         if count == 2:
             self.status_label.config(text="🎮 Starting game...", fg='#10b981')
+        else:
+            self.status_label.config(text="✅ Connected", fg='#10b981')
+    
+    def apply_status(self, status):
+        """Áp trạng thái phòng mới (từ event server push)
+        
+        Args:
+            status: Dict {'player_count', 'game_status', 'game_started'}
+        """
+        self.update_player_count(status['player_count'])
     
     def destroy(self):
         """Hủy giao diện
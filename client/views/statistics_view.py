@@ -22,11 +22,14 @@ class StatisticsViewTk:
     - Biểu đồ xu hướng độ chính xác theo thời gian
     - Biểu đồ cột Hits vs Misses
     - Biểu đồ hiệu suất trung bình
-    - Bảng 20 trận gần nhất
+    - Bảng lịch sử trận (20 trận gần nhất, cuộn xuống cuối bảng để tải thêm)
     
     Có scrollbar để cuộn xem tất cả nội dung
     """
     
+    PAGE_SIZE = 20          # Số trận mỗi lần get_recent_games
+    LOAD_MORE_AT = 0.9      # Tải trang kế khi scrollbar của bảng vượt 90%
+    
     def __init__(self, parent, user, lobby_client, on_back):
         """Khởi tạo màn hình thống kê
         
@@ -49,7 +52,11 @@ class StatisticsViewTk:
         
         self.stats = None
         self.recent_games = []
+        self.next_cursor = None      # Cursor trang lịch sử kế tiếp (None = đã hết)
+        self.loading_games = False
+        self.games_tree = None
         self.win_streak = None
+        self.charts = None           # Số liệu biểu đồ server tính sẵn (get_dashboard)
         
         # Store parent reference for resize
         self.parent_window = parent.winfo_toplevel()
@@ -144,52 +151,83 @@ class StatisticsViewTk:
     def load_data(self):
         """Lấy dữ liệu thống kê từ server
         
-        Gửi 3 requests:
-        1. get_user_stats: Thống kê tổng hợp
-           (total_games, wins, losses, win_rate, accuracy, ships_sunk, hits, misses, streak)
-        2. get_recent_games: 20 trận gần nhất
-           (opponent, result, ships_sunk, hits, misses, accuracy, streak, played_at)
-        3. get_win_streak: Chuỗi thắng hiện tại (không dùng, có thể bỏ)
+        Gửi 1 request get_dashboard, nhận về:
+        - stats: Thống kê tổng hợp
+          (total_games, wins, losses, win_rate, accuracy, ships_sunk, hits, misses, streak)
+        - streak: Chuỗi thắng hiện tại / dài nhất
+        - games + next_cursor: Trang đầu lịch sử (PAGE_SIZE trận gần nhất)
+          + cursor để tải tiếp khi cuộn bảng (load_more_games)
+        - charts: Số liệu biểu đồ server tính sẵn
+        
+        Server cũ không có get_dashboard → load_data_legacy() (3 request)
         
         Lưu vào:
         - self.stats: Dict thống kê tổng
-        - self.recent_games: List 20 trận
+        - self.recent_games: List các trận đã tải
+        - self.next_cursor: Cursor trang kế tiếp
         - self.win_streak: Chuỗi thắng
+        - self.charts: Số liệu biểu đồ (None → tự tính từ stats/recent_games)
         """
         if self.lobby_client:
             try:
-                print(f"[STATS TK] Requesting user stats for user_id={self.user['id']}")
-                
-                # Get user stats
-                stats_response = self.lobby_client.send_data_to_server({
-                    'request': 'get_user_stats',
-                    'user_id': self.user['id']
-                })
-                self.stats = stats_response.get('stats')
-                print(f"[STATS TK] Stats: {self.stats}")
+                print(f"[STATS TK] Requesting dashboard for user_id={self.user['id']}")
                 
-                # Get recent games
-                games_response = self.lobby_client.send_data_to_server({
-                    'request': 'get_recent_games',
+                response = self.lobby_client.send_data_to_server({
+                    'request': 'get_dashboard',
                     'user_id': self.user['id'],
-                    'limit': 20
+                    'limit': self.PAGE_SIZE
                 })
-                self.recent_games = games_response.get('games', [])
-                print(f"[STATS TK] Recent games: {len(self.recent_games)} games")
+                dashboard = response.get('dashboard') if response else None
+                if dashboard is None:
+                    self.load_data_legacy()
+                    return
                 
-                # Get win streak
-                streak_response = self.lobby_client.send_data_to_server({
-                    'request': 'get_win_streak',
-                    'user_id': self.user['id']
-                })
-                self.win_streak = streak_response.get('streak')
-                print(f"[STATS TK] Win streak: {self.win_streak}")
+                self.stats = dashboard.get('stats')
+                self.win_streak = dashboard.get('streak')
+                self.recent_games = dashboard.get('games', [])
+                self.next_cursor = dashboard.get('next_cursor')
+                self.charts = dashboard.get('charts')
+                print(f"[STATS TK] Stats: {self.stats}")
+                print(f"[STATS TK] Recent games: {len(self.recent_games)} games")
                 
             except Exception as e:
                 print(f"[ERROR] Failed to load statistics: {e}")
                 import traceback
                 traceback.print_exc()
     
+    def load_data_legacy(self):
+        """Lấy dữ liệu bằng 3 request riêng (server chưa hỗ trợ get_dashboard)
+        
+        1. get_user_stats: Thống kê tổng hợp
+        2. get_recent_games: Trang đầu lịch sử
+        3. get_win_streak: Chuỗi thắng hiện tại / dài nhất
+        """
+        # Get user stats
+        stats_response = self.lobby_client.send_data_to_server({
+            'request': 'get_user_stats',
+            'user_id': self.user['id']
+        })
+        self.stats = stats_response.get('stats')
+        print(f"[STATS TK] Stats: {self.stats}")
+        
+        # Get recent games
+        games_response = self.lobby_client.send_data_to_server({
+            'request': 'get_recent_games',
+            'user_id': self.user['id'],
+            'limit': self.PAGE_SIZE
+        })
+        self.recent_games = games_response.get('games', [])
+        self.next_cursor = games_response.get('next_cursor')
+        print(f"[STATS TK] Recent games: {len(self.recent_games)} games")
+        
+        # Get win streak
+        streak_response = self.lobby_client.send_data_to_server({
+            'request': 'get_win_streak',
+            'user_id': self.user['id']
+        })
+        self.win_streak = streak_response.get('streak')
+        print(f"[STATS TK] Win streak: {self.win_streak}")
+    
     
     def build_ui(self):
         """Xây dựng giao diện với thiết kế hiện đại
@@ -203,7 +241,7 @@ class StatisticsViewTk:
         3. Charts row 1: Win/Loss Pie + Performance Radar
         4. Charts row 2: Accuracy Trend Over Time (nếu >= 3 trận)
         5. Charts row 3: Hits vs Misses + Performance Breakdown
-        6. Recent games table: Bảng 20 trận gần nhất
+        6. Recent games table: Bảng lịch sử trận (tải thêm khi cuộn)
         7. Back button: Quay về trang chủ
         """
         # Header with gradient background
@@ -498,21 +536,26 @@ class StatisticsViewTk:
         # Metrics for radar (3 dimensions) - ⭐⭐⭐⭐⭐
         categories = ['Accuracy', 'Win Rate', 'Efficiency']
         
-        # 1. Accuracy: hits / (hits + misses) - Kỹ năng ngắm bắn
-        accuracy = float(self.stats['avg_accuracy'])  # Already calculated as percentage
-        
-        # 2. Win Rate: wins / total_games - Mục tiêu cuối cùng
-        win_rate = (total_wins / total_games) * 100
-        
-        # 3. Efficiency: ships_sunk / hits - Khả năng hoàn thiện công việc sau khi trúng
-        # Scale to percentage: perfect efficiency = 1 ship per 5 hits (20%) = 100%
-        if total_hits > 0:
-            raw_efficiency = (total_ships_sunk / total_hits) * 100  # Convert to percentage
-            efficiency = min(raw_efficiency * 5, 100)  # Scale so 20% = 100%
+        if self.charts:
+            # Server đã tính sẵn (cùng công thức bên dưới)
+            radar = self.charts['radar']
+            values = [radar['accuracy'], radar['win_rate'], radar['efficiency']]
         else:
-            efficiency = 0
-        
-        values = [accuracy, win_rate, efficiency]
+            # 1. Accuracy: hits / (hits + misses) - Kỹ năng ngắm bắn
+            accuracy = float(self.stats['avg_accuracy'])  # Already calculated as percentage
+            
+            # 2. Win Rate: wins / total_games - Mục tiêu cuối cùng
+            win_rate = (total_wins / total_games) * 100
+            
+            # 3. Efficiency: ships_sunk / hits - Khả năng hoàn thiện công việc sau khi trúng
+            # Scale to percentage: perfect efficiency = 1 ship per 5 hits (20%) = 100%
+            if total_hits > 0:
+                raw_efficiency = (total_ships_sunk / total_hits) * 100  # Convert to percentage
+                efficiency = min(raw_efficiency * 5, 100)  # Scale so 20% = 100%
+            else:
+                efficiency = 0
+            
+            values = [accuracy, win_rate, efficiency]
         
         # Number of variables
         num_vars = len(categories)
@@ -590,22 +633,17 @@ class StatisticsViewTk:
         ax = fig.add_subplot(111)
         ax.set_facecolor('#0f172a')
         
-        # Lấy dữ liệu từ recent games (reversed để hiển thị theo thời gian)
-        games = list(reversed(self.recent_games[:20]))  # 20 trận cuối theo thời gian
-        game_numbers = list(range(1, len(games) + 1))
-        
-        # Chuẩn bị dữ liệu: Win = 1, Loss = 0
-        results = []
-        win_positions = []
-        loss_positions = []
+        # Chuẩn bị dữ liệu: Win = 1, Loss = 0, theo thời gian (20 trận cuối)
+        if self.charts:
+            results = list(self.charts['recent_results'])
+        else:
+            # Lấy dữ liệu từ recent games (reversed để hiển thị theo thời gian)
+            games = list(reversed(self.recent_games[:20]))
+            results = [1 if game['result'] == 'win' else 0 for game in games]
+        game_numbers = list(range(1, len(results) + 1))
         
-        for i, game in enumerate(games, 1):
-            if game['result'] == 'win':
-                results.append(1)
-                win_positions.append(i)
-            else:
-                results.append(0)
-                loss_positions.append(i)
+        win_positions = [i for i, result in enumerate(results, 1) if result]
+        loss_positions = [i for i, result in enumerate(results, 1) if not result]
         
         # Vẽ điểm Wins (xanh lá)
         if win_positions:
@@ -624,8 +662,11 @@ class StatisticsViewTk:
                alpha=0.5, linestyle='--', zorder=1)
         
         # Tính win rate trong 20 trận này
-        win_count = sum(results)
-        recent_win_rate = (win_count / len(results)) * 100 if results else 0
+        if self.charts:
+            recent_win_rate = self.charts['recent_win_rate']
+        else:
+            win_count = sum(results)
+            recent_win_rate = (win_count / len(results)) * 100 if results else 0
         
         # Thêm text hiển thị win rate
         ax.text(0.02, 0.98, f'Win Rate (20 trận gần nhất): {recent_win_rate:.1f}%',
@@ -778,8 +819,12 @@ class StatisticsViewTk:
         total_ships_sunk = float(self.stats['total_ships_sunk'])
         total_hits = float(self.stats['total_hits'])
         
-        avg_ships_per_game = total_ships_sunk / total_games if total_games > 0 else 0
-        avg_hits_per_game = total_hits / total_games if total_games > 0 else 0
+        if self.charts:
+            avg_ships_per_game = self.charts['per_game']['avg_ships']
+            avg_hits_per_game = self.charts['per_game']['avg_hits']
+        else:
+            avg_ships_per_game = total_ships_sunk / total_games if total_games > 0 else 0
+            avg_hits_per_game = total_hits / total_games if total_games > 0 else 0
         
         # Bar chart with two metrics
         categories = ['Avg Ships\nper Game', 'Avg Hits\nper Game']
@@ -819,7 +864,7 @@ class StatisticsViewTk:
     
     
     def create_modern_games_table(self):
-        """Tạo bảng 20 trận đấu gần nhất với thiết kế hiện đại
+        """Tạo bảng lịch sử trận đấu với thiết kế hiện đại
         
         Treeview (bảng) với 6 cột:
         1. 📅 Date: Ngày giờ chơi (played_at) - Format: YYYY-MM-DD HH:MM
@@ -837,7 +882,7 @@ class StatisticsViewTk:
         - Nền tối (#0f172a)
         - Header xanh dương (#60a5fa)
         - Hover highlight xanh (#3b82f6)
-        - Scrollbar để xem tất cả 20 trận
+        - Scrollbar để xem các trận đã tải, cuộn gần cuối → load_more_games()
         
         Hiển thị trận mới nhất ở trên cùng
         """
@@ -900,7 +945,51 @@ class StatisticsViewTk:
         tree.column('Streak', width=80, anchor=tk.CENTER)
         
         # Add data
-        for game in self.recent_games[:20]:  # Show 20 most recent
+        self.games_tree = tree
+        self.insert_games(self.recent_games)
+        
+        # Configure tags
+        tree.tag_configure('win', foreground='#10b981', font=('Segoe UI', 10, 'bold'))
+        tree.tag_configure('loss', foreground='#ef4444', font=('Segoe UI', 10, 'bold'))
+        
+        # Bind double-click event to show opponent info
+        def on_row_double_click(event):
+            """Xử lý double-click vào row để hiển thị thông tin đối thủ"""
+            item = tree.selection()
+            if item:
+                values = tree.item(item[0], 'values')
+                if values and len(values) >= 2:
+                    opponent_username = values[1]  # Column 1 is Opponent
+                    print(f"[STATS VIEW] Double-clicked on opponent: {opponent_username}")
+                    self.show_opponent_info(opponent_username)
+        
+        tree.bind('<Double-Button-1>', on_row_double_click)
+        
+        # Scrollbar (cuộn gần cuối bảng → tải trang kế tiếp)
+        scrollbar = ttk.Scrollbar(table_container, orient=tk.VERTICAL, command=tree.yview)
+        
+        def on_tree_scroll(first, last):
+            scrollbar.set(first, last)
+            if float(last) >= self.LOAD_MORE_AT and self.next_cursor and not self.loading_games:
+                self.loading_games = True
+                tree.after_idle(self.load_more_games)
+        
+        tree.configure(yscroll=on_tree_scroll)
+        
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
+    
+    def insert_games(self, games):
+        """Thêm các trận vào cuối bảng lịch sử
+        
+        Args:
+            games: List trận (từ get_recent_games), mới nhất trước
+        
+        Format date: YYYY-MM-DD HH:MM, WIN/LOSS kèm tag màu
+        """
+        from datetime import datetime
+        
+        for game in games:
             result = game['result'].upper()
             result_display = f"{'✓ ' if result == 'WIN' else '✗ '}{result}"
             result_tag = 'win' if result == 'WIN' else 'loss'
@@ -909,7 +998,6 @@ class StatisticsViewTk:
             date_str = game.get('played_at', '')
             if date_str:
                 try:
-                    from datetime import datetime
                     dt = datetime.fromisoformat(str(date_str).replace('Z', '+00:00'))
                     date_display = dt.strftime('%Y-%m-%d %H:%M')
                 except:
@@ -917,7 +1005,7 @@ class StatisticsViewTk:
             else:
                 date_display = 'N/A'
             
-            tree.insert('', tk.END, values=(
+            self.games_tree.insert('', tk.END, values=(
                 date_display,
                 game['opponent_username'][:12],
                 result_display,
@@ -925,30 +1013,38 @@ class StatisticsViewTk:
                 f"{game['accuracy']:.1f}%",
                 int(game['max_streak'])
             ), tags=(result_tag,))
+    
+    def load_more_games(self):
+        """Tải trang lịch sử kế tiếp (gọi khi cuộn gần cuối bảng)
         
-        # Configure tags
-        tree.tag_configure('win', foreground='#10b981', font=('Segoe UI', 10, 'bold'))
-        tree.tag_configure('loss', foreground='#ef4444', font=('Segoe UI', 10, 'bold'))
-        
-        # Bind double-click event to show opponent info
-        def on_row_double_click(event):
-            """Xử lý double-click vào row để hiển thị thông tin đối thủ"""
-            item = tree.selection()
-            if item:
-                values = tree.item(item[0], 'values')
-                if values and len(values) >= 2:
-                    opponent_username = values[1]  # Column 1 is Opponent
-                    print(f"[STATS VIEW] Double-clicked on opponent: {opponent_username}")
-                    self.show_opponent_info(opponent_username)
-        
-        tree.bind('<Double-Button-1>', on_row_double_click)
-        
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(table_container, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
-        
-        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
+        Gửi get_recent_games kèm next_cursor của trang trước, thêm kết quả vào
+        cuối bảng và self.recent_games
+        Hết lịch sử (next_cursor = None) hoặc lỗi → không tải nữa
+        """
+        try:
+            if not self.next_cursor or not self.lobby_client or not self.games_tree:
+                return
+            
+            response = self.lobby_client.send_data_to_server({
+                'request': 'get_recent_games',
+                'user_id': self.user['id'],
+                'limit': self.PAGE_SIZE,
+                'cursor': self.next_cursor
+            })
+            if not response or 'games' not in response:
+                self.next_cursor = None
+                return
+            
+            games = response.get('games', [])
+            self.next_cursor = response.get('next_cursor')
+            self.recent_games.extend(games)
+            self.insert_games(games)
+            print(f"[STATS TK] Loaded {len(games)} more games ({len(self.recent_games)} total)")
+        except Exception as e:
+            print(f"[STATS TK] Error loading more games: {e}")
+            self.next_cursor = None
+        finally:
+            self.loading_games = False
     
     def _on_window_resize(self, event):
         """Xử lý khi cửa sổ thay đổi kích thước
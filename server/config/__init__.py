@@ -1 +1,2 @@
-from .db_config import DB_CONFIG, POOL_CONFIG
+from .db_config import DB_BACKEND, DB_CONFIG, POOL_CONFIG, SQLITE_CONFIG
+from .server_config import SERVER_CONFIG
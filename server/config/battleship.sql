@@ -127,6 +127,35 @@ INSERT INTO `game_history` (`id`, `user_id`, `opponent_id`, `result`, `ships_sun
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `user_stats`
+--
+
+CREATE TABLE `user_stats` (
+  `user_id` int NOT NULL,
+  `total_games` int NOT NULL DEFAULT '0',
+  `wins` int NOT NULL DEFAULT '0',
+  `losses` int NOT NULL DEFAULT '0',
+  `total_ships_sunk` int NOT NULL DEFAULT '0',
+  `total_hits` int NOT NULL DEFAULT '0',
+  `total_misses` int NOT NULL DEFAULT '0',
+  `accuracy_sum` decimal(12,2) NOT NULL DEFAULT '0.00',
+  `best_streak` int NOT NULL DEFAULT '0',
+  `current_win_streak` int NOT NULL DEFAULT '0',
+  `longest_win_streak` int NOT NULL DEFAULT '0',
+  `last_played_at` timestamp NULL DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+--
+-- Dumping data for table `user_stats`
+--
+
+INSERT INTO `user_stats` (`user_id`, `total_games`, `wins`, `losses`, `total_ships_sunk`, `total_hits`, `total_misses`, `accuracy_sum`, `best_streak`, `current_win_streak`, `longest_win_streak`, `last_played_at`) VALUES
+(1, 40, 19, 21, 2, 66, 10, 650.00, 17, 0, 9, '2025-12-12 06:27:02'),
+(2, 39, 16, 23, 16, 9, 13, 155.83, 5, 2, 6, '2025-12-12 06:27:04');
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `users`
 --
@@ -159,11 +188,19 @@ INSERT INTO `users` (`id`, `username`, `password`, `is_online`, `created_at`) VA
 --
 ALTER TABLE `game_history`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `idx_user_id` (`user_id`),
+  ADD KEY `idx_user_played_at` (`user_id`,`played_at`,`id`),
   ADD KEY `idx_opponent_id` (`opponent_id`),
   ADD KEY `idx_result` (`result`),
   ADD KEY `idx_played_at` (`played_at`);
 
+--
+-- Indexes for table `user_stats`
+--
+ALTER TABLE `user_stats`
+  ADD PRIMARY KEY (`user_id`),
+  ADD KEY `idx_wins` (`wins`,`total_games`),
+  ADD KEY `idx_longest_win_streak` (`longest_win_streak`);
+
 --
 -- Indexes for table `users`
 --
@@ -198,6 +235,12 @@ ALTER TABLE `users`
 ALTER TABLE `game_history`
   ADD CONSTRAINT `game_history_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
   ADD CONSTRAINT `game_history_ibfk_2` FOREIGN KEY (`opponent_id`) REFERENCES `users` (`id`) ON DELETE CASCADE;
+
+--
+-- Constraints for table `user_stats`
+--
+ALTER TABLE `user_stats`
+  ADD CONSTRAINT `user_stats_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE;
 COMMIT;
 
 /*!40101 SET CHARACTER_SET_CLIENT=@OLD_CHARACTER_SET_CLIENT */;
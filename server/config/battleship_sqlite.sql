@@ -0,0 +1,66 @@
+-- SQLite schema (DB_BACKEND = 'sqlite')
+-- Cùng bảng/cột với battleship.sql (MySQL), SQLiteBackend chạy file này
+-- khi mở database lần đầu; IF NOT EXISTS nên chạy lại nhiều lần vẫn an toàn
+
+CREATE TABLE IF NOT EXISTS users (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  username TEXT NOT NULL UNIQUE,
+  password TEXT NOT NULL,
+  is_online INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS game_history (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  opponent_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  result TEXT NOT NULL CHECK (result IN ('win', 'lose')),
+  ships_sunk INTEGER DEFAULT 0,
+  hits INTEGER DEFAULT 0,
+  misses INTEGER DEFAULT 0,
+  accuracy REAL DEFAULT 0,
+  max_streak INTEGER DEFAULT 0,
+  played_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_played_at ON game_history (user_id, played_at, id);
+CREATE INDEX IF NOT EXISTS idx_opponent_id ON game_history (opponent_id);
+CREATE INDEX IF NOT EXISTS idx_played_at ON game_history (played_at);
+
+CREATE TABLE IF NOT EXISTS user_stats (
+  user_id INTEGER PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+  total_games INTEGER NOT NULL DEFAULT 0,
+  wins INTEGER NOT NULL DEFAULT 0,
+  losses INTEGER NOT NULL DEFAULT 0,
+  total_ships_sunk INTEGER NOT NULL DEFAULT 0,
+  total_hits INTEGER NOT NULL DEFAULT 0,
+  total_misses INTEGER NOT NULL DEFAULT 0,
+  accuracy_sum REAL NOT NULL DEFAULT 0,
+  best_streak INTEGER NOT NULL DEFAULT 0,
+  current_win_streak INTEGER NOT NULL DEFAULT 0,
+  longest_win_streak INTEGER NOT NULL DEFAULT 0,
+  last_played_at TIMESTAMP NULL DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_wins ON user_stats (wins, total_games);
+CREATE INDEX IF NOT EXISTS idx_longest_win_streak ON user_stats (longest_win_streak);
+
+-- Bảng của RoomModel
+CREATE TABLE IF NOT EXISTS rooms (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  room_name TEXT NOT NULL,
+  host_user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  max_players INTEGER NOT NULL DEFAULT 2,
+  current_players INTEGER NOT NULL DEFAULT 0,
+  status TEXT NOT NULL DEFAULT 'waiting',
+  winner_id INTEGER NULL REFERENCES users (id) ON DELETE SET NULL,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  started_at TIMESTAMP NULL DEFAULT NULL,
+  finished_at TIMESTAMP NULL DEFAULT NULL
+);
+
+CREATE TABLE IF NOT EXISTS room_players (
+  room_id INTEGER NOT NULL REFERENCES rooms (id) ON DELETE CASCADE,
+  user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (room_id, user_id)
+);
@@ -2,8 +2,10 @@
 Database configuration file
 Update these settings to match your MySQL server configuration
 """
-import mysql.connector
-from mysql.connector import pooling
+# Backend lưu trữ (models/storage.py):
+# 'mysql': MySQL server theo DB_CONFIG + POOL_CONFIG
+# 'sqlite': 1 file SQLite nhúng theo SQLITE_CONFIG (máy đơn, CI, load test)
+DB_BACKEND = 'mysql'
 
 DB_CONFIG = {
     'host': 'localhost',
@@ -15,15 +17,27 @@ DB_CONFIG = {
     'autocommit': False
 }
 
-# Connection pool settings
+# Connection pool settings (models/base_model.py ConnectionPool)
+# Engine threaded: mỗi client 1 thread, đều có thể query → pool_size nên >= số
+# request database đồng thời mong đợi; engine asyncio: >= executor_workers + 1 (history writer)
 POOL_CONFIG = {
     'pool_name': 'battleship_pool',
-    'pool_size': 5,
-    'pool_reset_session': True
+    'pool_size': 16,
+    'pool_timeout': 5.0,     # Giây chờ connection rảnh trước khi báo PoolExhaustedError
+    'ping_interval': 30.0    # Connection rảnh lâu hơn → ping (tự reconnect) trước khi dùng
+}
+
+# SQLite settings (models/sqlite_backend.py SQLiteBackend)
+SQLITE_CONFIG = {
+    'path': 'battleship.db',     # Đường dẫn file, tương đối với thư mục chạy server
+    'timeout': 5.0,              # Giây chờ khóa ghi trước khi báo "database is locked"
+    'cached_statements': 256     # Số prepared statement giữ lại mỗi connection
 }
 
 def get_db_connection():
-    """Create and return a database connection"""
+    """Create and return a MySQL connection (dùng cho script migration)"""
+    import mysql.connector
+    
     try:
         connection = mysql.connector.connect(**DB_CONFIG)
         return connection
@@ -0,0 +1,15 @@
+-- Migration: Add game_history paging index
+-- Run this SQL in your MySQL database (hoặc: python config/run_migration.py)
+-- get_recent_games phân trang theo keyset (played_at, id) của từng user:
+-- index này cho mỗi trang là 1 lần quét dải index, không OFFSET, không filesort
+
+USE battleship;
+
+ALTER TABLE `game_history`
+  ADD KEY `idx_user_played_at` (`user_id`,`played_at`,`id`);
+
+-- idx_user_id trở thành thừa (là prefix của idx_user_played_at), có thể bỏ:
+-- ALTER TABLE `game_history` DROP KEY `idx_user_id`;
+
+-- Verify the changes
+SHOW INDEX FROM `game_history`;
@@ -0,0 +1,48 @@
+-- Migration: Create user_stats aggregate table
+-- Run this SQL in your MySQL database (hoặc: python config/run_migration.py)
+-- GameHistoryModel cập nhật bảng này cùng transaction với mỗi dòng game_history,
+-- thống kê người chơi chỉ còn là 1 lần đọc theo khóa chính
+
+USE battleship;
+
+CREATE TABLE IF NOT EXISTS `user_stats` (
+  `user_id` int NOT NULL,
+  `total_games` int NOT NULL DEFAULT '0',
+  `wins` int NOT NULL DEFAULT '0',
+  `losses` int NOT NULL DEFAULT '0',
+  `total_ships_sunk` int NOT NULL DEFAULT '0',
+  `total_hits` int NOT NULL DEFAULT '0',
+  `total_misses` int NOT NULL DEFAULT '0',
+  `accuracy_sum` decimal(12,2) NOT NULL DEFAULT '0.00',
+  `best_streak` int NOT NULL DEFAULT '0',
+  `current_win_streak` int NOT NULL DEFAULT '0',
+  `longest_win_streak` int NOT NULL DEFAULT '0',
+  `last_played_at` timestamp NULL DEFAULT NULL,
+  PRIMARY KEY (`user_id`),
+  KEY `idx_wins` (`wins`,`total_games`),
+  KEY `idx_longest_win_streak` (`longest_win_streak`),
+  CONSTRAINT `user_stats_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Backfill tổng từ lịch sử hiện có
+-- (current_win_streak / longest_win_streak: chạy thêm python tools/backfill_user_stats.py)
+INSERT INTO user_stats
+    (user_id, total_games, wins, losses, total_ships_sunk, total_hits, total_misses,
+     accuracy_sum, best_streak, last_played_at)
+SELECT
+    user_id,
+    COUNT(*),
+    SUM(CASE WHEN result = 'win' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN result = 'lose' THEN 1 ELSE 0 END),
+    COALESCE(SUM(ships_sunk), 0),
+    COALESCE(SUM(hits), 0),
+    COALESCE(SUM(misses), 0),
+    COALESCE(SUM(accuracy), 0),
+    COALESCE(MAX(max_streak), 0),
+    MAX(played_at)
+FROM game_history
+GROUP BY user_id
+ON DUPLICATE KEY UPDATE user_id = user_stats.user_id;
+
+-- Verify the changes
+SELECT * FROM user_stats;
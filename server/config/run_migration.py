@@ -1,6 +1,8 @@
 """
 Database Migration Script
 Adds statistics columns to users table
+Creates and backfills the user_stats aggregate table
+Adds the (user_id, played_at, id) index used to page game_history
 """
 import sys
 import os
@@ -99,6 +101,109 @@ def run_migration():
     
     return True
 
+def add_index(cursor, table, index_name, columns):
+    """ALTER TABLE ADD KEY nếu index chưa có (chạy lại nhiều lần vẫn an toàn)"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"ALTER TABLE `{table}` ADD KEY `{index_name}` ({columns})")
+        print(f"✅ Added index {table}.{index_name}")
+
+def run_user_stats_migration():
+    """Tạo bảng user_stats và backfill từ game_history (chạy lại nhiều lần vẫn an toàn)"""
+    
+    print("🔄 Creating user_stats table...")
+    
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS `user_stats` (
+              `user_id` int NOT NULL,
+              `total_games` int NOT NULL DEFAULT '0',
+              `wins` int NOT NULL DEFAULT '0',
+              `losses` int NOT NULL DEFAULT '0',
+              `total_ships_sunk` int NOT NULL DEFAULT '0',
+              `total_hits` int NOT NULL DEFAULT '0',
+              `total_misses` int NOT NULL DEFAULT '0',
+              `accuracy_sum` decimal(12,2) NOT NULL DEFAULT '0.00',
+              `best_streak` int NOT NULL DEFAULT '0',
+              `current_win_streak` int NOT NULL DEFAULT '0',
+              `longest_win_streak` int NOT NULL DEFAULT '0',
+              `last_played_at` timestamp NULL DEFAULT NULL,
+              PRIMARY KEY (`user_id`),
+              KEY `idx_wins` (`wins`,`total_games`),
+              KEY `idx_longest_win_streak` (`longest_win_streak`),
+              CONSTRAINT `user_stats_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """)
+        
+        # Bảng tạo bởi bản migration trước chưa có index xếp hạng
+        add_index(cursor, 'user_stats', 'idx_wins', '`wins`,`total_games`')
+        add_index(cursor, 'user_stats', 'idx_longest_win_streak', '`longest_win_streak`')
+        
+        print("📊 Backfilling user_stats from game_history...")
+        
+        # User đã có dòng user_stats giữ nguyên (đã được cập nhật theo từng trận)
+        cursor.execute("""
+            INSERT INTO user_stats
+                (user_id, total_games, wins, losses, total_ships_sunk, total_hits, total_misses,
+                 accuracy_sum, best_streak, last_played_at)
+            SELECT
+                user_id,
+                COUNT(*),
+                SUM(CASE WHEN result = 'win' THEN 1 ELSE 0 END),
+                SUM(CASE WHEN result = 'lose' THEN 1 ELSE 0 END),
+                COALESCE(SUM(ships_sunk), 0),
+                COALESCE(SUM(hits), 0),
+                COALESCE(SUM(misses), 0),
+                COALESCE(SUM(accuracy), 0),
+                COALESCE(MAX(max_streak), 0),
+                MAX(played_at)
+            FROM game_history
+            GROUP BY user_id
+            ON DUPLICATE KEY UPDATE user_id = user_stats.user_id
+        """)
+        
+        connection.commit()
+        print(f"✅ user_stats ready ({cursor.rowcount} rows backfilled)")
+        print("ℹ️  Win streaks: run python tools/backfill_user_stats.py")
+        
+        cursor.close()
+        connection.close()
+        
+    except mysql.connector.Error as e:
+        print(f"❌ user_stats migration failed: {e}")
+        return False
+    
+    return True
+
+def run_history_index_migration():
+    """Index (user_id, played_at, id) cho phân trang lịch sử trận theo keyset"""
+    
+    print("🔄 Adding game_history paging index...")
+    
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        
+        add_index(cursor, 'game_history', 'idx_user_played_at', '`user_id`,`played_at`,`id`')
+        connection.commit()
+        
+        cursor.close()
+        connection.close()
+        
+    except mysql.connector.Error as e:
+        print(f"❌ game_history index migration failed: {e}")
+        return False
+    
+    return True
+
 if __name__ == "__main__":
-    success = run_migration()
+    success = run_migration() is not False
+    success = run_user_stats_migration() and success
+    success = run_history_index_migration() and success
     sys.exit(0 if success else 1)
@@ -0,0 +1,34 @@
+"""
+Server configuration file
+Chọn engine mạng và các thông số lắng nghe của RoomServer
+"""
+
+SERVER_CONFIG = {
+    'host': 'localhost',
+    'port': 65432,
+    # 'threaded': 1 thread cho mỗi kết nối (mặc định)
+    # 'asyncio': 1 event loop cho mọi kết nối
+    # Cả 2 engine chạy request database trong thread pool riêng (networking/db_executor.py)
+    'engine': 'threaded',
+    'backlog': 128,          # Hàng đợi accept của engine asyncio
+    'executor_workers': 8,   # Số thread xử lý request database
+    'executor_queue_size': 64,  # Số request database chờ tối đa, quá → trả 'Server busy' ngay
+    'session_ttl': 3600,     # Giây token đăng nhập còn hiệu lực kể từ lần dùng cuối
+    # Ghi game_history theo batch ở thread nền
+    'history_batch_size': 50,        # Số dòng game_history tối đa mỗi transaction (2 dòng/trận)
+    'history_flush_interval': 0.5,   # Giây chờ gom batch sau trận đầu tiên trong hàng đợi
+    # Hàng đợi đầy → record_match (thread kết thúc trận) chờ tối đa 2 giây,
+    # vẫn đầy thì ghi đồng bộ trận đó ngay trên thread này (không mất trận)
+    'history_queue_size': 1000,
+    # Cache thống kê người chơi (models/cache.py), xóa theo user mỗi khi ghi trận
+    'stats_cache_size': 2048,        # Số kết quả query tối đa (LRU)
+    'stats_cache_ttl': 300,          # Giây 1 kết quả được dùng lại
+    'history_page_max': 50,          # Số trận tối đa mỗi trang get_recent_games (lấy tiếp bằng cursor)
+    # Bảng xếp hạng trong bộ nhớ (models/leaderboard.py)
+    'leaderboard_min_games': 10,     # Số trận tối thiểu để có mặt trong bảng win_rate
+    'leaderboard_max_limit': 100,    # Số người tối đa mỗi request get_leaderboard
+    # Trạng thái online trong bộ nhớ (networking/presence.py)
+    'presence_grace': 30,            # Giây vẫn tính online sau khi mất kết nối cuối cùng
+    'presence_flush_interval': 5,    # Giây giữa 2 lần ghi users.is_online theo batch
+    'online_users_max': 200          # Số người tối đa mỗi request get_online_users
+}
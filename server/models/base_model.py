@@ -2,63 +2,92 @@
 Base Database Model
 Provides common database connection and query methods
 """
-import mysql.connector
-from mysql.connector import Error, pooling
-from config.db_config import DB_CONFIG, POOL_CONFIG
 import logging
+from contextlib import contextmanager
+from threading import Lock
+from typing import Optional, Tuple
+
+from config.db_config import DB_BACKEND
+from models.storage import StorageBackend, create_backend
 
 logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S')
 logging.root.setLevel(logging.INFO)
 
 
 class Database:
-    """Singleton database connection pool
+    """Singleton storage backend
     
-    Quản lý connection pool MySQL:
-    - Tạo pool khi lần đầu gọi get_pool()
+    Quản lý backend lưu trữ (models/storage.py):
+    - Tạo backend khi lần đầu gọi get_backend(), chọn theo DB_BACKEND
+      ('mysql': connection pool, 'sqlite': file nhúng, 1 connection/thread)
     - Tái sử dụng connection (tránh tạo mới mỗi lần query)
     - Thread-safe cho server multi-threading
     
-    Config: Lấy từ config/db_config.py
+    Config: Lấy từ config/db_config.py (DB_BACKEND, DB_CONFIG, POOL_CONFIG, SQLITE_CONFIG)
     """
-    _connection_pool = None
+    _backend: Optional[StorageBackend] = None
+    _backend_lock = Lock()
 
     @classmethod
-    def get_pool(cls):
-        """Lấy hoặc tạo connection pool
+    def get_backend(cls) -> StorageBackend:
+        """Lấy hoặc tạo backend
         
         Returns:
-            MySQLConnectionPool instance
+            StorageBackend instance
         
-        Singleton pattern: Chỉ tạo 1 pool duy nhất
+        Singleton pattern: Chỉ tạo 1 backend duy nhất
         """
-        if cls._connection_pool is None:
-            try:
-                cls._connection_pool = pooling.MySQLConnectionPool(
-                    **POOL_CONFIG,
-                    **DB_CONFIG
-                )
-                logging.info("Database connection pool created successfully")
-            except Error as e:
-                logging.error(f"Error creating connection pool: {e}")
-                raise
-        return cls._connection_pool
+        if cls._backend is None:
+            with cls._backend_lock:
+                if cls._backend is None:
+                    cls._backend = create_backend(DB_BACKEND)
+        return cls._backend
+
+    @classmethod
+    def use_backend(cls, backend: StorageBackend) -> None:
+        """Thay backend (load test, chạy thử) - gọi trước query đầu tiên"""
+        with cls._backend_lock:
+            cls._backend = backend
 
     @classmethod
     def get_connection(cls):
-        """Lấy 1 connection từ pool
+        """Lấy 1 connection từ backend
         
         Returns:
-            MySQL connection object
+            Connection có API giống mysql.connector
         
-        Lưu ý: Nhớ close() connection sau khi dùng xong
+        Lưu ý: Nhớ close() connection sau khi dùng xong (trả về pool)
         """
+        backend = cls.get_backend()
         try:
-            return cls.get_pool().get_connection()
-        except Error as e:
-            logging.error(f"Error getting connection from pool: {e}")
+            return backend.get_connection()
+        except backend.errors as e:
+            logging.error(f"Error getting database connection: {e}")
             raise
 
+    @classmethod
+    def dialect(cls) -> str:
+        """Tên dialect SQL của backend ('mysql' | 'sqlite')"""
+        return cls.get_backend().name
+
+    @classmethod
+    def errors(cls) -> Tuple[type, ...]:
+        """Exception của driver đang dùng"""
+        return cls.get_backend().errors
+
+    @classmethod
+    def stats(cls) -> Optional[dict]:
+        """Thống kê backend (None nếu chưa có query nào tạo backend)"""
+        backend = cls._backend
+        return backend.stats() if backend else None
+
+    @classmethod
+    def close(cls) -> None:
+        """Đóng connection rảnh khi tắt server"""
+        backend = cls._backend
+        if backend:
+            backend.close()
+
 
 class BaseModel:
     """Base model class với các database operations chung
@@ -66,6 +95,7 @@ class BaseModel:
     Cung cấp:
     - execute_query(): Thực thi query (SELECT/INSERT/UPDATE/DELETE)
     - execute_many(): Thực thi nhiều query cùng lúc (bulk insert)
+    - transaction(): Nhiều câu lệnh trên 1 connection, commit/rollback cùng nhau
     
     Kế thừa: UserModel, RoomModel, GameHistoryModel kế thừa class này
     """
@@ -128,7 +158,7 @@ class BaseModel:
             
             return None
             
-        except Error as e:
+        except Database.errors() as e:
             if connection:
                 connection.rollback()
             logging.error(f"Database error: {e}")
@@ -169,11 +199,57 @@ class BaseModel:
             
             return cursor.rowcount
             
-        except Error as e:
+        except Database.errors() as e:
+            if connection:
+                connection.rollback()
+            logging.error(f"Database error: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    @staticmethod
+    @contextmanager
+    def transaction(snapshot: bool = False):
+        """Mở 1 transaction, commit khi khối with kết thúc bình thường
+        
+        Args:
+            snapshot: True = BEGIN ngay từ đầu, mọi câu SELECT trong khối đọc cùng
+                1 snapshot (SQLite không tự mở transaction cho SELECT, MySQL
+                mở với consistent snapshot)
+        
+        Yields:
+            Cursor (dictionary=True) trên 1 connection của pool
+        
+        Ví dụ:
+            with BaseModel.transaction() as cursor:
+                cursor.executemany("INSERT INTO game_history ...", rows)
+                cursor.executemany("INSERT INTO user_stats ... ON DUPLICATE KEY UPDATE ...", stats)
+            # → Cả 2 câu cùng commit, lỗi ở câu nào thì rollback hết
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = Database.get_connection()
+            if snapshot:
+                connection.start_transaction(consistent_snapshot=True)
+            cursor = connection.cursor(dictionary=True)
+            
+            yield cursor
+            
+            connection.commit()
+            
+        except Database.errors() as e:
             if connection:
                 connection.rollback()
             logging.error(f"Database error: {e}")
             raise
+        except Exception:
+            if connection:
+                connection.rollback()
+            raise
         finally:
             if cursor:
                 cursor.close()
@@ -0,0 +1,125 @@
+"""
+Model Cache
+Cache LRU có TTL trong process cho các query đọc thống kê
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, Set, Tuple
+
+from config.server_config import SERVER_CONFIG
+
+
+MISSING = object()  # get() trả về khi không có / hết hạn (phân biệt với kết quả None)
+
+
+class TTLCache:
+    """Cache LRU giới hạn số entry, mỗi entry sống tối đa ttl giây
+
+    - entries: OrderedDict {key: (value, expires_at, tags)}, cuối = dùng gần nhất
+    - tags: {tag: set(key)} để xóa theo người chơi (invalidate)
+    - version: Tăng mỗi lần invalidate; set() kèm version đọc trước query sẽ bị
+      bỏ qua nếu có ghi xen giữa (tránh lưu kết quả cũ sau khi vừa xóa)
+
+    Thread-safe. Thống kê: hits, misses, evictions, invalidations (xem stats())
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: 'OrderedDict[Hashable, Tuple[Any, float, Tuple]]' = OrderedDict()
+        self.tags: Dict[Hashable, Set[Hashable]] = {}
+        self.lock = Lock()
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Lấy giá trị đã cache
+
+        Returns:
+            Giá trị, hoặc MISSING nếu chưa có / đã hết hạn
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = (), version: int = None) -> None:
+        """Lưu giá trị
+
+        Args:
+            key: Khóa (tuple tên query + tham số)
+            value: Kết quả query (caller không được sửa object này sau khi lưu)
+            tags: Các tag để invalidate() (vd: ('user', 1), ('username', 'player1'))
+            version: cache.version đọc TRƯỚC khi query, None = luôn lưu
+        """
+        tags = tuple(tags)
+        with self.lock:
+            if version is not None and version != self.version:
+                return
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.maxsize:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags: Hashable) -> None:
+        """Xóa mọi entry gắn 1 trong các tag (gọi sau khi commit dữ liệu mới)"""
+        with self.lock:
+            self.version += 1
+            for tag in tags:
+                for key in list(self.tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+            self.tags.clear()
+
+    def stats(self) -> dict:
+        """Số liệu cache cho log/giám sát"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, tags = self.entries.pop(key)
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+
+# Cache dùng chung cho thống kê người chơi (GameHistoryModel)
+STATS_CACHE = TTLCache(
+    maxsize=SERVER_CONFIG.get('stats_cache_size', 2048),
+    ttl=SERVER_CONFIG.get('stats_cache_ttl', 300)
+)
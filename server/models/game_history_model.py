@@ -1,25 +1,100 @@
-from config.db_config import get_db_connection
 from datetime import datetime
 from typing import List, Dict, Optional
+from models.base_model import BaseModel, Database
+from models.cache import STATS_CACHE, MISSING
+from models.leaderboard import LEADERBOARD, Leaderboard
+from models.user_index import UserIndex
 
 
-class GameHistoryModel:
+class GameHistoryModel(BaseModel):
     """Model quản lý lịch sử trận đấu và thống kê
     
     Chức năng:
     - Lưu kết quả trận đấu (save_game)
+    - Lưu nhiều trận trong 1 transaction (save_games, dùng bởi GameHistoryWriter)
+    - Tách biên bản trận của server thành 2 dòng lịch sử (records_from_match)
     - Lấy thống kê tổng hợp (get_user_stats)
     - Lấy lịch sử các trận gần đây (get_recent_games)
-    - Tính chuỗi thắng (get_win_streak)
+    - Duyệt toàn bộ lịch sử theo trang (get_games_page, keyset (played_at, id))
+    - Dữ liệu cả màn hình thống kê trong 1 lần gọi (get_dashboard)
+    - Lấy chuỗi thắng hiện tại/dài nhất (get_win_streak)
     - Đếm tổng số trận (get_total_games_count)
     
     Bảng database: game_history
     Cột: id, user_id, opponent_id, result, ships_sunk, hits, misses, 
           accuracy, max_streak, played_at
     
-    Lưu ý: Mỗi trận lưu 2 records (1 cho mỗi người chơi)
+    Bảng tổng hợp: user_stats (1 dòng/người chơi, cập nhật cùng transaction
+    với mỗi dòng game_history) → get_user_stats chỉ đọc 1 dòng theo khóa chính
+    
+    Lưu ý: Mỗi trận lưu 2 records (1 cho mỗi người chơi), cùng suy ra từ
+    1 biên bản trận do server ghi nhận
+    Mọi query đi qua BaseModel (connection pool dùng chung, không mở connection mới)
+    
+    Cache: get_user_stats, get_user_stats_by_username, get_games_page,
+    get_win_streak, get_dashboard dùng STATS_CACHE (models/cache.py); save_games xóa cache
+    của từng người chơi sau khi commit
+    
+    Xếp hạng: save_games đưa dòng user_stats mới vào LEADERBOARD
+    (models/leaderboard.py) sau khi commit
     """
     
+    # Cột thống kê trả về client, tính từ 1 dòng user_stats (alias s)
+    STATS_COLUMNS = """
+                    s.total_games,
+                    s.wins as total_wins,
+                    s.losses as total_losses,
+                    ROUND(s.wins * 100.0 / s.total_games, 2) as win_rate,
+                    s.total_ships_sunk,
+                    s.total_hits,
+                    s.total_misses,
+                    ROUND(s.accuracy_sum / s.total_games, 2) as avg_accuracy,
+                    s.best_streak"""
+    
+    # Cộng 1 trận vào user_stats (tạo dòng nếu chưa có), 1 câu cho mỗi dialect
+    # MySQL dùng VALUES(col) (không dùng alias "AS new" vì cần MySQL 8.0.19+,
+    # MySQL 5.7 / MariaDB báo lỗi cú pháp)
+    # longest_win_streak gán trước current_win_streak: cả 2 đều đọc giá trị cũ
+    UPSERT_USER_STATS_MYSQL = """
+        INSERT INTO user_stats
+        (user_id, total_games, wins, losses, total_ships_sunk, total_hits, total_misses,
+         accuracy_sum, best_streak, current_win_streak, longest_win_streak, last_played_at)
+        VALUES (%s, 1, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON DUPLICATE KEY UPDATE
+            total_games = user_stats.total_games + 1,
+            wins = user_stats.wins + VALUES(wins),
+            losses = user_stats.losses + VALUES(losses),
+            total_ships_sunk = user_stats.total_ships_sunk + VALUES(total_ships_sunk),
+            total_hits = user_stats.total_hits + VALUES(total_hits),
+            total_misses = user_stats.total_misses + VALUES(total_misses),
+            accuracy_sum = user_stats.accuracy_sum + VALUES(accuracy_sum),
+            best_streak = GREATEST(user_stats.best_streak, VALUES(best_streak)),
+            longest_win_streak = GREATEST(user_stats.longest_win_streak,
+                IF(VALUES(wins) > 0, user_stats.current_win_streak + 1, 0)),
+            current_win_streak = IF(VALUES(wins) > 0, user_stats.current_win_streak + 1, 0),
+            last_played_at = VALUES(last_played_at)
+    """
+    UPSERT_USER_STATS_SQLITE = """
+        INSERT INTO user_stats
+        (user_id, total_games, wins, losses, total_ships_sunk, total_hits, total_misses,
+         accuracy_sum, best_streak, current_win_streak, longest_win_streak, last_played_at)
+        VALUES (%s, 1, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_games = user_stats.total_games + 1,
+            wins = user_stats.wins + excluded.wins,
+            losses = user_stats.losses + excluded.losses,
+            total_ships_sunk = user_stats.total_ships_sunk + excluded.total_ships_sunk,
+            total_hits = user_stats.total_hits + excluded.total_hits,
+            total_misses = user_stats.total_misses + excluded.total_misses,
+            accuracy_sum = user_stats.accuracy_sum + excluded.accuracy_sum,
+            best_streak = MAX(user_stats.best_streak, excluded.best_streak),
+            longest_win_streak = MAX(user_stats.longest_win_streak,
+                CASE WHEN excluded.wins > 0 THEN user_stats.current_win_streak + 1 ELSE 0 END),
+            current_win_streak = CASE WHEN excluded.wins > 0 THEN user_stats.current_win_streak + 1 ELSE 0 END,
+            last_played_at = excluded.last_played_at
+    """
+    UPSERT_USER_STATS = {'mysql': UPSERT_USER_STATS_MYSQL, 'sqlite': UPSERT_USER_STATS_SQLITE}
+    
     @staticmethod
     def save_game(user_id: int, username: str, opponent_username: str, 
                   result: str, ships_sunk: int, enemy_ships_sunk: int, hits: int, misses: int,
@@ -45,51 +120,29 @@ class GameHistoryModel:
             True: Lưu thành công
             False: Thất bại
         
-        Luồng:
-        1. Tìm opponent_id từ opponent_username
-        2. INSERT vào game_history
-        3. Commit và close connection
+        Luồng: Gọi save_games() với 1 record (INSERT game_history + cập nhật
+        user_stats trong 1 transaction)
         
         Lưu ý: Gọi hàm này 2 lần cho mỗi trận (1 lần/người)
         """
         try:
-            connection = get_db_connection()
-            cursor = connection.cursor()
-            
             print(f"[MODEL] Saving game for user_id={user_id}, opponent={opponent_username}, result={result}")
             
-            # Get opponent_id from username
-            cursor.execute("SELECT id FROM users WHERE username = %s", (opponent_username,))
-            opponent_result = cursor.fetchone()
-            opponent_id = opponent_result[0] if opponent_result else None
-            
-            if not opponent_id:
-                print(f"[MODEL] Error: Could not find opponent_id for username {opponent_username}")
-                cursor.close()
-                connection.close()
-                return False
-            
-            print(f"[MODEL] Found opponent_id={opponent_id}")
-            
-            query = """
-                INSERT INTO game_history 
-                (user_id, opponent_id, result, ships_sunk, hits, misses, accuracy, max_streak)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            print(f"[MODEL] Executing query with: user_id={user_id}, opponent_id={opponent_id}, result={result}, ships_sunk={ships_sunk}, hits={hits}, misses={misses}, accuracy={accuracy}, max_streak={max_streak}")
-            
-            cursor.execute(query, (
-                user_id, opponent_id, result, ships_sunk, hits, misses, accuracy, max_streak
-            ))
-            
-            connection.commit()
-            print(f"[MODEL] ✓ Game history saved successfully! Insert ID: {cursor.lastrowid}")
-            
-            cursor.close()
-            connection.close()
-            
-            return True
+            saved = GameHistoryModel.save_games([{
+                'user_id': user_id,
+                'username': username,
+                'opponent_username': opponent_username,
+                'result': result,
+                'ships_sunk': ships_sunk,
+                'hits': hits,
+                'misses': misses,
+                'accuracy': accuracy,
+                'max_streak': max_streak
+            }])
+            
+            if saved:
+                print(f"[MODEL] ✓ Game history saved successfully!")
+            return saved > 0
             
         except Exception as e:
             print(f"[MODEL] ✗ Error saving game history: {e}")
@@ -97,6 +150,131 @@ class GameHistoryModel:
             traceback.print_exc()
             return False
     
+    @staticmethod
+    def records_from_match(match: Dict) -> List[Dict]:
+        """Tách biên bản trận thành các dòng game_history (1 dòng/người chơi)
+        
+        Args:
+            match: {'winner', 'players': {username: {user_id, hits, misses, max_streak, ships_sunk}}}
+                (xem GameRoom.build_match_record)
+        
+        Returns:
+            List Dict cùng key với tham số của save_game()
+            Người chơi không có user_id (client cũ) bị bỏ qua
+        """
+        def accuracy(stats):
+            shots = stats['hits'] + stats['misses']
+            return round(stats['hits'] / shots * 100, 2) if shots else 0
+        
+        players = match['players']
+        records = []
+        for username, stats in players.items():
+            opponent_username = next((u for u in players if u != username), None)
+            if not stats.get('user_id') or not opponent_username:
+                continue
+            enemy = players[opponent_username]
+            records.append({
+                'user_id': stats['user_id'],
+                'username': username,
+                'opponent_username': opponent_username,
+                'result': 'win' if username == match['winner'] else 'lose',
+                'ships_sunk': stats['ships_sunk'],
+                'enemy_ships_sunk': enemy['ships_sunk'],
+                'hits': stats['hits'],
+                'misses': stats['misses'],
+                'accuracy': accuracy(stats),
+                'max_streak': stats['max_streak'],
+                'enemy_hits': enemy['hits'],
+                'enemy_misses': enemy['misses'],
+                'enemy_accuracy': accuracy(enemy),
+                'enemy_max_streak': enemy['max_streak']
+            })
+        return records
+    
+    @staticmethod
+    def save_games(records: List[Dict]) -> int:
+        """Lưu nhiều trận cùng lúc (1 lần tra đối thủ + 1 transaction)
+        
+        Args:
+            records: List Dict cùng key với tham số của save_game()
+                (user_id, opponent_username, result, ships_sunk, hits, misses,
+                accuracy, max_streak; các key enemy_* bỏ qua)
+        
+        Returns:
+            Số record đã INSERT (record không tìm thấy đối thủ bị bỏ)
+        
+        Luồng:
+        1. Tra id của mọi opponent_username qua UserIndex (chỉ tên chưa biết
+           mới query, gộp 1 câu IN (...))
+        2. Trong 1 transaction:
+           - executemany INSERT vào game_history
+           - executemany upsert user_stats (cộng dồn theo đúng thứ tự record)
+           - Đọc lại dòng user_stats của những người chơi này (cho bảng xếp hạng)
+        3. Xóa STATS_CACHE của các user_id / username trong batch, cập nhật
+           vị trí của họ trong LEADERBOARD
+        
+        Raises:
+            Database.errors(): Lỗi database (cả batch được rollback)
+        """
+        if not records:
+            return 0
+        
+        opponent_ids = UserIndex.resolve_ids(record.get('opponent_username') for record in records
+                                             if record.get('opponent_username'))
+        
+        params_list = []
+        stats_list = []
+        for record in records:
+            opponent_id = opponent_ids.get(record.get('opponent_username'))
+            if not opponent_id:
+                print(f"[MODEL] Error: Could not find opponent_id for username {record.get('opponent_username')}")
+                continue
+            params_list.append((
+                record.get('user_id'), opponent_id, record.get('result'),
+                record.get('ships_sunk'), record.get('hits'), record.get('misses'),
+                record.get('accuracy'), record.get('max_streak')
+            ))
+            won = 1 if record.get('result') == 'win' else 0
+            stats_list.append((
+                record.get('user_id'), won, 1 - won,
+                record.get('ships_sunk') or 0, record.get('hits') or 0, record.get('misses') or 0,
+                record.get('accuracy') or 0, record.get('max_streak') or 0, won, won
+            ))
+        
+        if not params_list:
+            return 0
+        
+        query = """
+            INSERT INTO game_history 
+            (user_id, opponent_id, result, ships_sunk, hits, misses, accuracy, max_streak)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        with GameHistoryModel.transaction() as cursor:
+            cursor.executemany(query, params_list)
+            cursor.executemany(GameHistoryModel.UPSERT_USER_STATS[Database.dialect()], stats_list)
+            ranked = Leaderboard.read_rows(cursor, sorted({stats[0] for stats in stats_list}))
+        
+        # Đã commit → thống kê đã cache của những người chơi này hết đúng
+        tags = []
+        for record in records:
+            tags.append(('user', record.get('user_id')))
+            if record.get('username'):
+                tags.append(('username', record['username']))
+        STATS_CACHE.invalidate(*tags)
+        LEADERBOARD.update(ranked)
+        return len(params_list)
+    
+    @staticmethod
+    def _stats_to_json(stats: Optional[Dict]) -> Optional[Dict]:
+        """None nếu chưa có trận nào, Decimal → float cho JSON serialization"""
+        if not stats or stats['total_games'] == 0:
+            return None
+        
+        for key in stats:
+            if stats[key] is not None and hasattr(stats[key], '__float__'):
+                stats[key] = float(stats[key])
+        return stats
+    
     @staticmethod
     def get_user_stats(user_id: int) -> Optional[Dict]:
         """Lấy thống kê tổng hợp của người chơi
@@ -118,44 +296,26 @@ class GameHistoryModel:
             
             None nếu chưa có trận nào
         
-        Query: Dùng SUM, COUNT, AVG, MAX để tổng hợp từ game_history
+        Query: Đọc 1 dòng user_stats theo khóa chính (không quét game_history)
         Chuyển Decimal thành float cho JSON serialization
+        Kết quả được cache tới khi user ghi trận mới (hoặc hết TTL)
         """
+        cache_key = ('user_stats', user_id)
+        cached = STATS_CACHE.get(cache_key)
+        if cached is not MISSING:
+            return cached
+        
         try:
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
-            
-            query = """
-                SELECT 
-                    COUNT(*) as total_games,
-                    SUM(CASE WHEN result = 'win' THEN 1 ELSE 0 END) as total_wins,
-                    SUM(CASE WHEN result = 'lose' THEN 1 ELSE 0 END) as total_losses,
-                    ROUND(SUM(CASE WHEN result = 'win' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as win_rate,
-                    SUM(ships_sunk) as total_ships_sunk,
-                    SUM(hits) as total_hits,
-                    SUM(misses) as total_misses,
-                    ROUND(AVG(accuracy), 2) as avg_accuracy,
-                    MAX(max_streak) as best_streak
-                FROM game_history
-                WHERE user_id = %s
+            version = STATS_CACHE.version
+            query = f"""
+                SELECT {GameHistoryModel.STATS_COLUMNS}
+                FROM user_stats s
+                WHERE s.user_id = %s
             """
             
-            cursor.execute(query, (user_id,))
-            stats = cursor.fetchone()
-            
-            cursor.close()
-            connection.close()
-            
-            # Handle case where no games exist
-            if stats and stats['total_games'] == 0:
-                return None
-            
-            # Convert Decimal to float for JSON serialization
-            if stats:
-                for key in stats:
-                    if stats[key] is not None and hasattr(stats[key], '__float__'):
-                        stats[key] = float(stats[key])
-                
+            stats = GameHistoryModel.execute_query(query, (user_id,), fetch_one=True)
+            stats = GameHistoryModel._stats_to_json(stats)
+            STATS_CACHE.set(cache_key, stats, tags=[('user', user_id)], version=version)
             return stats
             
         except Exception as e:
@@ -188,38 +348,33 @@ class GameHistoryModel:
             stats = GameHistoryModel.get_user_stats_by_username("Player1")
             if stats:
                 print(f"Win rate: {stats['win_rate']}%")
+        
+        Query: username → id qua UserIndex, rồi đọc 1 dòng user_stats theo khóa
+        chính; chuỗi thắng đọc sẵn từ user_stats → không phụ thuộc số trận đã chơi
+        Kết quả được cache (popup đối thủ mở nhiều lần trong 1 trận)
         """
+        cache_key = ('user_stats_by_username', username)
+        cached = STATS_CACHE.get(cache_key)
+        if cached is not MISSING:
+            return cached
+        
         try:
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
-            
-            # Tìm user_id từ username
-            cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
-            user_result = cursor.fetchone()
-            
-            if not user_result:
-                cursor.close()
-                connection.close()
+            version = STATS_CACHE.version
+            user_id = UserIndex.get_id(username)
+            if user_id is None:
                 return None
             
-            user_id = user_result['id']
-            
-            # Lấy stats từ get_user_stats
-            cursor.close()
-            connection.close()
-            
-            stats = GameHistoryModel.get_user_stats(user_id)
-            
-            if not stats:
-                return None
-            
-            # Thêm current_streak từ get_win_streak
-            streak_data = GameHistoryModel.get_win_streak(user_id)
-            if streak_data:
-                stats['current_streak'] = streak_data.get('current_streak', 0)
-            else:
-                stats['current_streak'] = 0
+            query = f"""
+                SELECT {GameHistoryModel.STATS_COLUMNS},
+                    s.current_win_streak as current_streak
+                FROM user_stats s
+                WHERE s.user_id = %s
+            """
             
+            stats = GameHistoryModel.execute_query(query, (user_id,), fetch_one=True)
+            stats = GameHistoryModel._stats_to_json(stats)
+            STATS_CACHE.set(cache_key, stats, tags=[('username', username), ('user', user_id)],
+                            version=version)
             return stats
             
         except Exception as e:
@@ -236,6 +391,7 @@ class GameHistoryModel:
         
         Returns:
             List các Dict, mỗi Dict chứa:
+            - id: ID dòng game_history
             - opponent_username: Tên đối thủ
             - result: 'win' / 'lose'
             - ships_sunk, hits, misses: Thống kê
@@ -243,55 +399,204 @@ class GameHistoryModel:
             - max_streak: Chuỗi trúng dài nhất
             - played_at: Thời gian chơi (ISO format)
         
-        Sắp xếp: ORDER BY played_at DESC (mới nhất trên cùng)
-        JOIN với users để lấy tên đối thủ
+        Trang đầu tiên của get_games_page() (mới nhất trên cùng)
+        """
+        return GameHistoryModel.get_games_page(user_id, limit)['games']
+    
+    @staticmethod
+    def get_games_page(user_id: int, limit: int = 20, cursor: Optional[Dict] = None) -> Dict:
+        """Lấy 1 trang lịch sử trận, phân trang theo khóa (keyset) (played_at, id)
+        
+        Args:
+            user_id: ID người chơi
+            limit: Số trận mỗi trang
+            cursor: next_cursor của trang trước ({'played_at', 'id'}),
+                None = trang đầu (mới nhất)
+        
+        Returns:
+            Dict chứa:
+            - games: List trận (cùng key với get_recent_games)
+            - next_cursor: Cursor của trang kế tiếp, None nếu đã hết lịch sử
+        
+        Raises:
+            ValueError: cursor không hợp lệ
+        
+        Query: ORDER BY played_at DESC, id DESC, trang sau chỉ lấy các dòng
+        đứng sau dòng cuối của trang trước → đi thẳng vào index
+        (user_id, played_at, id), không OFFSET nên trang sâu vẫn nhanh như trang đầu
+        Đọc limit + 1 dòng để biết còn trang sau hay không
         Chuyển datetime và Decimal thành JSON-serializable
+        Kết quả được cache theo (user_id, limit, cursor) tới khi user ghi trận mới
         """
+        after = GameHistoryModel._parse_cursor(cursor)
+        cache_key = ('games_page', user_id, limit, after)
+        cached = STATS_CACHE.get(cache_key)
+        if cached is not MISSING:
+            return cached
+        
         try:
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
-            
-            query = """
-                SELECT 
-                    u.username as opponent_username,
-                    gh.result,
-                    gh.ships_sunk,
-                    gh.hits,
-                    gh.misses,
-                    gh.accuracy,
-                    gh.max_streak,
-                    gh.played_at
-                FROM game_history gh
-                JOIN users u ON gh.opponent_id = u.id
-                WHERE gh.user_id = %s
-                ORDER BY gh.played_at DESC
-                LIMIT %s
-            """
-            
-            cursor.execute(query, (user_id, limit))
-            games = cursor.fetchall()
-            
-            cursor.close()
-            connection.close()
-            
-            # Convert Decimal and datetime to JSON-serializable types
-            for game in games:
-                for key in game:
-                    if game[key] is not None:
-                        if hasattr(game[key], '__float__'):
-                            game[key] = float(game[key])
-                        elif hasattr(game[key], 'isoformat'):
-                            game[key] = game[key].isoformat()
-            
-            return games
+            version = STATS_CACHE.version
+            query, params = GameHistoryModel._games_page_query(user_id, limit, after)
+            rows = GameHistoryModel.execute_query(query, params, fetch_all=True) or []
+            page = GameHistoryModel._games_page(rows, limit)
+            STATS_CACHE.set(cache_key, page, tags=[('user', user_id)], version=version)
+            return page
             
         except Exception as e:
             print(f"Error getting recent games: {e}")
-            return []
+            return {'games': [], 'next_cursor': None}
+    
+    @staticmethod
+    def _parse_cursor(cursor: Optional[Dict]) -> Optional[tuple]:
+        """{'played_at', 'id'} → (played_at, id), None = trang đầu
+        
+        Raises:
+            ValueError: cursor không hợp lệ
+        """
+        if cursor is None:
+            return None
+        try:
+            return (str(cursor['played_at']), int(cursor['id']))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Invalid cursor: {cursor}')
+    
+    @staticmethod
+    def _games_page_query(user_id: int, limit: int, after: Optional[tuple]) -> tuple:
+        """Câu SELECT 1 trang lịch sử (limit + 1 dòng) và tham số của nó"""
+        params = [user_id]
+        keyset = ""
+        if after:
+            keyset = "AND (gh.played_at < %s OR (gh.played_at = %s AND gh.id < %s))"
+            params += [after[0], after[0], after[1]]
+        query = f"""
+            SELECT 
+                gh.id,
+                u.username as opponent_username,
+                gh.result,
+                gh.ships_sunk,
+                gh.hits,
+                gh.misses,
+                gh.accuracy,
+                gh.max_streak,
+                gh.played_at
+            FROM game_history gh
+            JOIN users u ON gh.opponent_id = u.id
+            WHERE gh.user_id = %s {keyset}
+            ORDER BY gh.played_at DESC, gh.id DESC
+            LIMIT %s
+        """
+        return query, tuple(params + [limit + 1])
+    
+    @staticmethod
+    def _games_page(rows: List[Dict], limit: int) -> Dict:
+        """Dòng của _games_page_query → {'games', 'next_cursor'} (JSON-serializable)"""
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            # Giá trị played_at gốc của database (chưa đổi ISO) để so sánh ở trang sau
+            next_cursor = {'played_at': str(rows[-1]['played_at']), 'id': rows[-1]['id']}
+        
+        # Convert Decimal and datetime to JSON-serializable types
+        for game in rows:
+            for key in game:
+                if game[key] is not None and key != 'id':
+                    if hasattr(game[key], '__float__'):
+                        game[key] = float(game[key])
+                    elif hasattr(game[key], 'isoformat'):
+                        game[key] = game[key].isoformat()
+        
+        return {'games': rows, 'next_cursor': next_cursor}
+    
+    @staticmethod
+    def get_dashboard(user_id: int, limit: int = 20) -> Dict:
+        """Toàn bộ dữ liệu màn hình thống kê trong 1 lần gọi
+        
+        Args:
+            user_id: ID người chơi
+            limit: Số trận của trang lịch sử đầu tiên
+        
+        Returns:
+            Dict chứa:
+            - stats: Như get_user_stats (None nếu chưa có trận nào)
+            - streak: Như get_win_streak (current_streak, longest_streak)
+            - games, next_cursor: Như get_games_page (trang đầu)
+            - charts: Số liệu biểu đồ tính sẵn (xem _dashboard_charts),
+              None nếu chưa có trận nào
+        
+        Query: 2 câu trên cùng 1 connection, trong 1 transaction mở bằng BEGIN
+        trước câu đầu (cùng 1 snapshot trên cả MySQL và SQLite → tổng và danh
+        sách trận khớp nhau):
+        1. 1 dòng user_stats theo khóa chính (thống kê + chuỗi thắng)
+        2. Trang đầu game_history qua index (user_id, played_at, id)
+        Biểu đồ được tính từ đúng 2 kết quả này, không query thêm
+        Kết quả được cache theo (user_id, limit) tới khi user ghi trận mới
+        """
+        cache_key = ('dashboard', user_id, limit)
+        cached = STATS_CACHE.get(cache_key)
+        if cached is not MISSING:
+            return cached
+        
+        version = STATS_CACHE.version
+        with GameHistoryModel.transaction(snapshot=True) as cursor:
+            cursor.execute(f"""
+                SELECT {GameHistoryModel.STATS_COLUMNS},
+                    s.current_win_streak, s.longest_win_streak
+                FROM user_stats s
+                WHERE s.user_id = %s
+            """, (user_id,))
+            row = cursor.fetchone()
+            cursor.execute(*GameHistoryModel._games_page_query(user_id, limit, None))
+            rows = cursor.fetchall()
+        
+        streak = {
+            'current_streak': row.pop('current_win_streak') if row else 0,
+            'longest_streak': row.pop('longest_win_streak') if row else 0
+        }
+        stats = GameHistoryModel._stats_to_json(row)
+        page = GameHistoryModel._games_page(rows, limit)
+        dashboard = {
+            'stats': stats,
+            'streak': streak,
+            'games': page['games'],
+            'next_cursor': page['next_cursor'],
+            'charts': GameHistoryModel._dashboard_charts(stats, page['games']) if stats else None
+        }
+        STATS_CACHE.set(cache_key, dashboard, tags=[('user', user_id)], version=version)
+        return dashboard
+    
+    @staticmethod
+    def _dashboard_charts(stats: Dict, games: List[Dict]) -> Dict:
+        """Số liệu các biểu đồ của StatisticsView
+        
+        Returns:
+            Dict chứa:
+            - radar: accuracy, win_rate, efficiency (%, efficiency = tàu chìm / phát
+              trúng, 1 tàu mỗi 5 phát trúng = 100%)
+            - per_game: avg_ships, avg_hits (trung bình mỗi trận)
+            - recent_results: 1 = thắng, 0 = thua, cũ → mới (tối đa 20 trận)
+            - recent_win_rate: Tỉ lệ thắng (%) của recent_results
+        """
+        total_games = stats['total_games'] or 1
+        total_hits = stats['total_hits'] or 0
+        efficiency = min(stats['total_ships_sunk'] / total_hits * 100 * 5, 100) if total_hits else 0
+        recent_results = [1 if game['result'] == 'win' else 0 for game in reversed(games[:20])]
+        return {
+            'radar': {
+                'accuracy': stats['avg_accuracy'] or 0,
+                'win_rate': round(stats['total_wins'] / total_games * 100, 2),
+                'efficiency': round(efficiency, 2)
+            },
+            'per_game': {
+                'avg_ships': round(stats['total_ships_sunk'] / total_games, 2),
+                'avg_hits': round(total_hits / total_games, 2)
+            },
+            'recent_results': recent_results,
+            'recent_win_rate': round(sum(recent_results) / len(recent_results) * 100, 2) if recent_results else 0
+        }
     
     @staticmethod
     def get_win_streak(user_id: int) -> Dict:
-        """Tính chuỗi thắng hiện tại và dài nhất
+        """Lấy chuỗi thắng hiện tại và dài nhất
         
         Args:
             user_id: ID người chơi
@@ -301,75 +606,48 @@ class GameHistoryModel:
             - current_streak: Chuỗi thắng liên tiếp hiện tại
             - longest_streak: Chuỗi thắng dài nhất từ trước tới nay
         
-        Logic:
-        - Current: Đếm win liên tiếp từ trận mới nhất, dừng khi gặp lose
-        - Longest: Duyệt tất cả trận, tìm chuỗi win dài nhất
+        Logic: Đọc user_stats (current_win_streak, longest_win_streak), 2 cột
+        được cập nhật mỗi khi ghi trận (xem UPSERT_USER_STATS):
+        - Thắng: current + 1, longest = max(longest, current)
+        - Thua: current = 0
         
         Ví dụ: W W W L W W W W W → current=5, longest=5
+        Lịch sử có trước bảng user_stats: chạy tools/backfill_user_stats.py 1 lần
         """
+        cache_key = ('win_streak', user_id)
+        cached = STATS_CACHE.get(cache_key)
+        if cached is not MISSING:
+            return cached
+        
         try:
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
-            
-            # Get all games ordered by date
+            version = STATS_CACHE.version
             query = """
-                SELECT result
-                FROM game_history
+                SELECT current_win_streak, longest_win_streak
+                FROM user_stats
                 WHERE user_id = %s
-                ORDER BY played_at DESC
             """
             
-            cursor.execute(query, (user_id,))
-            games = cursor.fetchall()
-            
-            cursor.close()
-            connection.close()
-            
-            if not games:
-                return {'current_streak': 0, 'longest_streak': 0}
+            row = GameHistoryModel.execute_query(query, (user_id,), fetch_one=True)
             
-            # Calculate current streak
-            current_streak = 0
-            for game in games:
-                if game['result'] == 'win':
-                    current_streak += 1
-                else:
-                    break
-            
-            # Calculate longest streak
-            longest_streak = 0
-            temp_streak = 0
-            for game in reversed(games):
-                if game['result'] == 'win':
-                    temp_streak += 1
-                    longest_streak = max(longest_streak, temp_streak)
-                else:
-                    temp_streak = 0
-            
-            return {
-                'current_streak': current_streak,
-                'longest_streak': longest_streak
+            streak = {
+                'current_streak': row['current_win_streak'] if row else 0,
+                'longest_streak': row['longest_win_streak'] if row else 0
             }
+            STATS_CACHE.set(cache_key, streak, tags=[('user', user_id)], version=version)
+            return streak
             
         except Exception as e:
-            print(f"Error calculating win streaks: {e}")
+            print(f"Error getting win streaks: {e}")
             return {'current_streak': 0, 'longest_streak': 0}
     
     @staticmethod
     def get_total_games_count(user_id: int) -> int:
         """Get total number of games played"""
         try:
-            connection = get_db_connection()
-            cursor = connection.cursor()
-            
-            query = "SELECT COUNT(*) FROM game_history WHERE user_id = %s"
-            cursor.execute(query, (user_id,))
-            count = cursor.fetchone()[0]
-            
-            cursor.close()
-            connection.close()
+            query = "SELECT COUNT(*) AS total FROM game_history WHERE user_id = %s"
+            result = GameHistoryModel.execute_query(query, (user_id,), fetch_one=True)
             
-            return count
+            return result['total'] if result else 0
             
         except Exception as e:
             print(f"Error getting total games count: {e}")
@@ -0,0 +1,215 @@
+"""
+Game History Writer
+Ghi lịch sử trận đấu ở thread nền theo batch (write-behind)
+"""
+import logging
+import queue
+import time
+from threading import Thread, Lock
+from typing import Dict, List, Optional
+
+from models.game_history_model import GameHistoryModel
+
+
+class GameHistoryWriter:
+    """Hàng đợi ghi game_history theo batch
+
+    Thay vì mỗi trận 1 connection + 1 lần tra đối thủ + 1 commit trên thread
+    đang phục vụ client:
+    - submit() / submit_match() chỉ đưa record vào hàng đợi rồi trả về ngay
+    - Thread nền gom tối đa batch_size record (hoặc chờ tối đa flush_interval giây)
+      rồi gọi GameHistoryModel.save_games(): 1 query tra đối thủ + 1 transaction
+    - Các record cùng 1 lần submit (vd: 2 dòng của 1 trận) luôn nằm chung transaction
+    - Batch lỗi → ghi lại từng lần submit riêng, 1 trận lỗi không làm mất các trận
+      khác trong batch (chỉ record của lần submit lỗi bị bỏ, có log)
+
+    Backpressure: hàng đợi có giới hạn (max_queue). Đầy → submit() chờ tối đa
+    put_timeout giây, vẫn đầy thì ghi đồng bộ ngay trên thread gọi (làm chậm
+    chính client đó thay vì mất dữ liệu hay phình bộ nhớ)
+
+    stop(): Ghi nốt hàng đợi, kể cả record xếp hàng sau dấu dừng (submit chạy song
+    song với stop); submit sau khi stop xong thì ghi đồng bộ
+
+    Thuộc tính thống kê: written, failed, batches
+    """
+
+    _STOP = object()  # Đánh dấu dừng thread nền
+
+    def __init__(self, batch_size: int = 50, flush_interval: float = 0.5,
+                 max_queue: int = 1000, put_timeout: float = 2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.thread: Optional[Thread] = None
+        self.lock = Lock()
+        self.stopping = False
+
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> None:
+        """Start thread nền (gọi lại khi đang chạy thì bỏ qua)"""
+        with self.lock:
+            if self.running:
+                return
+            self.stopping = False
+            self.thread = Thread(target=self._run, name='game-history-writer', daemon=True)
+            self.thread.start()
+
+    def submit(self, records: List[Dict]) -> bool:
+        """Đưa các dòng lịch sử vào hàng đợi ghi
+
+        Args:
+            records: List Dict cùng key với tham số của GameHistoryModel.save_game()
+
+        Returns:
+            True nếu đã xếp hàng, False nếu phải ghi đồng bộ (writer chưa chạy
+            hoặc hàng đợi đầy quá put_timeout)
+        """
+        if not records:
+            return True
+        if self.running and not self.stopping:
+            try:
+                self.queue.put(records, timeout=self.put_timeout)
+                return True
+            except queue.Full:
+                logging.warning('Game history queue full, writing synchronously')
+
+        self._write(records)
+        return False
+
+    def submit_match(self, match: Dict) -> bool:
+        """Đưa 1 trận (biên bản GameRoom.build_match_record) vào hàng đợi ghi"""
+        return self.submit(GameHistoryModel.records_from_match(match))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Chờ tới khi mọi record đã xếp hàng được ghi xong
+
+        Returns:
+            True nếu hàng đợi đã trống trước timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if not self.running:
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Ghi nốt hàng đợi rồi dừng thread nền (gọi từ RoomServer.stop_server)
+
+        Không giữ self.lock lúc put/join: thread nền cần lock để cập nhật thống kê
+        """
+        with self.lock:
+            thread = self.thread
+            if thread is None or not thread.is_alive():
+                return
+            self.stopping = True
+
+        deadline = time.monotonic() + timeout
+        try:
+            self.queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            logging.error(f'Game history writer not stopped: queue still full after {timeout}s, '
+                          f'{self.queue.qsize()} records pending')
+            return
+        thread.join(max(0.0, deadline - time.monotonic()))
+        if thread.is_alive():
+            logging.error(f'Game history writer did not stop, {self.queue.qsize()} records pending')
+            return
+
+        # Record xếp hàng sau dấu dừng (submit song song với stop): ghi ngay tại đây
+        self._drain()
+        logging.info(f'Game history writer stopped ({self.written} written, {self.failed} failed)')
+
+    def _run(self) -> None:
+        """Thân thread nền: gom batch theo batch_size / flush_interval rồi ghi"""
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is self._STOP:
+                self.queue.task_done()
+                break
+
+            items = [item]
+            batch = list(item)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    self.queue.task_done()
+                    stopping = True
+                    break
+                items.append(item)
+                batch.extend(item)
+
+            try:
+                self._write_items(items, batch)
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+    def _drain(self) -> None:
+        """Ghi đồng bộ những gì còn trong hàng đợi (thread nền đã dừng)"""
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if item is not self._STOP:
+                    self._write(item)
+            finally:
+                self.queue.task_done()
+
+    def _write_items(self, items: List[List[Dict]], batch: List[Dict]) -> None:
+        """Ghi cả batch trong 1 transaction, lỗi thì ghi lại từng lần submit
+
+        Args:
+            items: Các lần submit gom trong batch
+            batch: Mọi record của items, nối theo thứ tự
+        """
+        if len(items) == 1:
+            self._write(batch)
+            return
+        try:
+            written = GameHistoryModel.save_games(batch)
+        except Exception as e:
+            logging.warning(f'Error saving batch of {len(batch)} game history records, '
+                            f'retrying {len(items)} matches one by one: {e}')
+            for records in items:
+                self._write(records)
+            return
+
+        with self.lock:
+            self.written += written
+            self.failed += len(batch) - written
+            self.batches += 1
+
+    def _write(self, batch: List[Dict]) -> None:
+        try:
+            written = GameHistoryModel.save_games(batch)
+        except Exception as e:
+            logging.error(f'Error saving {len(batch)} game history records, dropped: {e}')
+            for record in batch:
+                logging.error(f'Dropped game history record: {record}')
+            with self.lock:
+                self.failed += len(batch)
+            return
+
+        with self.lock:
+            self.written += written
+            self.failed += len(batch) - written
+            self.batches += 1
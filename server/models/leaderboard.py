@@ -0,0 +1,212 @@
+"""
+Leaderboard
+Bảng xếp hạng giữ sẵn trong process, cập nhật theo từng trận đã ghi
+"""
+import logging
+from bisect import bisect_left, insort
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.server_config import SERVER_CONFIG
+from models.base_model import BaseModel
+
+
+# Tên bảng xếp hạng client gửi trong request 'get_leaderboard'
+BOARDS = ('wins', 'win_rate', 'best_streak')
+
+
+class Leaderboard:
+    """Xếp hạng người chơi theo số trận thắng, tỉ lệ thắng, chuỗi thắng dài nhất
+
+    - entries: {user_id: entry} (username, wins, losses, total_games,
+      win_rate, best_streak) - entry không bị sửa, cập nhật = thay dict mới
+    - keys: {board: list khóa đã sắp xếp}, khóa nhỏ hơn = hạng cao hơn,
+      phần tử cuối của khóa là user_id nên 2 người không bao giờ trùng khóa
+
+    Thứ tự (hòa thì xét tiêu chí sau):
+    - wins: Thắng nhiều → ít trận hơn → user_id
+    - win_rate: Tỉ lệ thắng → nhiều trận hơn → user_id
+      (chỉ người có >= min_games trận)
+    - best_streak: Chuỗi thắng dài nhất (longest_win_streak) → thắng nhiều → user_id
+
+    Độ phức tạp: top(N) = O(N), rank() = O(log n) (bisect),
+    update() = O(log n) tìm + dời phần tử list (memmove) cho mỗi bảng
+
+    Nguồn dữ liệu là bảng user_stats (đã cộng dồn sẵn theo từng trận, có index
+    theo wins / longest_win_streak): warm() nạp 1 lần lúc server start,
+    GameHistoryModel.save_games gọi update() với dòng user_stats mới sau khi commit
+
+    Thread-safe
+    """
+
+    # Cột đọc từ user_stats (alias s) + users (alias u)
+    SELECT_ROWS = """
+        SELECT s.user_id, u.username, s.total_games, s.wins, s.losses,
+               s.longest_win_streak
+        FROM user_stats s
+        JOIN users u ON u.id = s.user_id
+    """
+
+    def __init__(self, min_games: int = 10, max_limit: int = 100):
+        self.min_games = min_games
+        self.max_limit = max_limit
+        self.entries: Dict[int, Dict] = {}
+        self.keys: Dict[str, List[Tuple]] = {board: [] for board in BOARDS}
+        self.lock = Lock()
+        self.warmed = False
+
+    def warm(self) -> int:
+        """Nạp toàn bộ user_stats (1 query, sắp xếp 1 lần)
+
+        Returns:
+            Số người chơi được xếp hạng, -1 nếu không đọc được database (bảng
+            xếp hạng sẽ đầy dần theo các trận ghi sau đó)
+        """
+        try:
+            rows = self._load_all()
+        except Exception as e:
+            logging.warning(f'Leaderboard not warmed: {e}')
+            return -1
+
+        entries = {row['user_id']: self._entry(row) for row in rows if row['total_games'] > 0}
+        keys = {board: [] for board in BOARDS}
+        for entry in entries.values():
+            for board in BOARDS:
+                key = self._key(board, entry)
+                if key is not None:
+                    keys[board].append(key)
+        for board_keys in keys.values():
+            board_keys.sort()
+
+        with self.lock:
+            self.entries = entries
+            self.keys = keys
+            self.warmed = True
+        logging.info(f'Leaderboard warmed with {len(entries)} players')
+        return len(entries)
+
+    def update(self, rows: Iterable[Dict]) -> None:
+        """Đặt lại vị trí các người chơi vừa ghi trận
+
+        Args:
+            rows: Dòng user_stats mới (cột như SELECT_ROWS), đọc trong cùng
+                transaction ghi trận
+
+        Dòng có total_games nhỏ hơn entry hiện tại (2 lần ghi xen nhau, dòng cũ
+        tới sau) bị bỏ qua
+        """
+        with self.lock:
+            for row in rows:
+                entry = self._entry(row)
+                old = self.entries.get(entry['user_id'])
+                if old is not None and old['total_games'] > entry['total_games']:
+                    continue
+
+                for board in BOARDS:
+                    board_keys = self.keys[board]
+                    if old is not None:
+                        old_key = self._key(board, old)
+                        if old_key is not None:
+                            index = bisect_left(board_keys, old_key)
+                            if index < len(board_keys) and board_keys[index] == old_key:
+                                del board_keys[index]
+                    key = self._key(board, entry)
+                    if key is not None:
+                        insort(board_keys, key)
+                self.entries[entry['user_id']] = entry
+
+    def top(self, board: str, limit: int = 10) -> List[Dict]:
+        """N người đứng đầu
+
+        Args:
+            board: 1 trong BOARDS
+            limit: Số người (tối đa max_limit)
+
+        Returns:
+            List entry kèm 'rank' (1 = cao nhất)
+
+        Raises:
+            ValueError: board không hỗ trợ
+        """
+        if board not in BOARDS:
+            raise ValueError(f'Unknown leaderboard: {board}')
+        limit = max(0, min(int(limit), self.max_limit))
+        with self.lock:
+            keys = self.keys[board][:limit]
+            return [dict(self.entries[key[-1]], rank=rank) for rank, key in enumerate(keys, 1)]
+
+    def rank(self, board: str, user_id: int) -> Optional[Dict]:
+        """Hạng của 1 người chơi
+
+        Returns:
+            Entry kèm 'rank', None nếu chưa chơi trận nào (hoặc chưa đủ
+            min_games trận với bảng win_rate)
+
+        Raises:
+            ValueError: board không hỗ trợ
+        """
+        if board not in BOARDS:
+            raise ValueError(f'Unknown leaderboard: {board}')
+        with self.lock:
+            entry = self.entries.get(user_id)
+            key = self._key(board, entry) if entry else None
+            if key is None:
+                return None
+            return dict(entry, rank=bisect_left(self.keys[board], key) + 1)
+
+    def size(self, board: str) -> int:
+        """Số người có mặt trong bảng xếp hạng"""
+        with self.lock:
+            return len(self.keys.get(board, ()))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries = {}
+            self.keys = {board: [] for board in BOARDS}
+            self.warmed = False
+
+    def _key(self, board: str, entry: Dict) -> Optional[Tuple]:
+        """Khóa sắp xếp tăng dần của entry trong board, None = không có mặt"""
+        if board == 'wins':
+            return (-entry['wins'], entry['total_games'], entry['user_id'])
+        if board == 'win_rate':
+            if entry['total_games'] < self.min_games:
+                return None
+            return (-entry['wins'] / entry['total_games'], -entry['total_games'], entry['user_id'])
+        return (-entry['best_streak'], -entry['wins'], entry['user_id'])
+
+    @staticmethod
+    def _entry(row: Dict) -> Dict:
+        total_games = int(row['total_games'])
+        wins = int(row['wins'])
+        return {
+            'user_id': row['user_id'],
+            'username': row['username'],
+            'wins': wins,
+            'losses': int(row['losses']),
+            'total_games': total_games,
+            'win_rate': round(wins * 100 / total_games, 2) if total_games else 0,
+            'best_streak': int(row['longest_win_streak'])
+        }
+
+    @staticmethod
+    def read_rows(cursor, user_ids: List[int]) -> List[Dict]:
+        """Đọc dòng user_stats của các user_id bằng cursor của transaction đang mở"""
+        if not user_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        cursor.execute(f"{Leaderboard.SELECT_ROWS} WHERE s.user_id IN ({placeholders})", tuple(user_ids))
+        return cursor.fetchall()
+
+    @staticmethod
+    def _load_all() -> List[Dict]:
+        return BaseModel.execute_query(
+            f"{Leaderboard.SELECT_ROWS} WHERE s.total_games > 0", fetch_all=True
+        ) or []
+
+
+# Bảng xếp hạng dùng chung cho cả process (RoomServer, GameHistoryModel)
+LEADERBOARD = Leaderboard(
+    min_games=SERVER_CONFIG.get('leaderboard_min_games', 10),
+    max_limit=SERVER_CONFIG.get('leaderboard_max_limit', 100)
+)
@@ -0,0 +1,215 @@
+"""
+MySQL Storage Backend
+Connection pool có hàng đợi chờ cho mysql.connector
+"""
+import time
+import logging
+from collections import deque
+from threading import Condition
+from typing import Optional
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+from models.storage import StorageBackend
+
+
+class PoolExhaustedError(PoolError):
+    """Hết connection trong pool và chờ quá pool_timeout giây"""
+
+
+class PooledConnection:
+    """Connection mượn từ ConnectionPool
+
+    Dùng như connection MySQL bình thường (cursor, commit, rollback...),
+    close() trả connection về pool thay vì đóng socket
+    """
+
+    def __init__(self, pool: 'ConnectionPool', connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        """Trả connection về pool (gọi nhiều lần vẫn an toàn)"""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection)
+
+
+class ConnectionPool:
+    """Pool connection MySQL có hàng đợi chờ
+
+    Khác pooling.MySQLConnectionPool (báo lỗi ngay khi hết connection):
+    - Mở connection lười, tối đa pool_size
+    - Hết connection → thread gọi chờ tối đa pool_timeout giây rồi mới báo
+      PoolExhaustedError
+    - Connection trả về được rollback nếu còn transaction mở (không mang
+      snapshot/lock sang lần mượn sau)
+    - Connection rảnh quá ping_interval giây được ping (tự reconnect) trước khi cho mượn
+
+    Thống kê (xem stats()): checkouts, exhausted (số lần phải chờ),
+    timeouts, thời gian chờ trung bình/lớn nhất, in_use/peak_in_use
+    """
+
+    def __init__(self, pool_name: str = 'battleship_pool', pool_size: int = 10,
+                 pool_timeout: float = 5.0, ping_interval: float = 30.0, **db_config):
+        self.pool_name = pool_name
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.ping_interval = ping_interval
+        self.db_config = db_config
+
+        self.idle = deque()  # (connection, thời điểm trả về)
+        self.size = 0        # Số connection đã mở (kể cả đang cho mượn)
+        self.condition = Condition()
+        self.closed = False  # close_all() đã gọi: connection trả về bị đóng luôn
+
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.exhausted = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def get_connection(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Mượn 1 connection, chờ nếu pool đang hết
+
+        Args:
+            timeout: Giây chờ tối đa (mặc định pool_timeout)
+
+        Returns:
+            PooledConnection (gọi close() để trả lại)
+
+        Raises:
+            PoolExhaustedError: Chờ quá timeout
+            mysql.connector.Error: Không mở được connection mới
+        """
+        timeout = self.pool_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        with self.condition:
+            waited = False
+            while not self.idle and self.size >= self.pool_size:
+                if not waited:
+                    waited = True
+                    self.exhausted += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolExhaustedError(
+                        f"Pool '{self.pool_name}' exhausted ({self.pool_size} connections in use for {timeout}s)")
+                self.condition.wait(remaining)
+
+            if self.idle:
+                connection, released_at = self.idle.pop()  # LIFO: connection vừa dùng còn "nóng"
+            else:
+                connection, released_at = None, None
+                self.size += 1  # Giữ chỗ, mở connection ngoài lock
+
+            waited_for = time.monotonic() - started
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.wait_total += waited_for
+            self.wait_max = max(self.wait_max, waited_for)
+
+        try:
+            if connection is None:
+                connection = mysql.connector.connect(**self.db_config)
+            elif time.monotonic() - released_at > self.ping_interval:
+                connection.ping(reconnect=True, attempts=1)
+        except Error:
+            self._discard(connection)
+            raise
+        return PooledConnection(self, connection)
+
+    def release(self, connection) -> None:
+        """Nhận lại connection (PooledConnection.close() gọi hàm này)"""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error as e:
+            logging.warning(f"Discarding broken pooled connection: {e}")
+            self._discard(connection)
+            return
+
+        with self.condition:
+            if not self.closed:
+                self.in_use -= 1
+                self.idle.append((connection, time.monotonic()))
+                self.condition.notify()
+                return
+        # Pool đã close_all(): đóng luôn, không đưa lại vào idle
+        self._discard(connection)
+
+    def _discard(self, connection) -> None:
+        """Bỏ connection hỏng, nhường chỗ cho connection mới"""
+        if connection is not None:
+            try:
+                connection.close()
+            except Error:
+                pass
+        with self.condition:
+            self.size -= 1
+            self.in_use -= 1
+            self.condition.notify()
+
+    def stats(self) -> dict:
+        """Số liệu pool cho log/giám sát"""
+        with self.condition:
+            return {
+                'pool_size': self.pool_size,
+                'open': self.size,
+                'idle': len(self.idle),
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'exhausted': self.exhausted,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0,
+                'max_wait_ms': round(self.wait_max * 1000, 2)
+            }
+
+    def close_all(self) -> None:
+        """Đóng các connection đang rảnh (connection đang mượn đóng khi được trả)
+
+        Sau khi gọi, release() đóng connection thay vì đưa lại vào idle
+        """
+        with self.condition:
+            self.closed = True
+            idle, self.idle = list(self.idle), deque()
+            self.size -= len(idle)
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except Error:
+                pass
+
+
+class MySQLBackend(StorageBackend):
+    """Backend MySQL: mọi connection đi qua 1 ConnectionPool
+
+    Config: DB_CONFIG (thông tin đăng nhập) + POOL_CONFIG (pool_size, pool_timeout, ping_interval)
+    """
+
+    name = 'mysql'
+    errors = (Error,)
+
+    def __init__(self, db_config: dict, pool_config: dict):
+        self.pool = ConnectionPool(**pool_config, **db_config)
+        logging.info(f"Database connection pool created (size {self.pool.pool_size})")
+
+    def get_connection(self) -> PooledConnection:
+        return self.pool.get_connection()
+
+    def stats(self) -> Optional[dict]:
+        return dict(self.pool.stats(), backend=self.name)
+
+    def close(self) -> None:
+        self.pool.close_all()
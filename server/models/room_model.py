@@ -232,16 +232,16 @@ class RoomModel(BaseModel):
             True nếu thành công, False nếu thất bại
         
         Tự động cập nhật:
-        - 'in_progress' → đặt started_at = NOW()
-        - 'finished' → đặt finished_at = NOW()
+        - 'in_progress' → đặt started_at = CURRENT_TIMESTAMP
+        - 'finished' → đặt finished_at = CURRENT_TIMESTAMP
         """
         query = "UPDATE rooms SET status = %s"
         params = [status]
         
         if status == 'in_progress':
-            query += ", started_at = NOW()"
+            query += ", started_at = CURRENT_TIMESTAMP"
         elif status == 'finished':
-            query += ", finished_at = NOW()"
+            query += ", finished_at = CURRENT_TIMESTAMP"
         
         query += " WHERE id = %s"
         params.append(room_id)
@@ -267,9 +267,9 @@ class RoomModel(BaseModel):
         
         Tự động:
         - Đặt status = 'finished'
-        - Đặt finished_at = NOW()
+        - Đặt finished_at = CURRENT_TIMESTAMP
         """
-        query = "UPDATE rooms SET winner_id = %s, status = 'finished', finished_at = NOW() WHERE id = %s"
+        query = "UPDATE rooms SET winner_id = %s, status = 'finished', finished_at = CURRENT_TIMESTAMP WHERE id = %s"
         try:
             BaseModel.execute_query(query, (winner_id, room_id), commit=True)
             logging.info(f"Room {room_id} winner set to user {winner_id}")
@@ -0,0 +1,164 @@
+"""
+SQLite Storage Backend
+Database nhúng 1 file cho máy đơn, CI và load test (không cần MySQL daemon)
+"""
+import os
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from models.storage import StorageBackend
+
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'config', 'battleship_sqlite.sql')
+
+
+@lru_cache(maxsize=512)
+def translate(query: str) -> str:
+    """Đổi placeholder %s (cú pháp model dùng chung) sang ? của sqlite3"""
+    return query.replace('%s', '?')
+
+
+class SQLiteCursor:
+    """Cursor bọc sqlite3.Cursor với API giống mysql.connector
+
+    dictionary=True → fetch trả về Dict thay vì tuple
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool = False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query, params=()):
+        self._cursor.execute(translate(query), params or ())
+
+    def executemany(self, query, params_list):
+        self._cursor.executemany(translate(query), params_list)
+
+    def _row(self, row):
+        if row is None:
+            return None
+        return dict(row) if self._dictionary else tuple(row)
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        return [self._row(row) for row in rows]
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Connection của 1 thread, close() chỉ kết thúc lượt dùng (rollback phần chưa commit)"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection = connection
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._connection.in_transaction
+
+    def cursor(self, dictionary: bool = False, **kwargs) -> SQLiteCursor:
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+
+    def start_transaction(self, **kwargs):
+        """BEGIN tường minh (sqlite3 chỉ tự BEGIN trước INSERT/UPDATE/DELETE,
+        các câu SELECT liên tiếp sẽ không cùng 1 snapshot nếu không gọi hàm này)
+
+        kwargs của mysql.connector (consistent_snapshot...) bỏ qua: snapshot
+        của SQLite WAL bắt đầu từ câu đọc đầu tiên sau BEGIN
+        """
+        if not self._connection.in_transaction:
+            self._connection.execute('BEGIN')
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        if self._connection.in_transaction:
+            self._connection.rollback()
+
+
+class SQLiteBackend(StorageBackend):
+    """Backend SQLite
+
+    - WAL: nhiều thread đọc song song trong lúc 1 thread ghi
+    - Mỗi thread giữ 1 connection riêng suốt đời thread (sqlite3 không chia
+      connection giữa các thread), không có pool nên không có chờ connection
+    - Prepared statement: sqlite3 cache câu lệnh đã biên dịch theo connection
+      (cached_statements), câu SQL đã đổi placeholder được nhớ ở translate()
+    - Schema (config/battleship_sqlite.sql) được tạo lần đầu mở database
+
+    Config: SQLITE_CONFIG trong config/db_config.py (path, timeout, cached_statements)
+    """
+
+    name = 'sqlite'
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path: str = 'battleship.db', timeout: float = 5.0, cached_statements: int = 256):
+        self.path = path
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.schema_ready = False
+        self.connections_opened = 0
+
+    def get_connection(self) -> SQLiteConnection:
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self._connect()
+            self.local.connection = connection
+        return SQLiteConnection(connection)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                     cached_statements=self.cached_statements)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('PRAGMA foreign_keys=ON')
+
+        with self.lock:
+            self.connections_opened += 1
+            if not self.schema_ready:
+                with open(SCHEMA_PATH, encoding='utf-8') as schema:
+                    connection.executescript(schema.read())
+                self.schema_ready = True
+                logging.info(f"SQLite database ready at {self.path}")
+        return connection
+
+    def stats(self) -> Optional[dict]:
+        return {
+            'backend': self.name,
+            'path': self.path,
+            'connections_opened': self.connections_opened,
+            'statements_translated': translate.cache_info().currsize
+        }
+
+    def close(self) -> None:
+        """Đóng connection của thread gọi (connection thread khác đóng khi thread kết thúc)"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
@@ -0,0 +1,55 @@
+"""
+Storage Backends
+Lớp lưu trữ bên dưới BaseModel: MySQL (mặc định) hoặc SQLite nhúng
+"""
+from typing import Optional, Tuple, Type
+
+
+class StorageBackend:
+    """Giao diện chung mà Database/BaseModel dùng
+
+    Connection trả về từ get_connection() có API giống mysql.connector:
+    - cursor(dictionary=True) → execute / executemany (placeholder %s),
+      fetchone / fetchall / fetchmany, lastrowid, rowcount, close
+    - start_transaction(), commit(), rollback(), close() (trả connection, không
+      nhất thiết đóng socket/file)
+
+    Thuộc tính:
+    - name: Tên dialect ('mysql' | 'sqlite'), model chọn câu SQL riêng theo tên này
+    - errors: Tuple exception của driver (BaseModel bắt để rollback + log)
+    """
+
+    name: str = ''
+    errors: Tuple[Type[BaseException], ...] = ()
+
+    def get_connection(self):
+        raise NotImplementedError
+
+    def stats(self) -> Optional[dict]:
+        """Số liệu cho log/giám sát (None nếu chưa dùng)"""
+        return None
+
+    def close(self) -> None:
+        """Đóng connection rảnh khi tắt server"""
+
+
+def create_backend(name: str) -> StorageBackend:
+    """Tạo backend theo DB_BACKEND trong config/db_config.py
+
+    Driver chỉ được import khi backend đó được chọn (máy chạy SQLite không
+    cần cài mysql-connector-python)
+
+    Raises:
+        ValueError: Tên backend không hỗ trợ
+    """
+    if name == 'mysql':
+        from config.db_config import DB_CONFIG, POOL_CONFIG
+        from models.mysql_backend import MySQLBackend
+        return MySQLBackend(DB_CONFIG, POOL_CONFIG)
+
+    if name == 'sqlite':
+        from config.db_config import SQLITE_CONFIG
+        from models.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(**SQLITE_CONFIG)
+
+    raise ValueError(f"Unknown database backend: {name}")
@@ -0,0 +1,124 @@
+"""
+User Index
+Index username ↔ user_id trong process, dùng chung cho mọi model
+"""
+import logging
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+from models.base_model import BaseModel
+
+
+class UserIndex:
+    """Tra username → id (và ngược lại) không cần query
+
+    - warm(): Nạp toàn bộ bảng users 1 lần lúc server start
+    - add(): UserModel.create_user gọi sau khi INSERT thành công
+    - get_id() / resolve_ids(): Tra trong index, tên chưa có mới query
+      (user tạo bởi process khác, hoặc index chưa warm) rồi nhớ lại
+
+    Chỉ nhớ kết quả có thật (username không tồn tại thì lần sau vẫn query),
+    nên index không bao giờ trả sai - tệ nhất là thêm 1 query
+    Username/id không đổi sau khi tạo nên không cần invalidate
+
+    Thread-safe, dùng classmethod như Database (1 index cho cả process)
+    """
+
+    _ids: Dict[str, int] = {}
+    _names: Dict[int, str] = {}
+    _lock = Lock()
+    warmed = False
+
+    @classmethod
+    def warm(cls) -> int:
+        """Nạp mọi (id, username) từ bảng users
+
+        Returns:
+            Số user trong index, -1 nếu không đọc được database (index sẽ tự
+            đầy dần qua các lần tra)
+        """
+        try:
+            rows = cls._load_all()
+        except Exception as e:
+            logging.warning(f'User index not warmed: {e}')
+            return -1
+
+        with cls._lock:
+            for row in rows:
+                cls._ids[row['username']] = row['id']
+                cls._names[row['id']] = row['username']
+            cls.warmed = True
+            count = len(cls._ids)
+        logging.info(f'User index warmed with {count} users')
+        return count
+
+    @classmethod
+    def add(cls, user_id: int, username: str) -> None:
+        """Ghi nhận user vừa tạo"""
+        with cls._lock:
+            cls._ids[username] = user_id
+            cls._names[user_id] = username
+
+    @classmethod
+    def get_id(cls, username: str) -> Optional[int]:
+        """user_id của username, None nếu không tồn tại"""
+        if not username:
+            return None
+        return cls.resolve_ids([username]).get(username)
+
+    @classmethod
+    def get_username(cls, user_id: int) -> Optional[str]:
+        """Username đã biết của user_id (chỉ tra index, không query)"""
+        with cls._lock:
+            return cls._names.get(user_id)
+
+    @classmethod
+    def resolve_ids(cls, usernames: Iterable[str]) -> Dict[str, int]:
+        """Tra nhiều username cùng lúc
+
+        Returns:
+            {username: user_id} cho các username tồn tại; các tên chưa có
+            trong index được tra bằng 1 query IN (...)
+        """
+        found = {}
+        missing = []
+        with cls._lock:
+            for username in set(usernames):
+                user_id = cls._ids.get(username)
+                if user_id is None:
+                    missing.append(username)
+                else:
+                    found[username] = user_id
+
+        if missing:
+            rows = cls._load_ids(sorted(missing))
+            for row in rows:
+                cls.add(row['id'], row['username'])
+            # Collation MySQL không phân biệt hoa thường: 'Player1' khớp dòng 'player1'
+            exact = {row['username']: row['id'] for row in rows}
+            folded = {row['username'].casefold(): row['id'] for row in rows}
+            for username in missing:
+                user_id = exact.get(username, folded.get(username.casefold()))
+                if user_id is not None:
+                    found[username] = user_id
+        return found
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._ids.clear()
+            cls._names.clear()
+            cls.warmed = False
+
+    @staticmethod
+    def _load_all() -> List[Dict]:
+        return BaseModel.execute_query("SELECT id, username FROM users", fetch_all=True) or []
+
+    @staticmethod
+    def _load_ids(usernames: List[str]) -> List[Dict]:
+        placeholders = ', '.join(['%s'] * len(usernames))
+        return BaseModel.execute_query(
+            f"SELECT id, username FROM users WHERE username IN ({placeholders})",
+            tuple(usernames),
+            fetch_all=True
+        ) or []
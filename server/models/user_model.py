@@ -6,6 +6,7 @@ import hashlib
 from datetime import datetime
 from decimal import Decimal
 from models.base_model import BaseModel
+from models.user_index import UserIndex
 
 
 class UserModel(BaseModel):
@@ -15,20 +16,24 @@ class UserModel(BaseModel):
     - id: INT PRIMARY KEY AUTO_INCREMENT
     - username: VARCHAR(50) UNIQUE
     - password: VARCHAR(255) (hashed)
-    - wins: INT DEFAULT 0
-    - losses: INT DEFAULT 0
-    - draws: INT DEFAULT 0
-    - total_games: INT DEFAULT 0
     - is_online: BOOLEAN DEFAULT 0
     - created_at: TIMESTAMP
     
+    Thống kê thắng/thua đọc từ bảng user_stats (GameHistoryModel cập nhật
+    mỗi khi ghi trận), không tính lại từ game_history
+    
     Methods:
     - authenticate(): Đăng nhập
     - create_user(): Đăng ký
     - get_user_by_id(): Lấy thông tin user
     - get_user_by_username(): Tìm user theo username
     - set_online_status(): Set online/offline
+    - update_online_status(): Ghi is_online cho nhiều user (PresenceRegistry flush)
+    - reset_online_status(): Đưa mọi user về offline (lúc server start/stop)
     - get_user_stats(): Lấy thống kê
+    
+    Trạng thái online thật nằm trong bộ nhớ của RoomServer
+    (networking/presence.py), cột is_online chỉ là bản sao ghi định kỳ
     """
     
     @staticmethod
@@ -76,7 +81,9 @@ class UserModel(BaseModel):
             
         Returns:
             Dict user info nếu đúng, None nếu sai
-            Dict với 'error' nếu đã online
+        
+        Không kiểm tra đăng nhập trùng: RoomServer tra PresenceRegistry
+        (is_online trong database có thể trễ vài giây)
         """
         # TẠM THỜI: Database đang lưu plain text password, không hash
         # TODO: Sau này nên hash tất cả passwords trong DB
@@ -90,13 +97,6 @@ class UserModel(BaseModel):
         result = cls.execute_query(query, (username, password), fetch_one=True)
         
         if result:
-            # Check if already online
-            if result.get('is_online'):
-                return {
-                    'error': 'already_online',
-                    'username': result.get('username')
-                }
-            
             # Thêm stats tính từ game_history
             stats = cls._calculate_user_stats(result['id'])
             result.update(stats)
@@ -115,6 +115,8 @@ class UserModel(BaseModel):
             
         Returns:
             user_id nếu thành công, None nếu thất bại
+        
+        User mới được thêm vào UserIndex ngay sau khi commit
         """
         # TẠM THỜI: Lưu plain text để tương thích với users hiện có
         # TODO: Sau này nên hash passwords
@@ -124,7 +126,10 @@ class UserModel(BaseModel):
             VALUES (%s, %s, 0)
         """
         
-        return cls.execute_query(query, (username, password), commit=True)
+        user_id = cls.execute_query(query, (username, password), commit=True)
+        if user_id:
+            UserIndex.add(user_id, username)
+        return user_id
     
     @classmethod
     def get_user_by_id(cls, user_id):
@@ -180,7 +185,7 @@ class UserModel(BaseModel):
     
     @classmethod
     def _calculate_user_stats(cls, user_id):
-        """Tính toán stats từ game_history
+        """Lấy stats tổng hợp của user (1 dòng user_stats theo khóa chính)
         
         Args:
             user_id: ID của user
@@ -189,12 +194,8 @@ class UserModel(BaseModel):
             Dict với wins, losses, draws, total_games
         """
         query = """
-            SELECT 
-                SUM(CASE WHEN result = 'win' THEN 1 ELSE 0 END) as wins,
-                SUM(CASE WHEN result = 'lose' THEN 1 ELSE 0 END) as losses,
-                0 as draws,
-                COUNT(*) as total_games
-            FROM game_history
+            SELECT wins, losses, 0 as draws, total_games
+            FROM user_stats
             WHERE user_id = %s
         """
         
@@ -221,6 +222,46 @@ class UserModel(BaseModel):
         result = cls.execute_query(query, (1 if is_online else 0, user_id), commit=True)
         return result is not None
     
+    @classmethod
+    def update_online_status(cls, online_ids, offline_ids):
+        """Ghi is_online cho nhiều user trong 1 transaction
+        
+        Args:
+            online_ids: List user_id chuyển sang online
+            offline_ids: List user_id chuyển sang offline
+            
+        Returns:
+            Số user đã ghi
+        
+        Tối đa 2 câu UPDATE ... WHERE id IN (...) cho cả batch
+        """
+        with cls.transaction() as cursor:
+            for is_online, user_ids in ((1, online_ids), (0, offline_ids)):
+                if not user_ids:
+                    continue
+                placeholders = ', '.join(['%s'] * len(user_ids))
+                cursor.execute(
+                    f"UPDATE users SET is_online = %s WHERE id IN ({placeholders})",
+                    (is_online, *user_ids)
+                )
+        return len(online_ids) + len(offline_ids)
+    
+    @classmethod
+    def reset_online_status(cls):
+        """Đưa mọi user về offline (cờ còn sót lại từ lần chạy trước / khi tắt server)
+        
+        Returns:
+            True nếu thành công
+        """
+        query = """
+            UPDATE users 
+            SET is_online = 0
+            WHERE is_online = 1
+        """
+        
+        result = cls.execute_query(query, commit=True)
+        return result is not None
+    
     @classmethod
     def get_user_stats(cls, user_id):
         """Lấy thống kê của user
@@ -234,27 +275,26 @@ class UserModel(BaseModel):
         query = """
             SELECT 
                 u.username,
-                u.wins as total_wins,
-                u.losses as total_losses,
-                u.draws as total_draws,
-                u.total_games,
+                COALESCE(s.wins, 0) as total_wins,
+                COALESCE(s.losses, 0) as total_losses,
+                0 as total_draws,
+                COALESCE(s.total_games, 0) as total_games,
                 CASE 
-                    WHEN u.total_games > 0 THEN ROUND((u.wins * 100.0 / u.total_games), 2)
+                    WHEN s.total_games > 0 THEN ROUND((s.wins * 100.0 / s.total_games), 2)
                     ELSE 0 
                 END as win_rate,
-                COALESCE(SUM(gh.ships_sunk), 0) as total_ships_sunk,
-                COALESCE(SUM(gh.hits), 0) as total_hits,
-                COALESCE(SUM(gh.misses), 0) as total_misses,
+                COALESCE(s.total_ships_sunk, 0) as total_ships_sunk,
+                COALESCE(s.total_hits, 0) as total_hits,
+                COALESCE(s.total_misses, 0) as total_misses,
                 CASE 
-                    WHEN SUM(gh.hits + gh.misses) > 0 
-                    THEN ROUND((SUM(gh.hits) * 100.0 / SUM(gh.hits + gh.misses)), 2)
+                    WHEN s.total_hits + s.total_misses > 0 
+                    THEN ROUND((s.total_hits * 100.0 / (s.total_hits + s.total_misses)), 2)
                     ELSE 0 
                 END as avg_accuracy,
-                COALESCE(MAX(gh.max_streak), 0) as best_streak
+                COALESCE(s.best_streak, 0) as best_streak
             FROM users u
-            LEFT JOIN game_history gh ON u.id = gh.user_id
+            LEFT JOIN user_stats s ON s.user_id = u.id
             WHERE u.id = %s
-            GROUP BY u.id
         """
         
         return cls.execute_query(query, (user_id,), fetch_one=True)
@@ -0,0 +1,381 @@
+"""
+Asyncio engine cho RoomServer
+Một event loop phục vụ mọi kết nối thay cho 1 thread/kết nối
+"""
+import asyncio
+import json
+import logging
+import threading
+from threading import Thread
+from typing import Callable, Optional
+
+from networking.network import Network, MessageBuffer
+from networking.room_server import RoomServer, GameRoom, ClientSession, DATABASE_REQUESTS
+from networking.db_executor import DatabaseExecutor, ExecutorBusyError, BUSY_RESPONSE
+from networking.presence import PresenceRegistry
+from models.game_history_writer import GameHistoryWriter
+
+
+MAX_PENDING_MESSAGES = 64  # Quá số message chờ xử lý → tạm dừng đọc socket (backpressure)
+
+
+class AsyncConnection(Network):
+    """1 kết nối chạy trên asyncio transport, cùng interface với Connection
+
+    Thuộc tính:
+    - transport: asyncio transport của client
+    - buffer: MessageBuffer (asyncio đọc thẳng vào buffer qua BufferedProtocol)
+    - messages: asyncio.Queue chứa message đã tách, chờ serve_connection xử lý
+
+    send() và close() gọi được từ mọi thread: ngoài event loop thì chuyển sang
+    loop qua call_soon_threadsafe (vd: broadcast từ executor thread)
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, transport: asyncio.Transport):
+        self.loop = loop
+        self.transport = transport
+        self.buffer = MessageBuffer()
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.loop_thread_id = threading.get_ident()
+        self.reading_paused = False
+        self.closed = False  # Event loop đã đóng: bỏ qua mọi lần gửi như socket đã chết
+
+    @property
+    def legacy(self) -> bool:
+        """True nếu client dùng datagram 4096 bytes kiểu cũ"""
+        return bool(self.buffer.legacy)
+
+    async def receive(self) -> object:
+        """Chờ 1 message, None nếu client đã đóng kết nối"""
+        message = await self.messages.get()
+        if self.reading_paused and self.messages.qsize() < MAX_PENDING_MESSAGES // 2:
+            self.reading_paused = False
+            if not self.transport.is_closing():
+                self.transport.resume_reading()
+        return message
+
+    def feed_messages(self) -> None:
+        """Tách mọi message hoàn chỉnh trong buffer vào hàng đợi (chạy trong event loop)"""
+        while True:
+            payload = self.buffer.pop_message()
+            if payload is None:
+                break
+            self.messages.put_nowait(json.loads(payload))
+
+        if not self.reading_paused and self.messages.qsize() >= MAX_PENDING_MESSAGES:
+            self.reading_paused = True
+            self.transport.pause_reading()
+
+    def send(self, data: object) -> None:
+        """Gửi 1 message theo định dạng của kết nối (không block)
+
+        Event loop đã đóng (broadcast từ executor/writer thread lúc tắt server)
+        → đánh dấu closed và bỏ message, giống transport đã đóng
+        """
+        if self.closed:
+            return
+        message = self.encode_message(data, self.legacy)
+        if threading.get_ident() == self.loop_thread_id:
+            self._write(message)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._write, message)
+        except RuntimeError:
+            self.closed = True
+
+    def _write(self, message: bytes) -> None:
+        if not self.transport.is_closing():
+            self.transport.write(message)
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        """Không dùng với asyncio (giữ cho giống interface Connection)"""
+
+    def close(self) -> None:
+        """Đóng transport (bỏ qua nếu event loop đã dừng)"""
+        if threading.get_ident() == self.loop_thread_id:
+            self.transport.close()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.transport.close)
+        except RuntimeError:
+            self.closed = True
+
+
+class RoomServerProtocol(asyncio.BufferedProtocol):
+    """asyncio protocol cho 1 client: nhận bytes vào buffer, tách message, giao cho AsyncRoomServer"""
+
+    def __init__(self, server: 'AsyncRoomServer'):
+        self.server = server
+        self.connection: Optional[AsyncConnection] = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.connection = AsyncConnection(self.server.loop, transport)
+        address = transport.get_extra_info('peername')
+        self.server.loop.create_task(self.server.serve_connection(self.connection, address))
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.connection.buffer.writable()
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.connection.buffer.commit(nbytes)
+        try:
+            self.connection.feed_messages()
+        except ValueError as e:
+            logging.info(f'Invalid message, closing connection: {e}')
+            self.connection.transport.close()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.connection.messages.put_nowait(None)
+
+
+class AsyncRoomServer(RoomServer):
+    """RoomServer chạy trên asyncio
+
+    Dùng lại nguyên các handler của RoomServer:
+    - process_auth_request, process_lobby_request, process_request, process_session_request
+    - join_room / leave_room / register_lobby_client / leave_lobby
+    - broadcast / announce_winner (AsyncConnection.send không block)
+
+    Khác biệt với engine threaded:
+    - Event loop chạy trong 1 thread nền (Tk mainloop giữ main thread)
+    - Mỗi kết nối là 1 coroutine thay vì 1 thread → hàng nghìn kết nối không tốn thêm thread
+    - Request chạm database (auth, DATABASE_REQUESTS) chạy trong db_executor
+      để MySQL chậm không chặn event loop
+    - Request của 1 kết nối xử lý tuần tự theo thứ tự gửi, trừ DATABASE_REQUESTS
+      có request_id: response gửi khi xong, không giữ các request sau
+    """
+
+    def __init__(self, host_address: str, host_port: int,
+                 backlog: int = 128, session_ttl: float = 3600,
+                 history_writer: Optional[GameHistoryWriter] = None,
+                 db_executor: Optional[DatabaseExecutor] = None,
+                 presence: Optional[PresenceRegistry] = None):
+        super().__init__(host_address, host_port, session_ttl, history_writer, db_executor, presence)
+        self.backlog = backlog
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[Thread] = None
+        self.async_server: Optional[asyncio.AbstractServer] = None
+
+    def start_server(self):
+        """Start event loop thread và chờ tới khi đã lắng nghe được port
+
+        Raises:
+            OSError: Không bind được port (giống engine threaded)
+        """
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        errors = []
+
+        self.prepare_storage()
+        self.loop_thread = Thread(target=self._run_loop, args=(started, errors))
+        self.loop_thread.daemon = True
+        self.loop_thread.start()
+        started.wait()
+
+        if errors:
+            raise errors[0]
+
+        logging.info(f'Room Server (asyncio) started on {self.host_address}:{self.host_port}')
+
+    def _run_loop(self, started: threading.Event, errors: list):
+        """Thân thread nền: tạo server rồi chạy event loop tới khi stop_server()"""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.async_server = self.loop.run_until_complete(self.loop.create_server(
+                lambda: RoomServerProtocol(self),
+                self.host_address, self.host_port,
+                backlog=self.backlog, reuse_address=True
+            ))
+            # Port 0 → lấy port thật do hệ điều hành cấp
+            self.host_port = self.async_server.sockets[0].getsockname()[1]
+        except OSError as e:
+            errors.append(e)
+            started.set()
+            self.loop.close()
+            return
+
+        started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def stop_server(self):
+        """Stop the server: đóng mọi kết nối, hủy coroutine đang chạy, dừng event loop"""
+        super().stop_server()
+
+        if self.loop and self.loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+            try:
+                future.result(timeout=5)
+            except Exception as e:
+                logging.error(f'Error stopping event loop: {e}')
+            self.loop_thread.join(timeout=5)
+
+    async def _shutdown(self):
+        """Đóng server socket, hủy các serve_connection còn lại rồi dừng loop"""
+        if self.async_server:
+            self.async_server.close()
+            await self.async_server.wait_closed()
+
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.loop.call_soon(self.loop.stop)
+
+    def record_match(self, room: GameRoom):
+        """Giao biên bản trận cho writer qua db_executor (không bị giới hạn, không mất trận)
+
+        announce_winner có thể chạy ngay trong event loop, mà submit() sẽ block
+        (rồi ghi đồng bộ) khi hàng đợi của writer đầy
+        """
+        match = room.build_match_record()
+        if not match:
+            return
+        try:
+            self.db_executor.submit(self.history_writer.submit_match, match, bounded=False)
+        except RuntimeError:
+            # Executor đã shutdown (đang dừng server)
+            self.history_writer.submit_match(match)
+
+    async def run_blocking(self, handler: Callable, *args):
+        """Chạy handler có thể block (database) trong db_executor
+
+        Returns:
+            Kết quả handler, BUSY_RESPONSE nếu pool đầy
+        """
+        try:
+            future = self.db_executor.submit(handler, *args)
+        except ExecutorBusyError as e:
+            logging.warning(f'Rejected {handler.__name__}: {e}')
+            return BUSY_RESPONSE
+        return await asyncio.wrap_future(future)
+
+    async def handle_database_request_async(self, connection: AsyncConnection, request_data: dict):
+        """Chờ kết quả trong event loop nếu client ghép response theo thứ tự
+        (xem RoomServer.submit_database_request)"""
+        future = self.submit_database_request(connection, request_data)
+        if future is not None:
+            await asyncio.wrap_future(future)
+            self.send_database_result(connection, request_data, future)
+
+    async def dispatch(self, handler: Callable, request_data: dict, *args):
+        """Gọi handler trực tiếp nếu là request trong bộ nhớ, qua executor nếu chạm database"""
+        if 'action' in request_data or request_data.get('request') in DATABASE_REQUESTS:
+            return await self.run_blocking(handler, request_data, *args)
+        return handler(request_data, *args)
+
+    async def serve_connection(self, connection: AsyncConnection, address):
+        """Coroutine xử lý 1 kết nối (tương đương handle_client của engine threaded)"""
+        username = None
+        room_id = None
+        in_lobby = False
+
+        try:
+            # Receive initial connection data (username and room_id)
+            connection_data = await connection.receive()
+            if not connection_data:
+                return
+
+            # Session: 1 kết nối cho auth, lobby và phòng
+            if 'channel' in connection_data:
+                await self.session_listener_async(connection, connection_data, address)
+                return
+            
+            # Auth request: trả lời rồi đóng kết nối
+            action = connection_data.get('action')
+            if action and action.startswith('auth:'):
+                response = await self.run_blocking(self.process_auth_request, connection_data)
+                self.send_data(connection, response)
+                return
+
+            username, user_id = self.resolve_identity(connection_data)
+            room_id = connection_data.get('room_id')
+
+            if not username:
+                logging.warning(f'Invalid connection data from {address}')
+                return
+
+            if room_id is None:
+                in_lobby = True
+                self.register_lobby_client(connection, username, address)
+                await self.lobby_listener_async(connection, username)
+                return
+
+            room = self.join_room(connection, username, room_id, user_id, address)
+            if not room:
+                return
+
+            await self.client_listener_async(connection, username, room)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f'Error handling client {username}: {e}')
+        finally:
+            if in_lobby and username:
+                self.leave_lobby(username)
+            elif username and room_id is not None:
+                self.leave_room(username, room_id)
+
+            connection.close()
+
+    async def session_listener_async(self, connection: AsyncConnection, first_request: dict, address):
+        """Listen to session client (tương đương session_listener của engine threaded)"""
+        session = ClientSession(address)
+        request_data = first_request
+        try:
+            while request_data:
+                if session.username and self.is_database_request(request_data):
+                    await self.handle_database_request_async(connection, request_data)
+                    request_data = await connection.receive()
+                    continue
+
+                response = await self.dispatch(self.process_session_request, request_data,
+                                               session, connection)
+                if response is None:
+                    break
+                self.send_response(connection, request_data, response)
+                request_data = await connection.receive()
+        finally:
+            self.close_session(session)
+
+    async def lobby_listener_async(self, connection: AsyncConnection, username: str):
+        """Listen to lobby client (keeps connection alive)"""
+        while True:
+            request_data = await connection.receive()
+            if not request_data:
+                break
+
+            if self.is_database_request(request_data):
+                await self.handle_database_request_async(connection, request_data)
+                continue
+
+            response = await self.dispatch(self.process_lobby_request, request_data, username)
+            if response is None:
+                break
+            self.send_response(connection, request_data, response)
+
+    async def client_listener_async(self, connection: AsyncConnection, username: str, room: GameRoom):
+        """Listen to room client messages"""
+        while True:
+            request_data = await connection.receive()
+            if not request_data:
+                logging.info(f'Client {username} connection closed (empty data)')
+                break
+
+            self.update_room_status(room)
+
+            if self.is_database_request(request_data):
+                await self.handle_database_request_async(connection, request_data)
+            elif 'request' in request_data:
+                response = await self.dispatch(self.process_request, request_data, username, room)
+                self.send_response(connection, request_data, response)
+
+                if request_data.get('request') == 'disconnect':
+                    logging.info(f'Client {username} requested disconnect - breaking loop')
+                    break
+            else:
+                self.send_response(connection, request_data, {'message': 'ok'})
@@ -0,0 +1,72 @@
+"""
+Bitboard cho lưới tàu phía server
+Mỗi ô là 1 bit (row * 10 + col), mỗi phép bắn chỉ là vài phép toán bit
+"""
+from typing import Dict, List, NamedTuple, Optional
+
+from networking.network import GRID_SIZE, fleet_masks
+
+
+class ShotResult(NamedTuple):
+    """Kết quả 1 phát bắn
+
+    - ship_name: Tên tàu trúng (None nếu trượt)
+    - sunk: Tàu vừa chìm với phát bắn này
+    - fleet_destroyed: Toàn bộ hạm đội đã chìm (người bắn thắng)
+    """
+    ship_name: Optional[str]
+    sunk: bool
+    fleet_destroyed: bool
+
+
+MISS = ShotResult(None, False, False)
+
+
+class Board:
+    """Hạm đội của 1 người chơi dạng bitmask
+
+    Thuộc tính:
+    - ships: {ship_name: mask} các ô của từng tàu (không đổi)
+    - alive: Mask các ô tàu chưa bị bắn trúng
+    - shots: Mask các ô đã bị bắn
+
+    Mọi kiểm tra (trúng, chìm, hết hạm đội) là O(1):
+    - Trúng: alive & bit
+    - Chìm: ships[name] & alive == 0
+    - Hết hạm đội: alive == 0
+    """
+
+    __slots__ = ('ships', 'alive', 'shots')
+
+    def __init__(self, ships: Dict[str, int]):
+        self.ships = ships
+        self.alive = 0
+        for mask in ships.values():
+            self.alive |= mask
+        self.shots = 0
+
+    @classmethod
+    def from_fleet(cls, fleet: List[Optional[List[int]]]) -> 'Board':
+        """Tạo Board từ fleet [col, row, vertical, length] (xem network.encode_fleet)
+
+        Raises:
+            ValueError: Fleet không hợp lệ
+        """
+        return cls(fleet_masks(fleet))
+
+    def fire(self, col: int, row: int) -> ShotResult:
+        """Bắn vào ô (col, row)
+
+        Bắn lại ô đã bắn tính là trượt (giống lưới cũ đánh dấu 'X')
+        """
+        if not (0 <= col < GRID_SIZE and 0 <= row < GRID_SIZE):
+            return MISS
+
+        bit = 1 << (row * GRID_SIZE + col)
+        self.shots |= bit
+        if not self.alive & bit:
+            return MISS
+
+        self.alive &= ~bit
+        ship_name = next(name for name, mask in self.ships.items() if mask & bit)
+        return ShotResult(ship_name, not (self.ships[ship_name] & self.alive), self.alive == 0)
@@ -0,0 +1,129 @@
+"""
+Database Executor
+Thread pool có giới hạn cho các request chạm database của RoomServer
+"""
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Callable
+
+
+class ExecutorBusyError(RuntimeError):
+    """Pool đang đầy (mọi worker bận và hàng đợi đã đủ max_queue việc)"""
+
+
+# Response gửi cho client khi request bị từ chối vì pool đầy
+BUSY_RESPONSE = {'success': False, 'busy': True, 'error': 'Server busy, please try again'}
+
+
+class DatabaseExecutor:
+    """Chạy việc chạm database trên `workers` thread riêng, tách khỏi thread/event
+    loop đang giữ socket của người chơi
+
+    - Tối đa workers + max_queue việc cùng lúc (đang chạy + đang chờ), quá số
+      đó submit() từ chối ngay (ExecutorBusyError) thay vì xếp hàng vô hạn:
+      MySQL chậm chỉ làm request thống kê bị từ chối, không kéo dài hàng đợi
+    - Thống kê: queue_depth (việc chờ worker), in_flight, peak, rejected,
+      thời gian chờ worker và thời gian chạy (xem stats())
+
+    Thread-safe
+    """
+
+    def __init__(self, workers: int = 8, max_queue: int = 64, name: str = 'room-server-db'):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.lock = Lock()
+
+        self.in_flight = 0       # Đã nhận, chưa xong (đang chạy + đang chờ)
+        self.running = 0
+        self.peak_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def submit(self, handler: Callable, *args, bounded: bool = True) -> Future:
+        """Đưa 1 việc vào pool
+
+        Args:
+            handler: Hàm chạy trong worker
+            *args: Tham số của handler
+            bounded: False = luôn nhận (việc không được mất, vd ghi lịch sử trận)
+
+        Returns:
+            Future của kết quả handler
+
+        Raises:
+            ExecutorBusyError: Pool đầy (chỉ khi bounded)
+            RuntimeError: Pool đã shutdown
+        """
+        with self.lock:
+            if bounded and self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorBusyError(f'{self.in_flight} database jobs pending')
+            self.in_flight += 1
+            self.submitted += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        try:
+            return self.pool.submit(self._run, time.monotonic(), handler, args)
+        except RuntimeError:
+            with self.lock:
+                self.in_flight -= 1
+            raise
+
+    def _run(self, queued_at: float, handler: Callable, args: tuple):
+        """Thân việc trong worker: đo thời gian chờ + chạy"""
+        started = time.monotonic()
+        wait = started - queued_at
+        with self.lock:
+            self.running += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+        failed = False
+        try:
+            return handler(*args)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            with self.lock:
+                self.running -= 1
+                self.in_flight -= 1
+                self.run_total += elapsed
+                self.run_max = max(self.run_max, elapsed)
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+    def stats(self) -> dict:
+        """Số liệu pool cho log/giám sát"""
+        with self.lock:
+            started = self.completed + self.failed + self.running
+            finished = self.completed + self.failed
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self.in_flight - self.running,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.wait_total / started * 1000, 2) if started else 0,
+                'max_wait_ms': round(self.wait_max * 1000, 2),
+                'avg_run_ms': round(self.run_total / finished * 1000, 2) if finished else 0,
+                'max_run_ms': round(self.run_max * 1000, 2)
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self.pool.shutdown(wait=wait)
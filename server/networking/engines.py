@@ -0,0 +1,60 @@
+"""
+Chọn engine cho RoomServer khi khởi động (threaded hoặc asyncio)
+"""
+from typing import Optional
+
+from config.server_config import SERVER_CONFIG
+from networking.room_server import RoomServer
+from networking.async_room_server import AsyncRoomServer
+from networking.db_executor import DatabaseExecutor
+from networking.presence import PresenceRegistry
+from models.game_history_writer import GameHistoryWriter
+
+
+ENGINES = ('threaded', 'asyncio')
+
+
+def create_room_server(host_address: str, host_port: int, engine: Optional[str] = None) -> RoomServer:
+    """Tạo RoomServer theo engine được chọn
+
+    Args:
+        host_address: Địa chỉ lắng nghe
+        host_port: Port lắng nghe
+        engine: 'threaded' hoặc 'asyncio', None → SERVER_CONFIG['engine']
+
+    Returns:
+        RoomServer hoặc AsyncRoomServer (cùng interface start_server/stop_server/rooms)
+
+    Raises:
+        ValueError: Tên engine không hợp lệ
+    """
+    engine = engine or SERVER_CONFIG.get('engine', 'threaded')
+    session_ttl = SERVER_CONFIG.get('session_ttl', 3600)
+    history_writer = GameHistoryWriter(
+        batch_size=SERVER_CONFIG.get('history_batch_size', 50),
+        flush_interval=SERVER_CONFIG.get('history_flush_interval', 0.5),
+        max_queue=SERVER_CONFIG.get('history_queue_size', 1000)
+    )
+
+    if engine not in ENGINES:
+        raise ValueError(f'Unknown server engine: {engine} (expected one of {", ".join(ENGINES)})')
+
+    db_executor = DatabaseExecutor(
+        workers=SERVER_CONFIG.get('executor_workers', 8),
+        max_queue=SERVER_CONFIG.get('executor_queue_size', 64)
+    )
+    presence = PresenceRegistry(
+        grace=SERVER_CONFIG.get('presence_grace', 30),
+        flush_interval=SERVER_CONFIG.get('presence_flush_interval', 5)
+    )
+
+    if engine == 'threaded':
+        return RoomServer(host_address, host_port, session_ttl, history_writer, db_executor, presence)
+    return AsyncRoomServer(
+        host_address, host_port,
+        backlog=SERVER_CONFIG.get('backlog', 128),
+        session_ttl=session_ttl,
+        history_writer=history_writer,
+        db_executor=db_executor,
+        presence=presence
+    )
@@ -0,0 +1,235 @@
+"""
+Presence Registry
+Ai đang online: giữ trong bộ nhớ theo kết nối thật, ghi bản sao is_online xuống database theo batch
+"""
+import logging
+import time
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional
+
+from models.user_index import UserIndex
+from models.user_model import UserModel
+
+
+class PresenceEntry:
+    """Trạng thái online của 1 username
+
+    Thuộc tính:
+    - user_id: None nếu chưa biết (client cũ vào lobby không qua login của process này)
+    - since: time.time() lúc bắt đầu online
+    - last_seen: time.monotonic() lần cuối login / mở / đóng kết nối
+    - connected: Đang có kết nối lobby hoặc phòng
+    """
+
+    __slots__ = ('user_id', 'since', 'last_seen', 'connected')
+
+    def __init__(self, user_id: Optional[int], now: float):
+        self.user_id = user_id
+        self.since = time.time()
+        self.last_seen = now
+        self.connected = False
+
+
+class PresenceRegistry:
+    """Index username → PresenceEntry, nguồn sự thật duy nhất về trạng thái online
+
+    Thay cho UPDATE users SET is_online ở mỗi lần login/logout và SELECT is_online
+    lúc kiểm tra đăng nhập trùng:
+    - login(): Kiểm tra + ghi nhận trong 1 lần giữ lock (2 login cùng lúc chỉ 1 thành công)
+    - logout(): Xóa ngay
+    - set_connected(): RoomServer gọi mỗi khi username có/hết kết nối lobby hoặc phòng
+    - Hết kết nối vẫn tính online thêm `grace` giây (đổi kết nối lobby ↔ phòng,
+      reconnect bằng token), quá hạn mà không kết nối lại → offline
+    - Thread nền (start/stop) mỗi flush_interval giây so trạng thái trong bộ nhớ với
+      lần ghi trước, chỉ ghi phần thay đổi bằng UserModel.update_online_status
+      (tối đa 2 câu UPDATE cho cả batch); database lỗi thì lần sau ghi lại
+
+    Thread-safe (dùng chung cho mọi kết nối và executor của engine asyncio)
+    """
+
+    def __init__(self, grace: float = 30, flush_interval: float = 5):
+        self.grace = grace
+        self.flush_interval = flush_interval
+        self.entries: Dict[str, PresenceEntry] = {}
+        self.usernames: Dict[int, str] = {}  # user_id → username
+        self.lock = Lock()
+
+        self.flushed: set = set()  # user_id đang là online trong database
+        self.flush_lock = Lock()
+        self.stopping = Event()
+        self.thread: Optional[Thread] = None
+        self.flushes = 0
+
+    def login(self, user: dict) -> bool:
+        """Ghi nhận user vừa đăng nhập đúng mật khẩu
+
+        Returns:
+            False nếu username đang online (đăng nhập ở nơi khác)
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user['username'])
+            if entry is not None and self._alive(entry, now):
+                return False
+            self._add(user['username'], user['id'], now)
+            return True
+
+    def resume(self, user: dict) -> None:
+        """Ghi nhận user quay lại bằng token (không kiểm tra trùng)"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user['username'])
+            if entry is None or not self._alive(entry, now):
+                entry = self._add(user['username'], user['id'], now)
+            entry.last_seen = now
+
+    def logout(self, user_id: Optional[int] = None, username: Optional[str] = None) -> None:
+        """Xóa user khỏi danh sách online (theo user_id hoặc username)"""
+        with self.lock:
+            if username is None:
+                username = self.usernames.get(user_id)
+            if username is not None:
+                self._remove(username)
+
+    def set_connected(self, username: str, connected: bool, user_id: Optional[int] = None) -> None:
+        """Cập nhật việc username còn kết nối lobby/phòng nào không
+
+        Args:
+            connected: True = còn ít nhất 1 kết nối (RoomServer tự tính)
+            user_id: Nếu kết nối biết user_id (bổ sung cho entry chưa có)
+
+        Mất kết nối của username không online (đã logout) → bỏ qua
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(username)
+            if entry is None or not self._alive(entry, now):
+                if not connected:
+                    return
+                entry = self._add(username, user_id, now)
+            elif entry.user_id is None and user_id is not None:
+                entry.user_id = user_id
+                self.usernames[user_id] = username
+            entry.connected = connected
+            entry.last_seen = now
+
+    def is_online(self, username: str) -> bool:
+        with self.lock:
+            entry = self.entries.get(username)
+            return entry is not None and self._alive(entry, time.monotonic())
+
+    def online_users(self, limit: Optional[int] = None) -> List[Dict]:
+        """Danh sách đang online, sắp theo username
+
+        Returns:
+            List {'username', 'user_id', 'since'} (since: epoch giây)
+        """
+        now = time.monotonic()
+        with self.lock:
+            users = [{'username': username, 'user_id': entry.user_id, 'since': int(entry.since)}
+                     for username, entry in self.entries.items() if self._alive(entry, now)]
+        users.sort(key=lambda user: user['username'])
+        return users if limit is None else users[:limit]
+
+    def __len__(self) -> int:
+        now = time.monotonic()
+        with self.lock:
+            return sum(1 for entry in self.entries.values() if self._alive(entry, now))
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> None:
+        """Đưa cờ is_online còn sót từ lần chạy trước về 0 rồi start thread ghi định kỳ
+        (gọi lại khi đang chạy thì bỏ qua)"""
+        if not self.running:
+            try:
+                UserModel.reset_online_status()
+            except Exception as e:
+                logging.warning(f'Online flags not reset: {e}')
+        with self.lock:
+            if self.running:
+                return
+            self.stopping.clear()
+            self.thread = Thread(target=self._run, name='presence-flusher', daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Dừng thread nền, xóa mọi entry và ghi mọi user về offline (server tắt)"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        with self.lock:
+            self.entries.clear()
+            self.usernames.clear()
+        self.flush()
+        logging.info(f'Presence registry stopped ({self.flushes} flushes)')
+
+    def flush(self) -> int:
+        """Ghi phần thay đổi từ lần ghi trước xuống cột users.is_online
+
+        Returns:
+            Số user đã ghi (0 nếu không đổi hoặc database lỗi)
+        """
+        with self.flush_lock:
+            now = time.monotonic()
+            with self.lock:
+                self._purge_expired(now)
+                unknown = [name for name, entry in self.entries.items() if entry.user_id is None]
+
+            if unknown:
+                # Client cũ không qua login: tra id ở thread nền, không chặn kết nối
+                try:
+                    ids = UserIndex.resolve_ids(unknown)
+                except Exception as e:
+                    logging.warning(f'Presence lookup failed: {e}')
+                    ids = {}
+                with self.lock:
+                    for username, user_id in ids.items():
+                        entry = self.entries.get(username)
+                        if entry is not None and entry.user_id is None:
+                            entry.user_id = user_id
+                            self.usernames[user_id] = username
+
+            with self.lock:
+                online = {entry.user_id for entry in self.entries.values() if entry.user_id is not None}
+
+            online_ids = sorted(online - self.flushed)
+            offline_ids = sorted(self.flushed - online)
+            if not online_ids and not offline_ids:
+                return 0
+            try:
+                written = UserModel.update_online_status(online_ids, offline_ids)
+            except Exception as e:
+                logging.warning(f'Presence flush failed, retrying next interval: {e}')
+                return 0
+            self.flushed = online
+            self.flushes += 1
+            return written
+
+    def _run(self) -> None:
+        """Thân thread nền: flush mỗi flush_interval giây tới khi stop()"""
+        while not self.stopping.wait(self.flush_interval):
+            self.flush()
+
+    def _alive(self, entry: PresenceEntry, now: float) -> bool:
+        return entry.connected or now - entry.last_seen < self.grace
+
+    def _add(self, username: str, user_id: Optional[int], now: float) -> PresenceEntry:
+        self._remove(username)
+        entry = PresenceEntry(user_id, now)
+        self.entries[username] = entry
+        if user_id is not None:
+            self.usernames[user_id] = username
+        return entry
+
+    def _remove(self, username: str) -> None:
+        entry = self.entries.pop(username, None)
+        if entry is not None and entry.user_id is not None \
+                and self.usernames.get(entry.user_id) == username:
+            del self.usernames[entry.user_id]
+
+    def _purge_expired(self, now: float) -> None:
+        for username in [name for name, entry in self.entries.items() if not self._alive(entry, now)]:
+            self._remove(username)
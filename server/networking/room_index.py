@@ -0,0 +1,86 @@
+"""
+Room List Index
+Các phòng còn chỗ (danh sách get_rooms của lobby), cập nhật theo từng lần vào/rời phòng
+"""
+from threading import Lock
+from typing import Dict, Optional
+
+from networking.network import EncodedMessage, CONN_LIMIT
+
+
+class RoomListIndex:
+    """Index room_id → entry của các phòng còn chỗ, kèm version và response encode sẵn
+
+    - entries: {room_id: {'id', 'room_name', 'host_username', 'current_players', 'max_players'}}
+    - version: Tăng mỗi khi danh sách đổi (phòng thêm/bớt, số người đổi)
+    - update(): RoomServer gọi sau mỗi add_client / remove_client, trả về event diff
+      (room_added / room_updated / room_removed kèm version) để push cho lobby,
+      phòng hết người bị bỏ khỏi danh sách ngay trong update()
+    - response(): EncodedMessage {'rooms': [...], 'version'} dùng lại tới lần đổi sau,
+      get_rooms không duyệt phòng, không khóa phòng, không json.dumps
+
+    Mỗi event tăng version đúng 1: client đã có version v chỉ áp event v + 1,
+    thấy nhảy version (mất event) thì lấy lại cả danh sách bằng get_rooms
+
+    Entry không bị sửa, cập nhật = thay dict mới (list trả về an toàn khi đọc ngoài lock)
+    Thread-safe (lock của index bọc ngoài lock của phòng, không gọi update khi đang giữ room.lock)
+    """
+
+    def __init__(self):
+        self.entries: Dict[int, Dict] = {}
+        self.version = 0
+        self.lock = Lock()
+        self.encoded: Optional[EncodedMessage] = None
+
+    def update(self, room) -> Optional[Dict]:
+        """Đặt lại entry của 1 phòng theo số người hiện tại
+
+        Args:
+            room: GameRoom vừa thêm/bớt người chơi
+
+        Returns:
+            Event diff nếu danh sách đã đổi, None nếu không:
+            {'event': 'room_added' | 'room_updated', 'room': entry, 'version'}
+            {'event': 'room_removed', 'room': {'id'}, 'version'}
+        """
+        with self.lock:
+            count = room.get_client_count()
+            if 0 < count < CONN_LIMIT:
+                entry = {
+                    'id': room.room_id,
+                    'room_name': room.room_name,
+                    'host_username': room.host_username,
+                    'current_players': count,
+                    'max_players': CONN_LIMIT
+                }
+                old = self.entries.get(room.room_id)
+                if old == entry:
+                    return None
+                self.entries[room.room_id] = entry
+                return self._changed('room_added' if old is None else 'room_updated', entry)
+            if self.entries.pop(room.room_id, None) is None:
+                return None
+            return self._changed('room_removed', {'id': room.room_id})
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries = {}
+            self.version += 1
+            self.encoded = None
+
+    def response(self) -> EncodedMessage:
+        """Response get_rooms đã encode (encode lại chỉ khi danh sách đã đổi)"""
+        with self.lock:
+            if self.encoded is None:
+                rooms = [self.entries[room_id] for room_id in sorted(self.entries)]
+                self.encoded = EncodedMessage({'rooms': rooms, 'version': self.version})
+            return self.encoded
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.entries)
+
+    def _changed(self, event: str, room: Dict) -> Dict:
+        self.version += 1
+        self.encoded = None
+        return {'event': event, 'room': room, 'version': self.version}
@@ -5,16 +5,41 @@ Supports multiple game rooms running simultaneously
 import enum
 import socket
 import logging
-from typing import Dict, List, Tuple
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
 from threading import Thread, Lock
 
-from networking.network import Network, BUFFER_SIZE, SHIPS_NAMES
+from networking.network import Network, Connection, EncodedMessage, encode_fleet
+from networking.board import Board, ShotResult, MISS
+from networking.session_store import SessionStore
+from networking.presence import PresenceRegistry
+from networking.room_index import RoomListIndex
+from networking.db_executor import DatabaseExecutor, BUSY_RESPONSE
+from config.server_config import SERVER_CONFIG
+from models.base_model import Database
+from models.cache import STATS_CACHE
 from models.game_history_model import GameHistoryModel
+from models.game_history_writer import GameHistoryWriter
+from models.leaderboard import LEADERBOARD
+from models.user_index import UserIndex
 
 
 logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S')
 logging.root.setLevel(logging.INFO)
 
+# Request truy cập database (có thể block) - xử lý chung ở process_database_request,
+# chạy trong db_executor để không chặn socket của người chơi
+DATABASE_REQUESTS = (
+    'save_game_history', 'get_user_stats', 'get_recent_games',
+    'get_win_streak', 'get_opponent_stats', 'get_dashboard'
+)
+
+# Số trận tối đa trong 1 response get_recent_games (client lấy tiếp bằng next_cursor)
+HISTORY_PAGE_MAX = SERVER_CONFIG.get('history_page_max', 50)
+
+# Số người tối đa trong 1 response get_online_users
+ONLINE_USERS_MAX = SERVER_CONFIG.get('online_users_max', 200)
+
 
 class GameStatus(enum.Enum):
     """Trạng thái của phòng game
@@ -42,9 +67,16 @@ class GameRoom:
     - lock: Thread lock cho thread-safe
     - game_data: Dict chứa:
         * winner: Tên người thắng
-        * game_grid: {username: grid_10x10}
+        * game_grid: {username: Board} (bitboard hạm đội, None khi chưa lock)
         * clients: {username: {attacked_tile, sinked_ships, my_turn, timeout_count, ...}}
-        * sockets: {username: socket}
+        * sockets: {username: Connection}
+    - subscribers: Set username đã đăng ký nhận event push (client mới)
+    - event_lock: Giữ thứ tự event khi 2 thread cùng push vào 1 phòng
+    - version: Tăng mỗi khi trạng thái phòng thay đổi (clients/status/winner)
+    - client_versions / removed_versions: Version lần cuối mỗi người chơi bị sửa / rời phòng
+    - players: {username: user_id} của trận (giữ lại khi rời phòng giữa trận để ghi lịch sử)
+    - shot_stats: {username: {hits, misses, streak, max_streak, ships_sunk}} server tự đếm
+    - match_started / match_recorded: Đã vào battle / đã tạo biên bản trận
     
     Chức năng:
     - add_client(): Thêm người chơi vào phòng
@@ -52,6 +84,10 @@ class GameRoom:
     - attack_enemy_tile(): Xử lý tấn công, trả về hit/miss
     - game_over(): Đặt winner và chuyển status thành finished
     - check_ships_locked(): Kiểm tra cả 2 người đã lock ships chưa
+    - subscribe(): Đăng ký nhận event, trả về snapshot trạng thái hiện tại
+    - mark_modified(): Tăng version sau khi sửa game_data
+    - get_changes(): Delta/not_modified so với version client đã thấy
+    - build_match_record(): Biên bản trận (đúng 1 lần) để ghi game_history
     
     Thread-safety: Dùng Lock() cho mọi thao tác thay đổi game_data
     """
@@ -67,9 +103,20 @@ class GameRoom:
         self.room_id = room_id
         self.room_name = room_name
         self.host_username = host_username
+        self.version = 0
+        self.client_versions: Dict[str, int] = {}
+        self.removed_versions: Dict[str, int] = {}
+        self.version_lock = Lock()
         self.status = GameStatus.waiting
         self.is_first_player = True
         self.lock = Lock()
+        self.event_lock = Lock()
+        self.subscribers = set()
+        self.winner_announced = False
+        self.players: Dict[str, Optional[int]] = {}
+        self.shot_stats: Dict[str, Dict[str, int]] = {}
+        self.match_started = False
+        self.match_recorded = False
         
         self.game_data = {
             'winner': None,
@@ -78,7 +125,78 @@ class GameRoom:
             'sockets': {}
         }
     
-    def add_client(self, username: str, client_socket: socket.socket, user_id: int = None):
+    @property
+    def status(self) -> GameStatus:
+        return self._status
+    
+    @status.setter
+    def status(self, value: GameStatus):
+        """Đổi status cũng là thay đổi trạng thái phòng → tăng version"""
+        if value == GameStatus.battle:
+            self.match_started = True
+        if getattr(self, '_status', None) != value:
+            self._status = value
+            self.mark_modified()
+    
+    def mark_modified(self, *usernames: str):
+        """Tăng version sau khi sửa game_data
+        
+        Args:
+            usernames: Người chơi có entry trong game_data['clients'] vừa bị sửa
+                       (không truyền → chỉ status/winner đổi)
+        
+        Gọi SAU khi sửa dữ liệu: client đọc được version mới thì chắc chắn thấy dữ liệu mới
+        version_lock tách riêng nên gọi được cả khi đang giữ self.lock
+        """
+        with self.version_lock:
+            self.version += 1
+            for username in usernames:
+                self.client_versions[username] = self.version
+                self.removed_versions.pop(username, None)
+    
+    def mark_removed(self, username: str):
+        """Ghi nhận người chơi rời phòng để delta báo cho client xóa entry"""
+        with self.version_lock:
+            self.version += 1
+            self.client_versions.pop(username, None)
+            self.removed_versions[username] = self.version
+    
+    def get_changes(self, since_version: int) -> dict:
+        """Trạng thái phòng thay đổi kể từ since_version
+        
+        Args:
+            since_version: Version client nhận được lần trước (0 = chưa có gì)
+        
+        Returns:
+            - {'not_modified': True, 'version': v} nếu không có gì mới
+            - {'version', 'full', 'clients', 'removed', 'game_status', 'winner'}:
+              clients chỉ gồm người chơi có thay đổi, full=True → client thay toàn bộ
+        
+        since_version lớn hơn version hiện tại (phòng được tạo lại cùng ID) → gửi full
+        """
+        with self.version_lock:
+            version = self.version
+            if since_version == version:
+                return {'not_modified': True, 'version': version}
+            
+            full = since_version <= 0 or since_version > version
+            if full:
+                since_version = 0
+            changed = [u for u, v in self.client_versions.items() if v > since_version]
+            removed = [u for u, v in self.removed_versions.items() if v > since_version and not full]
+        
+        with self.lock:
+            clients = self.game_data['clients']
+            return {
+                'version': version,
+                'full': full,
+                'clients': {username: dict(clients[username]) for username in changed if username in clients},
+                'removed': removed,
+                'game_status': self.status.name,
+                'winner': self.game_data['winner']
+            }
+    
+    def add_client(self, username: str, client_socket: Connection, user_id: int = None):
         """Add a client to this room"""
         with self.lock:
             self.game_data['clients'][username] = {
@@ -94,7 +212,10 @@ class GameRoom:
             }
             self.game_data['game_grid'][username] = None
             self.game_data['sockets'][username] = client_socket
+            self.players[username] = user_id
+            self.shot_stats[username] = {'hits': 0, 'misses': 0, 'streak': 0, 'max_streak': 0, 'ships_sunk': 0}
             self.is_first_player = False
+            self.mark_modified(username)
             
             # If we have 2 players, move to ship_lock stage
             if len(self.game_data['clients']) == 2:
@@ -115,6 +236,11 @@ class GameRoom:
             self.game_data['clients'].pop(username, None)
             self.game_data['sockets'].pop(username, None)
             self.game_data['game_grid'].pop(username, None)
+            self.subscribers.discard(username)
+            if not self.match_started:
+                self.players.pop(username, None)
+                self.shot_stats.pop(username, None)
+            self.mark_removed(username)
     
     def get_client_count(self):
         """Get number of clients in room"""
@@ -133,6 +259,7 @@ class GameRoom:
         with self.lock:
             if username in self.game_data['clients']:
                 self.game_data['clients'][username]['ready'] = is_ready
+                self.mark_modified(username)
                 logging.info(f"[ROOM {self.room_id}] Player {username} ready: {is_ready}")
                 
                 # Check if all players ready and transition to ship_lock
@@ -152,55 +279,83 @@ class GameRoom:
                 for username in self.game_data['game_grid']
             )
     
-    def attack_enemy_tile(self, attacker_name: str, position: Tuple[int, int]) -> str:
-        """Process attack on enemy tile"""
+    def subscribe(self, username: str) -> dict:
+        """Đăng ký nhận event push và trả về snapshot để client khởi tạo"""
+        with self.lock:
+            self.subscribers.add(username)
+            return {
+                'players': {username: dict(client) for username, client in self.game_data['clients'].items()},
+                'winner': self.game_data['winner'],
+                'game_status': self.status.name
+            }
+    
+    def get_subscriber_sockets(self) -> List[Connection]:
+        """Danh sách socket của những người đã đăng ký event"""
+        with self.lock:
+            return [
+                self.game_data['sockets'][username]
+                for username in self.subscribers
+                if username in self.game_data['sockets']
+            ]
+    
+    def current_turn(self):
+        """Username đang có lượt bắn (None nếu chưa xác định)"""
+        with self.lock:
+            return next(
+                (username for username, client in self.game_data['clients'].items() if client['my_turn']),
+                None
+            )
+    
+    def get_timeout_counts(self) -> Dict[str, int]:
         with self.lock:
-            enemy_grid = None
-            enemy_name = None
-            for username in self.game_data['clients']:
-                if username != attacker_name:
-                    enemy_grid = self.game_data['game_grid'][username]
-                    enemy_name = username
-            
-            print(f"[SERVER] Attack from {attacker_name} at position {position}")
-            print(f"[SERVER] Enemy grid at [{position[1]}][{position[0]}]: '{enemy_grid[position[1]][position[0]]}'")
-            print(f"[SERVER] SHIPS_NAMES: {SHIPS_NAMES}")
-            print(f"[SERVER] Is in SHIPS_NAMES: {enemy_grid[position[1]][position[0]] in SHIPS_NAMES}")
-            
-            if enemy_grid and enemy_grid[position[1]][position[0]] in SHIPS_NAMES:
+            return {username: client['timeout_count'] for username, client in self.game_data['clients'].items()}
+    
+    def attack_enemy_tile(self, attacker_name: str, position: Tuple[int, int]) -> ShotResult:
+        """Process attack on enemy tile
+        
+        Returns:
+            ShotResult(ship_name, sunk, fleet_destroyed):
+            ship_name nếu trúng (None nếu trượt), sunk=True nếu tàu vừa chìm,
+            fleet_destroyed=True nếu đối thủ hết tàu (người bắn thắng)
+        
+        Trúng → giữ lượt, trượt → đổi lượt. Tàu chìm được đếm luôn vào sinked_ships
+        của người bắn (client không cần gửi ship_sinked nữa)
+        """
+        with self.lock:
+            enemy_name = next((u for u in self.game_data['clients'] if u != attacker_name), None)
+            enemy_board = self.game_data['game_grid'].get(enemy_name)
+            
+            col, row = position
+            result = enemy_board.fire(col, row) if enemy_board else MISS
+            
+            if enemy_board:
+                stats = self.shot_stats[attacker_name]
+                if result.ship_name:
+                    stats['hits'] += 1
+                    stats['streak'] += 1
+                    stats['max_streak'] = max(stats['max_streak'], stats['streak'])
+                    if result.sunk:
+                        stats['ships_sunk'] += 1
+                else:
+                    stats['misses'] += 1
+                    stats['streak'] = 0
+            
+            if result.ship_name:
                 # HIT - keep attacker's turn
-                ship_name = enemy_grid[position[1]][position[0]]
-                enemy_grid[position[1]][position[0]] = 'X'
-                
-                print(f"[SERVER] HIT! Ship: '{ship_name}'")
-                
-                # Check if this ship is completely sunk
-                ship_still_alive = False
-                for row in enemy_grid:
-                    for cell in row:
-                        if cell == ship_name:
-                            ship_still_alive = True
-                            break
-                    if ship_still_alive:
-                        break
-                
-                # If ship is sunk, notify the victim
-                if not ship_still_alive:
-                    print(f"[SERVER] {ship_name} is SUNK! Notifying {enemy_name}")
-                    self.game_data['clients'][enemy_name]['ship_sunk'] = ship_name
-                
-                # Keep turn for attacker
+                if result.sunk:
+                    # Notify the victim (client cũ đọc qua game_data)
+                    self.game_data['clients'][enemy_name]['ship_sunk'] = result.ship_name
+                    self.game_data['clients'][attacker_name]['sinked_ships'] += 1
                 self.game_data['clients'][attacker_name]['my_turn'] = True
                 self.game_data['clients'][enemy_name]['my_turn'] = False
-                
-                return ship_name
-            else:
+                self.mark_modified(attacker_name, enemy_name)
+            elif enemy_name:
                 # MISS - switch turns
-                print(f"[SERVER] MISS!")
                 self.game_data['clients'][attacker_name]['my_turn'] = False
                 self.game_data['clients'][enemy_name]['my_turn'] = True
+                self.mark_modified(attacker_name, enemy_name)
             
-            return None
+            return result
     
     def game_over(self, loser_name: str):
         """Set winner when game is over"""
@@ -211,7 +366,47 @@ class GameRoom:
             )
             self.game_data['winner'] = winner_name
             self.status = GameStatus.finished
+            self.mark_modified()
             print(f"[SERVER] Game over: {winner_name} wins, {loser_name} loses")
+    
+    def build_match_record(self) -> Optional[dict]:
+        """Biên bản trận để ghi game_history (trả về đúng 1 lần mỗi phòng)
+        
+        Returns:
+            {'room_id', 'winner', 'players': {username: {user_id, hits, misses, max_streak, ships_sunk}}}
+            None nếu chưa vào battle, chưa có winner, không đủ 2 người hoặc đã tạo rồi
+        
+        Số liệu do server đếm trong attack_enemy_tile, 2 dòng lịch sử của 2 người
+        chơi suy ra từ cùng 1 biên bản nên không thể mâu thuẫn nhau
+        """
+        with self.lock:
+            winner = self.game_data['winner']
+            if self.match_recorded or not self.match_started or not winner or len(self.players) != 2:
+                return None
+            self.match_recorded = True
+            
+            players = {}
+            for username, user_id in self.players.items():
+                stats = dict(self.shot_stats[username], user_id=user_id)
+                del stats['streak']
+                players[username] = stats
+            return {'room_id': self.room_id, 'winner': winner, 'players': players}
+
+
+class ClientSession:
+    """Trạng thái của 1 kết nối session (1 socket cho auth, lobby và phòng)
+    
+    Thuộc tính:
+    - address: Địa chỉ client
+    - username, user_id: Người đã login trên kết nối này (None nếu chưa)
+    - room_id: Phòng đang chơi (None nếu đang ở lobby)
+    """
+    
+    def __init__(self, address=None):
+        self.address = address
+        self.username: Optional[str] = None
+        self.user_id: Optional[int] = None
+        self.room_id: Optional[int] = None
 
 
 class RoomServer(Network):
@@ -220,15 +415,23 @@ class RoomServer(Network):
     Chức năng chính:
     - Lắng nghe kết nối từ client (localhost:65432)
     - Quản lý nhiều phòng game đồng thời (rooms dict)
-    - Xử lý 2 loại kết nối:
+    - Xử lý 3 loại kết nối:
       * Lobby client: Chưa vào phòng, browse rooms, tạo phòng
       * Room client: Đã vào phòng, chơi game
+      * Session: 1 kết nối cho cả auth, lobby và phòng, message có 'channel'
+        (xem process_session_request)
     - Assign room_id cho phòng mới (next_room_id)
     - Xử lý các request:
       * create_room, get_rooms, join_room
       * ship_locked, attack_tile, timeout
-      * save_game_history, get_user_stats
+      * save_game_history, get_user_stats, get_dashboard
       * player_quit, disconnect
+      * subscribe_events: client mới nhận event push thay vì polling
+      * subscribe_rooms: lobby nhận diff danh sách phòng thay vì polling get_rooms
+    - Push event cho cả 2 người trong phòng khi trạng thái đổi:
+      player_joined, attack_result, turn_change, ship_sunk, winner, opponent_left
+    - Push event cho lobby đã subscribe_rooms khi danh sách phòng đổi:
+      room_added, room_updated, room_removed (kèm version của room_index)
     - Thread-safe operations với Lock()
     
     Thuộc tính:
@@ -236,31 +439,62 @@ class RoomServer(Network):
     - rooms: Dict {room_id: GameRoom}
     - client_rooms: Dict {username: room_id}
     - lobby_clients: Dict {username: socket}
+    - room_index: RoomListIndex các phòng còn chỗ (get_rooms trả response encode sẵn)
+    - room_subscribers: Set username trong lobby đã subscribe_rooms
+    - room_list_lock: Giữ thứ tự event danh sách phòng (cập nhật index + push cùng lúc)
     - next_room_id: Bộ đếm tự tăng cho room ID
+    - sessions: SessionStore token → user (cấp lúc login, kết nối sau dùng token)
+    - presence: PresenceRegistry ai đang online (đăng nhập trùng, get_online_users),
+      ghi users.is_online theo batch ở thread nền
+    - history_writer: GameHistoryWriter ghi game_history theo batch ở thread nền
+    - db_executor: DatabaseExecutor chạy DATABASE_REQUESTS (pool giới hạn, đầy thì từ chối)
     - lock: Thread lock
     
     Multi-threading:
     - Mỗi client có 1 thread riêng (handle_client)
     - Accept thread chạy liên tục (accept_connections)
     - GameRoom có lock riêng để đồng bộ
+    - Request database chạy trong db_executor (submit_database_request), thread
+      của client không phải chờ MySQL khi client ghép response theo request_id
+    - Engine asyncio (AsyncRoomServer) dùng lại các handler process_* của class này
     """
     
-    def __init__(self, host_address: str, host_port: int):
+    def __init__(self, host_address: str, host_port: int, session_ttl: float = 3600,
+                 history_writer: Optional[GameHistoryWriter] = None,
+                 db_executor: Optional[DatabaseExecutor] = None,
+                 presence: Optional[PresenceRegistry] = None):
         self.server_socket = None
         self.host_address = host_address
         self.host_port = host_port
         self.rooms: Dict[int, GameRoom] = {}
         self.client_rooms: Dict[str, int] = {}  # username -> room_id mapping
-        self.lobby_clients: Dict[str, socket.socket] = {}  # username -> socket for lobby users
+        self.lobby_clients: Dict[str, Connection] = {}  # username -> connection for lobby users
+        self.room_index = RoomListIndex()
+        self.room_subscribers = set()
+        self.room_list_lock = Lock()
         self.lock = Lock()
         self.next_room_id = 1  # Server-side room ID counter
+        self.sessions = SessionStore(session_ttl)
+        self.history_writer = history_writer or GameHistoryWriter()
+        self.db_executor = db_executor or DatabaseExecutor()
+        self.presence = presence or PresenceRegistry()
     
-    def handle_auth_request(self, client_socket: socket.socket, request_data: dict):
-        """Xử lý auth requests (login/register)
+    def process_auth_request(self, request_data: dict, user_id: Optional[int] = None) -> dict:
+        """Xử lý auth requests (login/register/logout/resume)
         
         Args:
-            client_socket: Socket của client
-            request_data: Dict chứa action, username, password
+            request_data: Dict chứa action, username, password (resume/logout: token)
+            user_id: User đã xác thực của kết nối (session channel), None nếu chưa login
+        
+        Returns:
+            Dict response gửi lại cho client (engine nào gửi cũng được)
+            Login/resume thành công có kèm 'token' và 'expires_in'
+        
+        auth:resume chỉ tra SessionStore, không chạm database
+        auth:logout chỉ thu hồi token client đưa ra hoặc token của user_id đã xác thực,
+        không tin 'user_id' trong request (client khác không logout hộ được)
+        Trạng thái online (đăng nhập trùng, logout) chỉ đổi PresenceRegistry,
+        cột users.is_online được ghi sau theo batch
         """
         from models.user_model import UserModel
         
@@ -274,82 +508,100 @@ class RoomServer(Network):
                 user = UserModel.authenticate(username, password)
                 
                 if user:
-                    # Check if already online
-                    if isinstance(user, dict) and user.get('error') == 'already_online':
-                        response = {
+                    # Check if already online (kiểm tra + ghi nhận trong bộ nhớ, không UPDATE)
+                    if not self.presence.login(user):
+                        return {
                             'success': False,
                             'message': f'Account "{user.get("username")}" is already logged in elsewhere'
                         }
-                    else:
-                        # Set user online
-                        UserModel.set_online_status(user['id'], True)
-                        response = {
-                            'success': True,
-                            'message': 'Login successful',
-                            'user': user
-                        }
-                else:
-                    response = {
-                        'success': False,
-                        'message': 'Invalid username or password'
+                    return {
+                        'success': True,
+                        'message': 'Login successful',
+                        'user': user,
+                        'token': self.sessions.issue(user),
+                        'expires_in': self.sessions.ttl
                     }
+                return {
+                    'success': False,
+                    'message': 'Invalid username or password'
+                }
+            
+            elif action == 'auth:resume':
+                # Reconnect bằng token: không kiểm tra lại mật khẩu, không query
+                token = request_data.get('token')
+                user = self.sessions.resume(token)
+                if user:
+                    self.presence.resume(user)
+                    return {
+                        'success': True,
+                        'message': 'Session resumed',
+                        'user': user,
+                        'token': token,
+                        'expires_in': self.sessions.ttl
+                    }
+                return {
+                    'success': False,
+                    'message': 'Session expired, please login again'
+                }
             
             elif action == 'auth:register':
-                # Kiểm tra username đã tồn tại
-                existing_user = UserModel.get_user_by_username(username)
-                if existing_user:
-                    response = {
+                # Kiểm tra username đã tồn tại (index, chỉ query khi tên chưa biết)
+                if UserIndex.get_id(username) is not None:
+                    return {
                         'success': False,
                         'message': 'Username already exists'
                     }
-                else:
-                    # Tạo user mới
-                    user_id = UserModel.create_user(username, password)
-                    
-                    if user_id:
-                        user = UserModel.get_user_by_id(user_id)
-                        response = {
-                            'success': True,
-                            'message': 'Registration successful',
-                            'user': user
-                        }
-                    else:
-                        response = {
-                            'success': False,
-                            'message': 'Registration failed'
-                        }
+                # Tạo user mới
+                user_id = UserModel.create_user(username, password)
+                
+                if user_id:
+                    user = UserModel.get_user_by_id(user_id)
+                    return {
+                        'success': True,
+                        'message': 'Registration successful',
+                        'user': user
+                    }
+                return {
+                    'success': False,
+                    'message': 'Registration failed'
+                }
             
             elif action == 'auth:logout':
-                # Xử lý logout
-                user_id = request_data.get('user_id')
-                if user_id:
-                    UserModel.set_online_status(user_id, False)
-                response = {
+                # Xử lý logout: token client đưa ra, hoặc user đã xác thực của kết nối
+                user = self.sessions.revoke(request_data.get('token'))
+                if user:
+                    self.presence.logout(user['id'])
+                elif user_id is not None:
+                    self.sessions.revoke_user(user_id)
+                    self.presence.logout(user_id)
+                return {
                     'success': True,
                     'message': 'Logged out'
                 }
             
-            else:
-                response = {
-                    'success': False,
-                    'message': 'Unknown auth action'
-                }
-            
-            # Gửi response
-            self.send_data(client_socket, response)
+            return {
+                'success': False,
+                'message': 'Unknown auth action'
+            }
             
         except Exception as e:
             logging.error(f'Auth error: {e}')
-            self.send_data(client_socket, {
+            return {
                 'success': False,
                 'message': f'Server error: {str(e)}'
-            })
+            }
+    
+    def handle_auth_request(self, client_socket: Connection, request_data: dict):
+        """Xử lý auth request rồi đóng kết nối (auth không giữ connection)
+        
+        Args:
+            client_socket: Connection của client
+            request_data: Dict chứa action, username, password
+        """
+        try:
+            self.send_data(client_socket, self.process_auth_request(request_data))
         finally:
-            # Đóng socket sau khi xử lý auth (không giữ connection)
-            try:
-                client_socket.close()
-            except:
-                pass
+            client_socket.close()
     
     def start_server(self):
         """Start the server"""
@@ -357,40 +609,66 @@ class RoomServer(Network):
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.host_address, self.host_port))
         self.server_socket.listen(10)
+        # Port 0 → lấy port thật do hệ điều hành cấp
+        self.host_port = self.server_socket.getsockname()[1]
         
+        self.prepare_storage()
         server_thread = Thread(target=self.accept_connections)
         server_thread.daemon = True
         server_thread.start()
         
         logging.info(f'Room Server started on {self.host_address}:{self.host_port}')
     
+    def prepare_storage(self):
+        """Chuẩn bị tầng database trước khi nhận kết nối (engine nào cũng gọi)
+        
+        - Start thread ghi game_history theo batch
+        - Nạp index username ↔ id (tra đối thủ, đăng ký không cần query)
+        - Nạp bảng xếp hạng từ user_stats (get_leaderboard không query)
+        - Reset users.is_online còn sót, start thread ghi trạng thái online
+        """
+        self.history_writer.start()
+        UserIndex.warm()
+        LEADERBOARD.warm()
+        self.presence.start()
+    
     def stop_server(self):
         """Stop the server"""
         with self.lock:
             # Close all client connections in rooms
-            for room in self.rooms.values():
-                for client_socket in room.game_data['sockets'].values():
-                    try:
-                        client_socket.shutdown(socket.SHUT_RDWR)
-                        client_socket.close()
-                    except:
-                        pass
+            for room in list(self.rooms.values()):
+                for client_socket in list(room.game_data['sockets'].values()):
+                    client_socket.close()
             
             # Close all lobby connections
-            for client_socket in self.lobby_clients.values():
-                try:
-                    client_socket.shutdown(socket.SHUT_RDWR)
-                    client_socket.close()
-                except:
-                    pass
+            for client_socket in list(self.lobby_clients.values()):
+                client_socket.close()
             
             self.rooms.clear()
             self.client_rooms.clear()
             self.lobby_clients.clear()
+            self.room_subscribers.clear()
+        self.room_index.clear()
         
         if self.server_socket:
             self.server_socket.close()
         
+        # Chờ các request database đang chạy (và biên bản trận đang giao cho writer)
+        self.db_executor.shutdown(wait=True)
+        logging.info(f'Database executor: {self.db_executor.stats()}')
+        
+        # Ghi nốt lịch sử trận còn trong hàng đợi
+        self.history_writer.stop()
+        
+        # Mọi người chơi về offline trong database
+        self.presence.stop()
+        
+        database_stats = Database.stats()
+        if database_stats:
+            logging.info(f'Database: {database_stats}')
+            Database.close()
+        logging.info(f'Stats cache: {STATS_CACHE.stats()}')
+        
         logging.info('Server stopped')
     
     def accept_connections(self):
@@ -404,16 +682,25 @@ class RoomServer(Network):
         except socket.error as e:
             logging.error(f'Server accept error: {e}')
     
-    def handle_client(self, client_socket: socket.socket, address):
+    def handle_client(self, raw_socket: socket.socket, address):
         """Handle individual client connection"""
         username = None
         room_id = None
         in_lobby = False
+        # Framing (frame mới / datagram cũ) được nhận diện từ message đầu tiên
+        client_socket = Connection(raw_socket)
         
         try:
             # Receive initial connection data (username and room_id)
-            data = client_socket.recv(BUFFER_SIZE)
-            connection_data = self.decode_data(data)
+            connection_data = client_socket.receive()
+            if not connection_data:
+                client_socket.close()
+                return
+            
+            # Session: mọi message đều có channel, giữ kết nối cho cả phiên
+            if 'channel' in connection_data:
+                self.session_listener(client_socket, connection_data, address)
+                return
             
             # Check if this is an auth request
             action = connection_data.get('action')
@@ -421,9 +708,8 @@ class RoomServer(Network):
                 self.handle_auth_request(client_socket, connection_data)
                 return
             
-            username = connection_data.get('username')
+            username, user_id = self.resolve_identity(connection_data)
             room_id = connection_data.get('room_id')
-            user_id = connection_data.get('user_id')  # Lấy user_id từ connection data
             
             if not username:
                 logging.warning(f'Invalid connection data from {address}')
@@ -433,34 +719,18 @@ class RoomServer(Network):
             # Check if this is a lobby connection (no room_id)
             if room_id is None:
                 in_lobby = True
-                with self.lock:
-                    self.lobby_clients[username] = client_socket
-                
-                logging.info(f'Client "{username}" connected to lobby from {address}')
-                self.send_data(client_socket, {'status': 'connected', 'mode': 'lobby'})
+                self.register_lobby_client(client_socket, username, address)
                 
                 # Keep connection alive for lobby user
                 self.lobby_listener(client_socket, username)
                 return
             
             # Room connection (existing logic)
-            # Get or create room
-            room = self.get_or_create_room(room_id, username)
-            
+            room = self.join_room(client_socket, username, room_id, user_id, address)
             if not room:
-                self.send_data(client_socket, {'error': 'Room is full or invalid'})
                 client_socket.close()
                 return
             
-            # Add client to room
-            room.add_client(username, client_socket, user_id)
-            self.client_rooms[username] = room_id
-            
-            logging.info(f'Client "{username}" joined room {room_id} from {address}')
-            
-            # Send connection acknowledgment
-            self.send_data(client_socket, {'status': 'connected', 'room_id': room_id})
-            
             # Handle client messages
             self.client_listener(client_socket, username, room)
             
@@ -469,139 +739,324 @@ class RoomServer(Network):
         finally:
             # Cleanup
             if in_lobby and username:
-                with self.lock:
-                    self.lobby_clients.pop(username, None)
-                logging.info(f'Lobby client {username} disconnected')
+                self.leave_lobby(username)
             elif username and room_id is not None:
-                room = self.rooms.get(room_id)
-                if room:
-                    room.remove_client(username)
-                    if room.is_empty():
-                        with self.lock:
-                            self.rooms.pop(room_id, None)
-                        logging.info(f'Room {room_id} deleted (empty)')
+                self.leave_room(username, room_id)
+            
+            client_socket.close()
+    
+    def resolve_identity(self, connection_data: dict) -> Tuple[Optional[str], Optional[int]]:
+        """Lấy username/user_id cho kết nối lobby/phòng
+        
+        - Có 'token': tra SessionStore (không query, không tin username client tự gửi),
+          token sai hoặc hết hạn → (None, None)
+        - Không có token (client cũ): dùng username/user_id trong connection data
+        """
+        if 'token' in connection_data:
+            user = self.sessions.resume(connection_data['token'])
+            if not user:
+                return None, None
+            return user['username'], user['id']
+        return connection_data.get('username'), connection_data.get('user_id')
+    
+    def register_lobby_client(self, client_socket: Connection, username: str, address=None,
+                              ack: bool = True):
+        """Đăng ký kết nối lobby và gửi acknowledgment (ack=False: session tự trả lời)"""
+        with self.lock:
+            self.lobby_clients[username] = client_socket
+        self.update_presence(username)
+        
+        logging.info(f'Client "{username}" connected to lobby from {address}')
+        if ack:
+            self.send_data(client_socket, {'status': 'connected', 'mode': 'lobby'})
+    
+    def leave_lobby(self, username: str):
+        """Xóa client khỏi lobby khi mất kết nối"""
+        with self.lock:
+            self.lobby_clients.pop(username, None)
+            self.room_subscribers.discard(username)
+        self.update_presence(username)
+        logging.info(f'Lobby client {username} disconnected')
+    
+    def update_presence(self, username: str, user_id: int = None):
+        """Báo PresenceRegistry username còn kết nối lobby/phòng nào không
+        (gọi sau mỗi lần vào/rời lobby hoặc phòng, ngoài self.lock)"""
+        with self.lock:
+            connected = username in self.lobby_clients or username in self.client_rooms
+        self.presence.set_connected(username, connected, user_id)
+    
+    def join_room(self, client_socket: Connection, username: str, room_id: int,
+                  user_id: int = None, address=None, ack: bool = True) -> GameRoom:
+        """Cho client vào phòng và gửi acknowledgment
+        
+        Args:
+            ack: False → không gửi gì (session tự trả lời request join_room)
+        
+        Returns:
+            GameRoom, hoặc None nếu phòng đầy (đã gửi error cho client)
+        """
+        # Get or create room
+        room = self.get_or_create_room(room_id, username)
+        
+        if not room:
+            if ack:
+                self.send_data(client_socket, {'error': 'Room is full or invalid'})
+            return None
+        
+        # Add client to room
+        room.add_client(username, client_socket, user_id)
+        self.update_room_list(room)
+        self.client_rooms[username] = room_id
+        self.update_presence(username, user_id)
+        # Người đã ở trong phòng (host đang chờ) biết ngay có người vào, không cần polling
+        self.broadcast(room, {
+            'event': 'player_joined',
+            'username': username,
+            'player_count': room.get_client_count(),
+            'game_status': room.status.name
+        })
+        
+        logging.info(f'Client "{username}" joined room {room_id} from {address}')
+        
+        # Send connection acknowledgment
+        if ack:
+            self.send_data(client_socket, {'status': 'connected', 'room_id': room_id})
+        return room
+    
+    def leave_room(self, username: str, room_id: int):
+        """Xóa client khỏi phòng, báo cho đối thủ và xóa phòng nếu trống"""
+        room = self.rooms.get(room_id)
+        if room:
+            room.remove_client(username)
+            self.update_room_list(room)
+            self.broadcast(room, {'event': 'opponent_left', 'username': username,
+                                  'player_count': room.get_client_count()})
+            self.announce_winner(room)
+            if room.is_empty():
+                with self.lock:
+                    self.rooms.pop(room_id, None)
+                logging.info(f'Room {room_id} deleted (empty)')
+        
+        self.client_rooms.pop(username, None)
+        self.update_presence(username)
+    
+    def update_room_list(self, room: GameRoom):
+        """Cập nhật room_index sau khi phòng thêm/bớt người và push diff cho lobby
+        
+        room_list_lock: event tới mọi client theo đúng thứ tự version
+        """
+        with self.room_list_lock:
+            event = self.room_index.update(room)
+            if event:
+                self.publish_room_list(event)
+    
+    def publish_room_list(self, event: dict):
+        """Push 1 event danh sách phòng tới mọi lobby đã subscribe_rooms
+        
+        Encode 1 lần cho mọi người nhận, kèm channel 'lobby' để session client
+        xếp vào hàng đợi của kênh lobby
+        """
+        with self.lock:
+            sockets = [self.lobby_clients[username] for username in self.room_subscribers
+                       if username in self.lobby_clients]
+        if not sockets:
+            return
+        message = EncodedMessage(dict(event, channel='lobby'))
+        for client_socket in sockets:
+            self.send_data(client_socket, message)
+    
+    def subscribe_rooms(self, username: str):
+        """Đăng ký nhận diff danh sách phòng (request 'subscribe_rooms' của lobby)
+        
+        Returns:
+            Snapshot giống get_rooms: {'rooms': [...], 'version'}; event sau đó
+            luôn có version lớn hơn (đăng ký + lấy snapshot trong room_list_lock)
+        """
+        with self.room_list_lock:
+            with self.lock:
+                if username not in self.lobby_clients:
+                    return {'success': False, 'error': 'Not in lobby'}
+                self.room_subscribers.add(username)
+            return self.room_index.response()
+    
+    def session_listener(self, client_socket: Connection, first_request: dict, address=None):
+        """Listen to session client: xử lý tuần tự mọi kênh trên 1 kết nối
+        
+        Args:
+            first_request: Message đầu tiên (thường là auth:login)
+        """
+        session = ClientSession(address)
+        request_data = first_request
+        try:
+            while request_data:
+                if session.username and self.is_database_request(request_data):
+                    self.handle_database_request(client_socket, request_data)
+                    request_data = client_socket.receive()
+                    continue
                 
-                self.client_rooms.pop(username, None)
+                response = self.process_session_request(request_data, session, client_socket)
+                if response is None:
+                    break
+                self.send_response(client_socket, request_data, response)
+                request_data = client_socket.receive()
+        except (socket.error, ValueError):
+            logging.info(f'Session client {session.username} disconnected')
+        finally:
+            self.close_session(session)
+    
+    def process_session_request(self, request_data: dict, session: ClientSession,
+                                client_socket: Connection) -> Optional[dict]:
+        """Process 1 request của session theo channel
+        
+        - auth: login/register/logout/resume; login hoặc resume thành công → session vào lobby
+        - lobby: giống lobby client (cần login trước)
+        - room: join_room vào phòng, các request khác giống room client,
+          'disconnect' chỉ rời phòng (session vẫn giữ)
+        
+        Returns:
+            Dict response, hoặc None nếu client yêu cầu đóng session
+        """
+        channel = request_data.get('channel')
+        
+        if channel == 'auth':
+            response = self.process_auth_request(request_data, session.user_id)
+            action = request_data.get('action')
+            if action in ('auth:login', 'auth:resume') and response.get('success'):
+                self.close_session(session)
+                session.username = response['user']['username']
+                session.user_id = response['user']['id']
+                self.register_lobby_client(client_socket, session.username, session.address, ack=False)
+            elif action == 'auth:logout':
+                self.close_session(session)
+                session.username = session.user_id = None
+            return response
+        
+        if not session.username:
+            return {'success': False, 'error': 'Not authenticated'}
+        
+        if channel == 'lobby':
+            return self.process_lobby_request(request_data, session.username)
+        
+        if channel == 'room':
+            request_type = request_data.get('request')
+            if request_type == 'join_room':
+                if session.room_id is not None:
+                    self.leave_room(session.username, session.room_id)
+                    session.room_id = None
+                room_id = request_data.get('room_id')
+                room = self.join_room(client_socket, session.username, room_id,
+                                      session.user_id, session.address, ack=False)
+                if not room:
+                    return {'error': 'Room is full or invalid'}
+                session.room_id = room_id
+                return {'status': 'connected', 'room_id': room_id}
             
-            try:
-                client_socket.close()
-            except:
-                pass
+            room = self.rooms.get(session.room_id) if session.room_id is not None else None
+            if not room:
+                return {'error': 'Not in a room'}
+            
+            self.update_room_status(room)
+            response = self.process_request(request_data, session.username, room)
+            if request_type == 'disconnect':
+                self.leave_room(session.username, session.room_id)
+                session.room_id = None
+            return response
+        
+        return {'message': 'unknown channel'}
+    
+    def close_session(self, session: ClientSession):
+        """Rời phòng và lobby của session (khi logout hoặc mất kết nối)"""
+        if session.room_id is not None:
+            self.leave_room(session.username, session.room_id)
+            session.room_id = None
+        if session.username:
+            self.leave_lobby(session.username)
     
-    def lobby_listener(self, client_socket: socket.socket, username: str):
+    def lobby_listener(self, client_socket: Connection, username: str):
         """Listen to lobby client (keeps connection alive)"""
         try:
             while True:
-                data = client_socket.recv(BUFFER_SIZE)
-                if not data:
+                decoded_data = client_socket.receive()
+                if not decoded_data:
                     break
                 
-                decoded_data = self.decode_data(data)
-                
-                # Handle action-based requests (như auth:logout)
-                if 'action' in decoded_data:
-                    action = decoded_data.get('action')
-                    if action == 'auth:logout':
-                        try:
-                            from models.user_model import UserModel
-                            user_id = decoded_data.get('user_id')
-                            if user_id:
-                                UserModel.set_online_status(user_id, False)
-                                logging.info(f'User {user_id} logged out via lobby')
-                            self.send_data(client_socket, {'success': True})
-                        except Exception as e:
-                            logging.error(f'Logout error: {e}')
-                            self.send_data(client_socket, {'success': False, 'error': str(e)})
+                if self.is_database_request(decoded_data):
+                    self.handle_database_request(client_socket, decoded_data)
                     continue
                 
-                # Handle lobby requests
-                if 'request' in decoded_data:
-                    if decoded_data['request'] == 'disconnect':
-                        break
-                    elif decoded_data['request'] == 'ping':
-                        self.send_data(client_socket, {'message': 'pong'})
-                    elif decoded_data['request'] == 'get_rooms':
-                        rooms_list = self._get_rooms_list()
-                        self.send_data(client_socket, {'rooms': rooms_list})
-                    elif decoded_data['request'] == 'create_room':
-                        # Server assigns room ID
-                        new_room_id = self.next_room_id
-                        self.next_room_id += 1
-                        self.send_data(client_socket, {'room_id': new_room_id})
-                    elif decoded_data['request'] == 'get_user_stats':
-                        # Get user statistics
-                        try:
-                            user_id = decoded_data.get('user_id')
-                            stats = GameHistoryModel.get_user_stats(user_id)
-                            self.send_data(client_socket, {'stats': stats})
-                        except Exception as e:
-                            logging.error(f'Error getting user stats: {e}')
-                            self.send_data(client_socket, {'error': str(e)})
-                    elif decoded_data['request'] == 'get_recent_games':
-                        # Get recent games
-                        try:
-                            user_id = decoded_data.get('user_id')
-                            limit = decoded_data.get('limit', 10)
-                            games = GameHistoryModel.get_recent_games(user_id, limit)
-                            self.send_data(client_socket, {'games': games})
-                        except Exception as e:
-                            logging.error(f'Error getting recent games: {e}')
-                            self.send_data(client_socket, {'error': str(e)})
-                    elif decoded_data['request'] == 'get_win_streak':
-                        # Get win streak
-                        try:
-                            user_id = decoded_data.get('user_id')
-                            streak_data = GameHistoryModel.get_win_streak(user_id)
-                            self.send_data(client_socket, {'streak': streak_data})
-                        except Exception as e:
-                            logging.error(f'Error getting win streak: {e}')
-                            self.send_data(client_socket, {'error': str(e)})
-                    elif decoded_data['request'] == 'get_opponent_stats':
-                        # Get opponent statistics by username
-                        try:
-                            opponent_username = decoded_data.get('opponent_username')
-                            if opponent_username:
-                                stats = GameHistoryModel.get_user_stats_by_username(opponent_username)
-                                if stats:
-                                    self.send_data(client_socket, {'success': True, 'stats': stats})
-                                else:
-                                    self.send_data(client_socket, {'success': False, 'error': 'User not found'})
-                            else:
-                                self.send_data(client_socket, {'success': False, 'error': 'Missing opponent_username'})
-                        except Exception as e:
-                            logging.error(f'Error getting opponent stats: {e}')
-                            self.send_data(client_socket, {'success': False, 'error': str(e)})
-                    elif decoded_data['request'] == 'save_game_history':
-                        # Save game history to database
-                        try:
-                            game_data = decoded_data.get('game_data', {})
-                            result = GameHistoryModel.save_game(
-                                user_id=game_data.get('user_id'),
-                                username=game_data.get('username'),
-                                opponent_username=game_data.get('opponent_username'),
-                                result=game_data.get('result'),
-                                ships_sunk=game_data.get('ships_sunk'),
-                                enemy_ships_sunk=game_data.get('enemy_ships_sunk'),
-                                hits=game_data.get('hits'),
-                                misses=game_data.get('misses'),
-                                accuracy=game_data.get('accuracy'),
-                                max_streak=game_data.get('max_streak'),
-                                enemy_hits=game_data.get('enemy_hits'),
-                                enemy_misses=game_data.get('enemy_misses'),
-                                enemy_accuracy=game_data.get('enemy_accuracy'),
-                                enemy_max_streak=game_data.get('enemy_max_streak')
-                            )
-                            self.send_data(client_socket, {'message': 'saved', 'success': result})
-                        except Exception as e:
-                            logging.error(f'Error saving game history: {e}')
-                            self.send_data(client_socket, {'message': 'error', 'error': str(e)})
-                else:
-                    self.send_data(client_socket, {'message': 'ok'})
+                response = self.process_lobby_request(decoded_data, username)
+                if response is None:
+                    break
+                self.send_response(client_socket, decoded_data, response)
                     
-        except socket.error:
+        except (socket.error, ValueError):
             logging.info(f'Lobby client {username} disconnected')
     
-    def client_listener(self, client_socket: socket.socket, username: str, room: GameRoom):
+    def process_lobby_request(self, request_data: dict, username: str) -> Optional[dict]:
+        """Process lobby requests
+        
+        Returns:
+            Dict response (get_rooms: EncodedMessage encode sẵn, gửi qua send_response),
+            hoặc None nếu client yêu cầu disconnect
+        """
+        # Handle action-based requests (như auth:logout)
+        if 'action' in request_data:
+            if request_data.get('action') == 'auth:logout':
+                try:
+                    # Không tin 'user_id' client gửi: chỉ thu hồi token đưa ra,
+                    # và chỉ đổi trạng thái online của chính username kết nối này
+                    user = self.sessions.revoke(request_data.get('token'))
+                    if user:
+                        self.presence.logout(user['id'])
+                    else:
+                        self.presence.logout(username=username)
+                    logging.info(f'User {username} logged out via lobby')
+                    return {'success': True}
+                except Exception as e:
+                    logging.error(f'Logout error: {e}')
+                    return {'success': False, 'error': str(e)}
+            return {'message': 'unknown request'}
+        
+        if 'request' not in request_data:
+            return {'message': 'ok'}
+        
+        request_type = request_data['request']
+        if request_type == 'disconnect':
+            return None
+        elif request_type == 'ping':
+            return {'message': 'pong'}
+        elif request_type == 'get_rooms':
+            return self._get_rooms(request_data)
+        elif request_type == 'subscribe_rooms':
+            return self.subscribe_rooms(username)
+        elif request_type == 'unsubscribe_rooms':
+            with self.lock:
+                self.room_subscribers.discard(username)
+            return {'message': 'unsubscribed'}
+        elif request_type == 'create_room':
+            # Server assigns room ID
+            with self.lock:
+                new_room_id = self.next_room_id
+                self.next_room_id += 1
+            return {'room_id': new_room_id}
+        elif request_type == 'get_leaderboard':
+            return self._get_leaderboard(request_data)
+        elif request_type == 'get_online_users':
+            return self._get_online_users(request_data)
+        elif request_type in DATABASE_REQUESTS:
+            return self.process_database_request(request_data)
+        
+        return {'message': 'unknown request'}
+    
+    def update_room_status(self, room: GameRoom):
+        """Check game state transitions trước khi xử lý request của phòng"""
+        if room.status == GameStatus.ship_lock and room.check_ships_locked():
+            room.status = GameStatus.battle
+        
+        if room.status == GameStatus.battle and room.game_data['winner']:
+            room.status = GameStatus.finished
+    
+    def client_listener(self, client_socket: Connection, username: str, room: GameRoom):
         """Listen to client messages"""
         # Set socket timeout to detect disconnections faster
         client_socket.settimeout(1.0)
@@ -609,37 +1064,32 @@ class RoomServer(Network):
         try:
             while True:
                 try:
-                    data = client_socket.recv(BUFFER_SIZE)
-                    if not data:
+                    decoded_data = client_socket.receive()
+                    if not decoded_data:
                         logging.info(f'Client {username} connection closed (empty data)')
                         break
                     
-                    decoded_data = self.decode_data(data)
-                    
-                    # Check game state transitions
-                    if room.status == GameStatus.ship_lock and room.check_ships_locked():
-                        room.status = GameStatus.battle
-                    
-                    if room.status == GameStatus.battle and room.game_data['winner']:
-                        room.status = GameStatus.finished
+                    self.update_room_status(room)
                     
                     # Handle different request types
-                    if 'request' in decoded_data:
+                    if self.is_database_request(decoded_data):
+                        self.handle_database_request(client_socket, decoded_data)
+                    elif 'request' in decoded_data:
                         response = self.process_request(decoded_data, username, room)
-                        self.send_data(client_socket, response)
+                        self.send_response(client_socket, decoded_data, response)
                         
                         # If disconnect request, break the loop immediately after sending response
                         if decoded_data.get('request') == 'disconnect':
                             logging.info(f'Client {username} requested disconnect - breaking loop')
                             break
                     else:
-                        self.send_data(client_socket, {'message': 'ok'})
+                        self.send_response(client_socket, decoded_data, {'message': 'ok'})
                 
                 except socket.timeout:
                     # Timeout is normal - just continue to check connection
                     continue
                     
-        except socket.error as e:
+        except (socket.error, ValueError) as e:
             logging.info(f'Client {username} disconnected: {e}')
     
     def process_request(self, request_data: dict, username: str, room: GameRoom) -> dict:
@@ -647,12 +1097,40 @@ class RoomServer(Network):
         request_type = request_data.get('request')
         
         if request_type == 'ship_locked':
+            # Client mới gửi fleet gọn, client cũ gửi cả lưới 10x10
+            fleet = request_data.get('fleet')
+            if fleet is None and 'grid' in request_data:
+                fleet = encode_fleet(request_data['grid'])
+            try:
+                board = Board.from_fleet(fleet)
+            except (ValueError, TypeError) as e:
+                return {'error': f'Invalid fleet: {e}'}
+            
             room.game_data['clients'][username]['ship_locked'] = True
-            room.game_data['game_grid'][username] = request_data['grid']
+            room.game_data['game_grid'][username] = board
+            room.mark_modified(username)
+            
+            # Cả 2 đã lock → vào battle ngay, báo lượt đầu cho người đã subscribe
+            if room.status == GameStatus.ship_lock and room.check_ships_locked():
+                room.status = GameStatus.battle
+                self.broadcast(room, self._turn_event(room))
             return {'message': 'ok'}
         
+        elif request_type == 'subscribe_events':
+            snapshot = room.subscribe(username)
+            snapshot['message'] = 'subscribed'
+            return snapshot
+        
         elif request_type == 'game_data':
-            return room.game_data['clients']
+            since_version = request_data.get('since_version')
+            if since_version is None:
+                # Client cũ: trả về toàn bộ clients như trước
+                return room.game_data['clients']
+            try:
+                since_version = int(since_version)
+            except (TypeError, ValueError):
+                return {'error': 'invalid since_version'}
+            return room.get_changes(since_version)
         
         elif request_type == 'game_status':
             return {'game_status': room.status.name}
@@ -661,24 +1139,39 @@ class RoomServer(Network):
             return {'winner': room.game_data['winner']}
         
         elif request_type == 'attack_tile':
-            ship_name = room.attack_enemy_tile(username, request_data['position'])
+            previous_turn = room.current_turn()
+            result = room.attack_enemy_tile(username, request_data['position'])
             room.game_data['clients'][username]['attacked_tile'] = {
                 'position': request_data['position'],
-                'ship_name': ship_name
+                'ship_name': result.ship_name
+            }
+            room.mark_modified(username)
+            
+            self.broadcast(room, {
+                'event': 'attack_result',
+                'attacker': username,
+                'position': request_data['position'],
+                'ship_name': result.ship_name
+            })
+            if result.sunk:
+                owner = next((u for u in room.game_data['clients'] if u != username), None)
+                self.broadcast(room, {'event': 'ship_sunk', 'owner': owner, 'ship_name': result.ship_name})
+            if result.fleet_destroyed:
+                # Hết tàu → kết thúc ngay, không chờ client báo ship_sinked
+                owner = next((u for u in room.game_data['clients'] if u != username), None)
+                room.game_over(owner)
+                self.announce_winner(room)
+            elif room.current_turn() != previous_turn:
+                self.broadcast(room, self._turn_event(room))
+            return {
+                'attacked': result.ship_name,
+                'sunk': result.sunk,
+                'game_over': result.fleet_destroyed
             }
-            return {'attacked': ship_name}
         
         elif request_type == 'ship_sinked':
-            # Player has sunk an enemy ship - increment their sunk count
-            room.game_data['clients'][username]['sinked_ships'] += 1
-            
-            # Check if this player has won (sunk all 5 enemy ships)
-            if room.game_data['clients'][username]['sinked_ships'] >= len(SHIPS_NAMES):
-                # This player won - find opponent who lost
-                for other_username in room.game_data['clients']:
-                    if other_username != username:
-                        room.game_over(other_username)  # Opponent is the loser
-                        break
+            # Server đã tự đếm tàu chìm và xử lý game over trong attack_tile
+            # Giữ lại để client cũ không nhận 'unknown request'
             return {'message': 'ok'}
         
         elif request_type == 'clear_ship_sunk':
@@ -687,6 +1180,7 @@ class RoomServer(Network):
                 if 'ship_sunk' in room.game_data['clients'][username]:
                     ship_name = room.game_data['clients'][username]['ship_sunk']
                     del room.game_data['clients'][username]['ship_sunk']
+                    room.mark_modified(username)
                     print(f"[SERVER] Cleared ship_sunk notification '{ship_name}' for {username}")
             return {'message': 'ok'}
         
@@ -702,11 +1196,15 @@ class RoomServer(Network):
                 for other_username in room.game_data['clients']:
                     if other_username != username:
                         room.game_data['clients'][other_username]['my_turn'] = True
+                room.mark_modified(*room.game_data['clients'])
+            
+            self.broadcast(room, self._turn_event(room))
             
             # Check for game over OUTSIDE lock to prevent deadlock
             if timeout_count >= 3:
                 print(f"[SERVER] {username} reached 3 timeouts - game over")
                 room.game_over(username)
+                self.announce_winner(room)
                 return {'message': 'game_over_timeout', 'timeout_count': timeout_count}
             
             return {'message': 'turn_ended', 'timeout_count': timeout_count}
@@ -722,6 +1220,7 @@ class RoomServer(Network):
                     for other_username in room.game_data['clients']:
                         if other_username != username:
                             room.game_data['winner'] = other_username
+                            room.mark_modified()
                             print(f"[SERVER] ✓✓✓ {other_username} WINS because {username} quit!")
                             print(f"[SERVER] Winner is now: {room.game_data['winner']}")
                             print(f"[SERVER] ==========================================")
@@ -729,35 +1228,75 @@ class RoomServer(Network):
                 else:
                     print(f"[SERVER] Winner already set: {room.game_data['winner']}")
                     print(f"[SERVER] ==========================================")
+            self.announce_winner(room)
             return {'message': 'quit_acknowledged'}
         
         elif request_type == 'disconnect':
             return {'message': 'disconnecting'}
         
-        elif request_type == 'save_game_history':
-            # Save game history to database
-            try:
-                game_data = request_data.get('game_data', {})
-                result = GameHistoryModel.save_game(
-                    user_id=game_data.get('user_id'),
-                    username=game_data.get('username'),
-                    opponent_username=game_data.get('opponent_username'),
-                    result=game_data.get('result'),
-                    ships_sunk=game_data.get('ships_sunk'),
-                    enemy_ships_sunk=game_data.get('enemy_ships_sunk'),
-                    hits=game_data.get('hits'),
-                    misses=game_data.get('misses'),
-                    accuracy=game_data.get('accuracy'),
-                    max_streak=game_data.get('max_streak'),
-                    enemy_hits=game_data.get('enemy_hits'),
-                    enemy_misses=game_data.get('enemy_misses'),
-                    enemy_accuracy=game_data.get('enemy_accuracy'),
-                    enemy_max_streak=game_data.get('enemy_max_streak')
-                )
-                return {'message': 'saved', 'success': result}
-            except Exception as e:
-                logging.error(f'Error saving game history: {e}')
-                return {'message': 'error', 'error': str(e)}
+        elif request_type in DATABASE_REQUESTS:
+            return self.process_database_request(request_data)
+        
+        return {'message': 'unknown request'}
+    
+    def is_database_request(self, request_data: dict) -> bool:
+        """Request đọc/ghi database, chạy trong db_executor thay vì thread/loop giữ socket"""
+        return 'action' not in request_data and request_data.get('request') in DATABASE_REQUESTS
+    
+    def submit_database_request(self, client_socket: Connection, request_data: dict) -> Optional[Future]:
+        """Giao process_database_request cho db_executor
+        
+        - Client gửi request_id (ghép response theo id): response được gửi từ
+          worker khi xong, socket tiếp tục nhận request khác (attack_tile...)
+          trong lúc chờ MySQL
+        - Client cũ (ghép response theo thứ tự): trả Future, caller chờ rồi gửi
+          bằng send_database_result để giữ đúng thứ tự
+        - Pool đầy: gửi BUSY_RESPONSE ngay, không xếp hàng
+        
+        Returns:
+            Future caller phải chờ, None nếu response đã/sẽ được gửi
+        """
+        try:
+            future = self.db_executor.submit(self.process_database_request, request_data)
+        except RuntimeError as e:
+            # ExecutorBusyError, hoặc executor đã shutdown (đang dừng server)
+            logging.warning(f'Rejected {request_data.get("request")}: {e}')
+            self.send_response(client_socket, request_data, BUSY_RESPONSE)
+            return None
+        
+        if 'request_id' in request_data:
+            future.add_done_callback(
+                lambda done: self.send_database_result(client_socket, request_data, done))
+            return None
+        return future
+    
+    def send_database_result(self, client_socket: Connection, request_data: dict, future: Future):
+        """Gửi kết quả của 1 request database (chờ nếu chưa xong)"""
+        try:
+            response = future.result()
+        except Exception as e:
+            logging.error(f'Error processing {request_data.get("request")}: {e}')
+            response = {'error': str(e)}
+        self.send_response(client_socket, request_data, response)
+    
+    def handle_database_request(self, client_socket: Connection, request_data: dict):
+        """Engine threaded: submit rồi chờ kết quả nếu client ghép response theo thứ tự"""
+        future = self.submit_database_request(client_socket, request_data)
+        if future is not None:
+            self.send_database_result(client_socket, request_data, future)
+    
+    def process_database_request(self, request_data: dict) -> dict:
+        """Process các request đọc/ghi database (dùng chung cho lobby và phòng)
+        
+        Các request này có thể chậm (chờ MySQL) nên cả 2 engine chạy chúng trong
+        db_executor (xem submit_database_request)
+        """
+        request_type = request_data.get('request')
+        
+        if request_type == 'save_game_history':
+            # Server tự ghi trận khi có winner (record_match)
+            # Giữ lại để client cũ không nhận 'unknown request', không ghi thêm dòng trùng
+            return {'message': 'saved', 'success': True}
         
         elif request_type == 'get_user_stats':
             # Get user statistics
@@ -770,12 +1309,12 @@ class RoomServer(Network):
                 return {'error': str(e)}
         
         elif request_type == 'get_recent_games':
-            # Get recent games
+            # Get recent games, theo trang: gửi lại next_cursor để lấy trang kế tiếp
             try:
                 user_id = request_data.get('user_id')
-                limit = request_data.get('limit', 10)
-                games = GameHistoryModel.get_recent_games(user_id, limit)
-                return {'games': games}
+                limit = max(1, min(int(request_data.get('limit', 10)), HISTORY_PAGE_MAX))
+                page = GameHistoryModel.get_games_page(user_id, limit, request_data.get('cursor'))
+                return {'games': page['games'], 'next_cursor': page['next_cursor']}
             except Exception as e:
                 logging.error(f'Error getting recent games: {e}')
                 return {'error': str(e)}
@@ -790,6 +1329,16 @@ class RoomServer(Network):
                 logging.error(f'Error getting win streak: {e}')
                 return {'error': str(e)}
         
+        elif request_type == 'get_dashboard':
+            # Màn hình thống kê: stats + chuỗi thắng + trang lịch sử đầu + biểu đồ trong 1 request
+            try:
+                user_id = request_data.get('user_id')
+                limit = max(1, min(int(request_data.get('limit', 20)), HISTORY_PAGE_MAX))
+                return {'dashboard': GameHistoryModel.get_dashboard(user_id, limit)}
+            except Exception as e:
+                logging.error(f'Error getting dashboard: {e}')
+                return {'error': str(e)}
+        
         elif request_type == 'get_opponent_stats':
             # Get opponent statistics by username (called during battle)
             try:
@@ -822,11 +1371,61 @@ class RoomServer(Network):
                 logging.info(f'Created room {room_id}')
                 return room
     
-    def send_data(self, client_socket: socket.socket, data: dict):
-        """Send data to client"""
+    def _turn_event(self, room: GameRoom) -> dict:
+        """Event báo lượt hiện tại kèm số lần timeout của từng người"""
+        return {
+            'event': 'turn_change',
+            'turn': room.current_turn(),
+            'timeout_counts': room.get_timeout_counts()
+        }
+    
+    def broadcast(self, room: GameRoom, event: dict):
+        """Push event tới mọi người trong phòng đã subscribe_events
+        
+        event_lock giữ cho thứ tự event giống nhau ở cả 2 client
+        """
+        with room.event_lock:
+            for client_socket in room.get_subscriber_sockets():
+                self.send_data(client_socket, event)
+    
+    def announce_winner(self, room: GameRoom):
+        """Push event winner và ghi lịch sử trận, đúng 1 lần khi phòng đã có người thắng
+        
+        Mọi kiểu kết thúc (hết tàu, 3 lần timeout, quit, mất kết nối) đều đi qua đây
+        """
+        with room.lock:
+            winner = room.game_data['winner']
+            if not winner or room.winner_announced:
+                return
+            room.winner_announced = True
+        self.broadcast(room, {'event': 'winner', 'winner': winner})
+        self.record_match(room)
+    
+    def record_match(self, room: GameRoom):
+        """Ghi lịch sử trận do server tính (client không gửi save_game_history nữa)"""
+        match = room.build_match_record()
+        if match:
+            self.history_writer.submit_match(match)
+    
+    def send_response(self, client_socket: Connection, request_data: dict, response: dict):
+        """Gửi response, kèm lại request_id và channel nếu client có gửi
+        
+        Client pipelined dùng request_id để ghép response với request đang chờ
+        EncodedMessage (response encode sẵn): nối thêm bytes của 2 key, không encode lại
+        """
+        if isinstance(response, (dict, EncodedMessage)):
+            echo = {key: request_data[key] for key in ('request_id', 'channel') if key in request_data}
+            if echo:
+                if isinstance(response, EncodedMessage):
+                    response = response.with_fields(echo)
+                else:
+                    response = dict(response, **echo)
+        self.send_data(client_socket, response)
+    
+    def send_data(self, client_socket: Connection, data: dict):
+        """Send data to client (frame hoặc datagram cũ tùy kết nối)"""
         try:
-            message = self.create_datagram(BUFFER_SIZE, data)
-            client_socket.sendall(message)
+            client_socket.send(data)
         except socket.error as e:
             logging.error(f'Error sending data: {e}')
     
@@ -842,18 +1441,68 @@ class RoomServer(Network):
             lobby_count = len(self.lobby_clients)
             return room_clients + lobby_count
     
-    def _get_rooms_list(self):
-        """Get list of available rooms for browsing"""
+    def _get_rooms(self, request_data: dict):
+        """Danh sách phòng còn chỗ (request 'get_rooms')
+        
+        Args:
+            request_data: {'version': Version client nhận lần trước (tùy chọn)}
+        
+        Returns:
+            - {'not_modified': True, 'version'} nếu danh sách chưa đổi từ version đó
+            - EncodedMessage {'rooms': [{id, room_name, host_username, current_players,
+              max_players}], 'version'} encode sẵn trong room_index, dùng chung mọi client
+        
+        O(1): không duyệt phòng, không khóa self.lock hay lock của phòng
+        """
+        version = self.room_index.version
+        if request_data.get('version') == version:
+            return {'not_modified': True, 'version': version}
+        return self.room_index.response()
+    
+    def _get_leaderboard(self, request_data: dict) -> dict:
+        """Bảng xếp hạng (request 'get_leaderboard')
+        
+        Args:
+            request_data: {'board': 'wins' | 'win_rate' | 'best_streak' (mặc định 'wins'),
+                'limit': Số người đứng đầu (mặc định 10, tối đa leaderboard_max_limit),
+                'user_id': Người cần biết hạng (tùy chọn)}
+        
+        Returns:
+            {'success': True, 'board', 'entries': [{rank, user_id, username, wins,
+            losses, total_games, win_rate, best_streak}], 'me': entry kèm rank hoặc None,
+            'min_games': Số trận tối thiểu của bảng win_rate}
+        
+        Đọc LEADERBOARD trong bộ nhớ, không chạm database → không cần chạy trong executor
+        """
+        board = request_data.get('board', 'wins')
+        try:
+            entries = LEADERBOARD.top(board, request_data.get('limit', 10))
+            user_id = request_data.get('user_id')
+            me = LEADERBOARD.rank(board, user_id) if user_id else None
+        except (ValueError, TypeError) as e:
+            return {'success': False, 'error': str(e)}
+        return {'success': True, 'board': board, 'entries': entries, 'me': me,
+                'min_games': LEADERBOARD.min_games}
+    
+    def _get_online_users(self, request_data: dict) -> dict:
+        """Danh sách người đang online (request 'get_online_users')
+        
+        Args:
+            request_data: {'limit': Số người tối đa (mặc định ONLINE_USERS_MAX)}
+        
+        Returns:
+            {'success': True, 'count': Tổng số người online, 'users': [{username,
+            user_id, since, room_id (None = đang ở lobby)}]}
+        
+        Đọc PresenceRegistry trong bộ nhớ, không chạm database
+        """
+        try:
+            limit = max(0, min(int(request_data.get('limit', ONLINE_USERS_MAX)), ONLINE_USERS_MAX))
+        except (ValueError, TypeError) as e:
+            return {'success': False, 'error': str(e)}
+        users = self.presence.online_users()
         with self.lock:
-            rooms_list = []
-            for room_id, room in self.rooms.items():
-                if room.get_client_count() < 2:  # Only show rooms with space
-                    rooms_list.append({
-                        'id': room_id,
-                        'room_name': room.room_name,
-                        'host_username': room.host_username,
-                        'current_players': room.get_client_count(),
-                        'max_players': 2
-                    })
-            return rooms_list
+            for user in users[:limit]:
+                user['room_id'] = self.client_rooms.get(user['username'])
+        return {'success': True, 'count': len(users), 'users': users[:limit]}
 
@@ -0,0 +1,120 @@
+"""
+Session token trong bộ nhớ
+Login 1 lần chạm database, các kết nối sau (lobby, phòng, reconnect) chỉ cần token
+"""
+import secrets
+import time
+from threading import Lock
+from typing import Dict, Optional
+
+
+class SessionToken:
+    """1 token đã cấp
+
+    Thuộc tính:
+    - token: Chuỗi ngẫu nhiên gửi cho client
+    - user: Dict user trả về lúc login (id, username, ...)
+    - expires_at: time.monotonic() hết hạn (gia hạn mỗi lần dùng)
+    """
+
+    __slots__ = ('token', 'user', 'expires_at')
+
+    def __init__(self, token: str, user: dict, expires_at: float):
+        self.token = token
+        self.user = user
+        self.expires_at = expires_at
+
+
+class SessionStore:
+    """Index token → user, có hạn dùng (sliding expiry)
+
+    - tokens: {token: SessionToken}
+    - user_tokens: {user_id: token} mỗi user chỉ giữ 1 token (login lại → token cũ mất hiệu lực)
+
+    Token hết hạn bị xóa khi tra cứu, và quét định kỳ khi cấp token mới
+    Thread-safe (dùng chung cho mọi kết nối và executor của engine asyncio)
+    """
+
+    PURGE_INTERVAL = 60  # Giây giữa 2 lần quét token hết hạn
+
+    def __init__(self, ttl: float = 3600):
+        self.ttl = ttl
+        self.tokens: Dict[str, SessionToken] = {}
+        self.user_tokens: Dict[int, str] = {}
+        self.lock = Lock()
+        self.next_purge = time.monotonic() + self.PURGE_INTERVAL
+
+    def issue(self, user: dict) -> str:
+        """Cấp token mới cho user vừa login, thu hồi token cũ của user đó"""
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self.lock:
+            old_token = self.user_tokens.get(user['id'])
+            if old_token:
+                self.tokens.pop(old_token, None)
+            self.tokens[token] = SessionToken(token, user, now + self.ttl)
+            self.user_tokens[user['id']] = token
+
+            if now >= self.next_purge:
+                self._purge_expired(now)
+        return token
+
+    def resume(self, token: Optional[str]) -> Optional[dict]:
+        """Tra user theo token và gia hạn
+
+        Returns:
+            Dict user, None nếu token không tồn tại hoặc đã hết hạn
+        """
+        if not token:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            session = self.tokens.get(token)
+            if session is None:
+                return None
+            if session.expires_at <= now:
+                self._remove(session)
+                return None
+            session.expires_at = now + self.ttl
+            return session.user
+
+    def revoke(self, token: Optional[str]) -> Optional[dict]:
+        """Thu hồi token client gửi lên (logout)
+
+        Returns:
+            Dict user của token, None nếu token không tồn tại
+        """
+        if not token:
+            return None
+        with self.lock:
+            session = self.tokens.get(token)
+            if session is None:
+                return None
+            self._remove(session)
+            return session.user
+
+    def revoke_user(self, user_id: int) -> None:
+        """Thu hồi token của user_id
+
+        Chỉ gọi với user_id server đã xác thực (session.user_id của kết nối),
+        không bao giờ với user_id client tự gửi trong request
+        """
+        with self.lock:
+            token = self.user_tokens.get(user_id)
+            session = self.tokens.get(token) if token else None
+            if session:
+                self._remove(session)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.tokens)
+
+    def _remove(self, session: SessionToken) -> None:
+        self.tokens.pop(session.token, None)
+        if self.user_tokens.get(session.user['id']) == session.token:
+            del self.user_tokens[session.user['id']]
+
+    def _purge_expired(self, now: float) -> None:
+        for session in [s for s in self.tokens.values() if s.expires_at <= now]:
+            self._remove(session)
+        self.next_purge = now + self.PURGE_INTERVAL
@@ -2,10 +2,13 @@
 Enhanced Game Server with Room Management and Database
 Manages multiple game rooms simultaneously
 """
+import argparse
 import tkinter as tk
 from types import TracebackType
 from typing import Optional, Type
 
+from config.server_config import SERVER_CONFIG
+from networking.engines import ENGINES, create_room_server
 from networking.room_server import RoomServer
 
 
@@ -29,9 +32,12 @@ class GameServerWindow(object):
     - Client sẽ kết nối đến localhost:65432
     """
 
-    def __init__(self) -> None:
+    def __init__(self, engine: Optional[str] = None) -> None:
         """Khởi tạo cửa sổ server
         
+        Args:
+            engine: 'threaded' hoặc 'asyncio', None → SERVER_CONFIG['engine']
+        
         Tạo UI với:
         - Top frame: nút Start/Stop Server
         - Mid frame: hiển thị Address và Port
@@ -48,6 +54,7 @@ class GameServerWindow(object):
 
         # Core attributes
         self.server: RoomServer = None
+        self.engine = engine or SERVER_CONFIG['engine']
         self.polling_interval = 1000
 
         # Top frame for start and stop game server
@@ -136,22 +143,22 @@ class GameServerWindow(object):
         
         Luồng:
         1. Disable nút Start, enable nút Stop
-        2. Tạo RoomServer instance (localhost:65432)
+        2. Tạo RoomServer theo engine đã chọn (localhost:65432)
         3. Gọi server.start_server() để:
            - Tạo socket lắng nghe
            - Bắt đầu accept thread
            - Sẵn sàng nhận kết nối từ client
         4. Update UI hiển thị Address và Port
         
-        Lưu ý: Server chạy multi-threaded, mỗi room có thread riêng
+        Lưu ý: Engine threaded chạy 1 thread/kết nối, engine asyncio dùng 1 event loop
         """
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
 
-        host_address = 'localhost'
-        host_port = 65432
+        host_address = SERVER_CONFIG['host']
+        host_port = SERVER_CONFIG['port']
 
-        self.server = RoomServer(host_address, host_port)
+        self.server = create_room_server(host_address, host_port, self.engine)
         self.server.start_server()
 
         self.lbl_host['text'] = f'Address: {host_address}'
@@ -244,8 +251,16 @@ def main():
     - Giải phóng tài nguyên (socket, thread) an toàn
     
     Chạy Tkinter mainloop để hiển thị UI và xử lý events
+    
+    Tham số dòng lệnh:
+        --engine threaded|asyncio: Chọn engine mạng (mặc định theo SERVER_CONFIG)
     """
-    with GameServerWindow() as window:
+    parser = argparse.ArgumentParser(description='Battleship multi-room server')
+    parser.add_argument('--engine', choices=ENGINES, default=SERVER_CONFIG['engine'],
+                        help='Network engine: threaded (1 thread/connection) or asyncio (event loop)')
+    args = parser.parse_args()
+    
+    with GameServerWindow(args.engine) as window:
         window.parent.mainloop()
 
 
@@ -0,0 +1,95 @@
+"""
+Backfill User Stats
+Tính lại chuỗi thắng (current_win_streak, longest_win_streak) trong user_stats
+từ toàn bộ game_history - chạy 1 lần cho lịch sử có trước bảng user_stats
+
+Ví dụ:
+    python tools/backfill_user_stats.py            # Ghi kết quả
+    python tools/backfill_user_stats.py --dry-run  # Chỉ in, không ghi
+
+Lưu ý: Nên chạy khi server đang tắt (trận ghi giữa lúc backfill có thể bị
+kết quả backfill ghi đè chuỗi thắng)
+"""
+import argparse
+import os
+import sys
+from typing import Dict, Iterable, List, Tuple
+
+# Add parent directory to path to import config/models
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.base_model import BaseModel
+
+
+FETCH_SIZE = 5000  # Số dòng game_history đọc mỗi lần
+
+
+def compute_streaks(results: Iterable[Tuple[int, str]]) -> Dict[int, Tuple[int, int]]:
+    """Duyệt 1 lượt các (user_id, result) đã sắp theo user_id, played_at, id
+
+    Returns:
+        {user_id: (current_win_streak, longest_win_streak)}
+    """
+    streaks = {}
+    for user_id, result in results:
+        current, longest = streaks.get(user_id, (0, 0))
+        if result == 'win':
+            current += 1
+            longest = max(longest, current)
+        else:
+            current = 0
+        streaks[user_id] = (current, longest)
+    return streaks
+
+
+def read_results(cursor) -> Iterable[Tuple[int, str]]:
+    """Đọc kết quả từng trận theo thứ tự thời gian (từng khối FETCH_SIZE dòng)"""
+    cursor.execute("""
+        SELECT user_id, result
+        FROM game_history
+        ORDER BY user_id, played_at, id
+    """)
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            yield row['user_id'], row['result']
+
+
+def backfill(dry_run: bool = False) -> int:
+    """Tính lại và ghi chuỗi thắng cho mọi user có lịch sử
+
+    Returns:
+        Số user đã cập nhật (hoặc sẽ cập nhật nếu dry_run)
+    """
+    with BaseModel.transaction() as cursor:
+        streaks = compute_streaks(read_results(cursor))
+
+        params_list: List[Tuple[int, int, int]] = [
+            (current, longest, user_id) for user_id, (current, longest) in sorted(streaks.items())
+        ]
+        for current, longest, user_id in params_list:
+            print(f"user_id={user_id:<8} current_win_streak={current:<6} longest_win_streak={longest}")
+
+        if params_list and not dry_run:
+            # Dòng user_stats thiếu (chưa chạy run_migration.py) không được tạo ở đây
+            cursor.executemany("""
+                UPDATE user_stats
+                SET current_win_streak = %s, longest_win_streak = %s
+                WHERE user_id = %s
+            """, params_list)
+    return len(params_list)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Backfill win streaks in user_stats from game_history')
+    parser.add_argument('--dry-run', action='store_true', help='Chỉ in kết quả, không ghi database')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    count = backfill(args.dry_run)
+    action = 'would be updated' if args.dry_run else 'updated'
+    print(f"{count} users {action}")
@@ -0,0 +1,591 @@
+"""
+Load Test Harness
+Chạy N bot headless đánh trọn trận với RoomServer để đo tải
+
+Ví dụ:
+    python tools/load_test.py --bots 200 --games 3 --shot-interval 0.05
+    python tools/load_test.py --engine asyncio --bots 1000
+    python tools/load_test.py --session   # 1 kết nối/bot cho auth, lobby và phòng
+    python tools/load_test.py --db sqlite # Model layer thật trên file SQLite tạm
+    python tools/load_test.py --host 127.0.0.1 --port 65432   # server đang chạy sẵn
+"""
+import argparse
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to path to import networking/models
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from networking.network import Network, MessageBuffer, SHIPS_NAMES, SHIP_SIZES, GRID_SIZE, fleet_masks
+
+
+class LoadStats:
+    """Gom số liệu của mọi bot (thread-safe)
+
+    - latencies: {request_type: [giây, ...]}
+    - errors: {loại lỗi: số lần}
+    - disconnects: Số lần server đóng kết nối bất ngờ
+    - games_completed: Số trận kết thúc có winner
+    - history_rows: Số dòng game_history server đã ghi (None nếu server chạy ngoài process)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.disconnects = 0
+        self.games_completed = 0
+        self.history_rows: Optional[int] = None
+
+    def record(self, request_type: str, seconds: float):
+        with self.lock:
+            self.latencies[request_type].append(seconds)
+
+    def error(self, kind: str):
+        with self.lock:
+            self.errors[kind] += 1
+
+    def disconnect(self):
+        with self.lock:
+            self.disconnects += 1
+
+    def game_completed(self):
+        with self.lock:
+            self.games_completed += 1
+
+    def report(self, bots: int, duration: float) -> str:
+        """Bảng kết quả: throughput, p50/p95/p99 theo từng loại request, lỗi"""
+        with self.lock:
+            total = sum(len(values) for values in self.latencies.values())
+            lines = [
+                f'Bots: {bots} | Games completed: {self.games_completed} | Duration: {duration:.1f}s',
+                f'Requests: {total} ({total / duration if duration else 0:.1f} req/s)',
+                f'Errors: {sum(self.errors.values())} | Disconnects: {self.disconnects}'
+                + ('' if self.history_rows is None else f' | History rows: {self.history_rows}'),
+                '',
+                f'{"request":<22}{"count":>8}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}{"max(ms)":>10}'
+            ]
+            for request_type in sorted(self.latencies):
+                values = sorted(self.latencies[request_type])
+                lines.append(
+                    f'{request_type:<22}{len(values):>8}'
+                    f'{percentile(values, 50):>10.2f}{percentile(values, 95):>10.2f}'
+                    f'{percentile(values, 99):>10.2f}{values[-1] * 1000:>10.2f}'
+                )
+            if self.errors:
+                lines.append('')
+                lines.extend(f'error {kind}: {count}' for kind, count in sorted(self.errors.items()))
+            return '\n'.join(lines)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentile (ms) theo nearest-rank của list đã sort"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, int(round(pct / 100 * len(sorted_values))) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)] * 1000
+
+
+def random_fleet() -> List[List[int]]:
+    """Đặt ngẫu nhiên 5 tàu, trả về fleet [col, row, vertical, length] hợp lệ"""
+    while True:
+        fleet = []
+        for ship_name in SHIPS_NAMES:
+            length = SHIP_SIZES[ship_name]
+            vertical = random.randint(0, 1)
+            col = random.randint(0, GRID_SIZE - (1 if vertical else length))
+            row = random.randint(0, GRID_SIZE - (length if vertical else 1))
+            fleet.append([col, row, vertical, length])
+        try:
+            fleet_masks(fleet)
+            return fleet
+        except ValueError:
+            continue
+
+
+class BotConnection(Network):
+    """1 kết nối của bot, nói đúng giao thức của RoomClient (frame có header độ dài)
+
+    - request(): Gửi và chờ response, event đến trước được xếp vào hàng đợi, đo latency
+    - wait_event(): Lấy 1 event (chờ tối đa timeout giây)
+    """
+
+    def __init__(self, address, stats: LoadStats, timeout: float):
+        self.stats = stats
+        self.timeout = timeout
+        self.socket = socket.create_connection(address, timeout=timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = MessageBuffer(False)
+        self.events = deque()
+
+    def request(self, data: dict, request_type: str = None) -> Optional[dict]:
+        """Gửi request, trả về response (None nếu server đóng kết nối)"""
+        request_type = request_type or data.get('request') or data.get('action')
+        start = time.perf_counter()
+        self.socket.settimeout(self.timeout)
+        self.socket.sendall(self.create_frame(data))
+
+        response = self.receive_message(self.socket, self.buffer)
+        while isinstance(response, dict) and 'event' in response:
+            self.events.append(response)
+            response = self.receive_message(self.socket, self.buffer)
+
+        self.stats.record(request_type, time.perf_counter() - start)
+        return response
+
+    def send(self, data: dict):
+        """Gửi không chờ response (vd: disconnect khỏi lobby)"""
+        self.socket.sendall(self.create_frame(data))
+
+    def wait_event(self, timeout: float) -> Optional[dict]:
+        if self.events:
+            return self.events.popleft()
+        self.socket.settimeout(timeout)
+        try:
+            message = self.receive_message(self.socket, self.buffer)
+        except (socket.timeout, BlockingIOError):
+            return None
+        if message is None:
+            raise ConnectionResetError('Server closed connection')
+        return message
+
+    def close(self):
+        try:
+            self.socket.close()
+        except OSError:
+            pass
+
+
+class BotChannel:
+    """1 kênh logic (auth/lobby/room) trên kết nối session của bot, cùng interface với BotConnection"""
+
+    def __init__(self, connection: BotConnection, channel: str):
+        self.connection = connection
+        self.channel = channel
+
+    def request(self, data: dict, request_type: str = None) -> Optional[dict]:
+        request_type = request_type or data.get('request') or data.get('action')
+        return self.connection.request(dict(data, channel=self.channel), request_type)
+
+    def send(self, data: dict):
+        self.connection.send(dict(data, channel=self.channel))
+
+    def wait_event(self, timeout: float) -> Optional[dict]:
+        return self.connection.wait_event(timeout)
+
+    def close(self):
+        """Kết nối session vẫn giữ, chỉ đóng khi bot xong (Bot.run)"""
+
+
+class Bot:
+    """Bot headless chơi trọn 1 vòng: auth → lobby → phòng → đặt tàu → bắn tới hết trận
+
+    2 bot cùng cặp dùng chung pair dict: host tạo phòng cho từng ván (pair['rooms'][game]),
+    guest chờ phòng đó xuất hiện trong danh sách phòng (subscribe_rooms)
+
+    use_session: 1 kết nối cho cả phiên (kênh auth/lobby/room) thay vì 1 kết nối mỗi bước
+    """
+
+    def __init__(self, name: str, address, stats: LoadStats, pair: dict, is_host: bool,
+                 shot_interval: float, timeout: float, use_session: bool = False):
+        self.name = name
+        self.address = address
+        self.stats = stats
+        self.pair = pair
+        self.is_host = is_host
+        self.shot_interval = shot_interval
+        self.timeout = timeout
+        self.use_session = use_session
+        self.session: Optional[BotConnection] = None
+        self.user = None
+        self.token = None
+
+    def connect(self, channel: str, first_message: dict,
+                request_type: str) -> Tuple[BotConnection, Optional[dict]]:
+        """Mở kết nối mới, hoặc dùng kênh tương ứng trên session (use_session)"""
+        if not self.use_session:
+            connection = BotConnection(self.address, self.stats, self.timeout)
+            return connection, connection.request(first_message, request_type)
+
+        if self.session is None:
+            self.session = BotConnection(self.address, self.stats, self.timeout)
+        connection = BotChannel(self.session, channel)
+        if channel == 'lobby':
+            # Server đã đưa session vào lobby lúc login
+            return connection, None
+        if channel == 'room':
+            self.session.events.clear()  # Event còn sót của ván trước (vd: opponent_left)
+            first_message = {'request': 'join_room', 'room_id': first_message['room_id']}
+        return connection, connection.request(first_message, request_type)
+
+    def authenticate(self):
+        """Đăng ký (bỏ qua nếu đã có) rồi đăng nhập (mỗi auth 1 kết nối riêng, trừ khi dùng session)"""
+        for action in ('auth:register', 'auth:login'):
+            connection, response = self.connect(
+                'auth', {'action': action, 'username': self.name, 'password': 'load-test'}, action)
+            connection.close()
+            if action == 'auth:login':
+                if not response or not response.get('success'):
+                    raise RuntimeError(f'login failed: {response}')
+                self.user = response['user']
+                self.token = response.get('token')
+
+    def identity(self) -> dict:
+        """Connection data của kết nối lobby/phòng: token từ login (server cũ: username/user_id)"""
+        if self.token:
+            return {'token': self.token}
+        return {'username': self.name, 'user_id': self.user['id']}
+
+    def find_room(self, game: int) -> int:
+        """Qua lobby: host create_room, guest chờ phòng của host hiện trong danh sách phòng"""
+        created = self.pair['created'][game]
+        lobby, ack = self.connect('lobby', self.identity(), 'connect_lobby')
+        try:
+            lobby.request({'request': 'get_rooms'})
+            lobby.request({'request': 'get_leaderboard', 'board': 'wins', 'user_id': self.user['id']})
+            lobby.request({'request': 'get_online_users'})
+            if self.is_host:
+                room_id = lobby.request({'request': 'create_room'})['room_id']
+                self.pair['rooms'][game] = room_id
+                created.set()
+                return room_id
+
+            if not created.wait(self.timeout):
+                raise TimeoutError('host did not create a room')
+            room_id = self.pair['rooms'][game]
+            return self.wait_for_room(lobby, room_id)
+        finally:
+            # Disconnect trên kênh lobby sẽ đóng cả session → chỉ gửi khi dùng kết nối riêng
+            if not self.use_session:
+                lobby.send({'request': 'disconnect'})
+            lobby.close()
+
+    def wait_for_room(self, lobby, room_id: int) -> int:
+        """Guest: subscribe_rooms, chờ phòng của host có trong snapshot hoặc tới qua event
+        room_added (không polling get_rooms)"""
+        snapshot = lobby.request({'request': 'subscribe_rooms'})
+        try:
+            if any(room['id'] == room_id for room in snapshot.get('rooms', [])):
+                return room_id
+            deadline = time.time() + self.timeout
+            while time.time() < deadline:
+                event = lobby.wait_event(max(0.01, deadline - time.time()))
+                if event and event.get('event') == 'room_added' and event['room']['id'] == room_id:
+                    return room_id
+            raise TimeoutError('room never showed up in subscribe_rooms')
+        finally:
+            lobby.request({'request': 'unsubscribe_rooms'})
+
+    def play(self, room_id: int):
+        """Vào phòng, lock tàu, bắn theo lượt tới khi có winner"""
+        room, ack = self.connect('room', dict(self.identity(), room_id=room_id), 'connect_room')
+        if not ack or ack.get('status') != 'connected':
+            room.close()
+            raise RuntimeError(f'join failed: {ack}')
+
+        try:
+            # Subscribe trước khi lock → chắc chắn nhận turn_change mở đầu trận
+            room.request({'request': 'subscribe_events'})
+            room.request({'request': 'ship_locked', 'fleet': random_fleet()})
+            my_turn = False
+
+            targets = [(col, row) for row in range(GRID_SIZE) for col in range(GRID_SIZE)]
+            random.shuffle(targets)
+            winner = None
+            last_progress = time.time()
+
+            while winner is None:
+                if time.time() - last_progress > self.timeout:
+                    raise TimeoutError('game stalled')
+
+                # Xử lý hết event đã nhận trước khi quyết định bắn
+                event = room.wait_event(0 if my_turn else 0.5)
+                while event is not None:
+                    last_progress = time.time()
+                    if event['event'] == 'turn_change':
+                        my_turn = event['turn'] == self.name
+                    elif event['event'] == 'winner':
+                        winner = event['winner']
+                        break
+                    elif event['event'] == 'opponent_left' and event['username'] != self.name:
+                        self.stats.disconnect()
+                        return
+                    event = room.wait_event(0)
+                if winner is not None:
+                    break
+
+                if my_turn and targets:
+                    time.sleep(self.shot_interval)
+                    response = room.request({'request': 'attack_tile', 'position': targets.pop()})
+                    if response is None:
+                        self.stats.disconnect()
+                        return
+                    last_progress = time.time()
+
+            if self.is_host:
+                self.stats.game_completed()
+
+            # Lịch sử trận do server tự ghi khi có winner
+            room.request({'request': 'disconnect'})
+        finally:
+            room.close()
+
+    def run(self, games: int):
+        try:
+            self.authenticate()
+            for game in range(games):
+                self.play(self.find_room(game))
+        except (ConnectionError, socket.timeout, TimeoutError) as e:
+            self.stats.error(type(e).__name__)
+        except Exception as e:
+            self.stats.error(f'{type(e).__name__}: {e}')
+        finally:
+            if self.session:
+                self.session.close()
+
+
+class MemoryDatabase:
+    """Database trong bộ nhớ thay cho MySQL khi chạy load test cục bộ
+
+    install() thay các method UserModel/GameHistoryModel/UserIndex/Leaderboard mà RoomServer gọi,
+    để đo riêng phần mạng + logic game mà không cần MySQL
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users: Dict[str, dict] = {}
+        self.games: List[dict] = []
+
+    def install(self):
+        from models.user_model import UserModel
+        from models.game_history_model import GameHistoryModel
+        from models.user_index import UserIndex
+        from models.leaderboard import Leaderboard
+
+        UserModel.authenticate = staticmethod(self.authenticate)
+        UserModel.create_user = staticmethod(self.create_user)
+        UserModel.get_user_by_id = staticmethod(self.get_user_by_id)
+        UserModel.get_user_by_username = staticmethod(self.get_user_by_username)
+        UserModel.update_online_status = staticmethod(self.update_online_status)
+        UserModel.reset_online_status = staticmethod(self.reset_online_status)
+        GameHistoryModel.save_game = staticmethod(self.save_game)
+        GameHistoryModel.save_games = staticmethod(self.save_games)
+        GameHistoryModel.get_user_stats = staticmethod(self.get_user_stats)
+        GameHistoryModel.get_user_stats_by_username = staticmethod(self.get_user_stats_by_username)
+        GameHistoryModel.get_recent_games = staticmethod(self.get_recent_games)
+        GameHistoryModel.get_games_page = staticmethod(self.get_games_page)
+        GameHistoryModel.get_dashboard = staticmethod(self.get_dashboard)
+        GameHistoryModel.get_win_streak = staticmethod(self.get_win_streak)
+        UserIndex._load_all = staticmethod(self.load_user_ids)
+        UserIndex._load_ids = staticmethod(self.load_user_ids_by_name)
+        Leaderboard._load_all = staticmethod(self.load_user_stats)
+
+    def _public(self, user: dict) -> dict:
+        return {'id': user['id'], 'username': user['username'], 'is_online': user['is_online']}
+
+    def authenticate(self, username, password):
+        with self.lock:
+            user = self.users.get(username)
+            if not user or user['password'] != password:
+                return None
+            return self._public(user)
+
+    def create_user(self, username, password):
+        with self.lock:
+            user_id = len(self.users) + 1
+            self.users[username] = {'id': user_id, 'username': username,
+                                    'password': password, 'is_online': 0}
+            return user_id
+
+    def get_user_by_id(self, user_id):
+        with self.lock:
+            user = next((u for u in self.users.values() if u['id'] == user_id), None)
+            return self._public(user) if user else None
+
+    def get_user_by_username(self, username):
+        with self.lock:
+            user = self.users.get(username)
+            return self._public(user) if user else None
+
+    def load_user_ids(self):
+        with self.lock:
+            return [{'id': u['id'], 'username': u['username']} for u in self.users.values()]
+
+    def load_user_ids_by_name(self, usernames):
+        with self.lock:
+            return [{'id': self.users[name]['id'], 'username': name}
+                    for name in usernames if name in self.users]
+
+    def update_online_status(self, online_ids, offline_ids):
+        with self.lock:
+            for user in self.users.values():
+                if user['id'] in online_ids:
+                    user['is_online'] = 1
+                elif user['id'] in offline_ids:
+                    user['is_online'] = 0
+            return len(online_ids) + len(offline_ids)
+
+    def reset_online_status(self):
+        with self.lock:
+            for user in self.users.values():
+                user['is_online'] = 0
+            return True
+
+    def save_game(self, **game):
+        with self.lock:
+            self.games.append(game)
+            return True
+
+    def save_games(self, records):
+        from models.leaderboard import LEADERBOARD
+
+        with self.lock:
+            self.games.extend(records)
+        LEADERBOARD.update(self.load_user_stats({record['user_id'] for record in records}))
+        return len(records)
+
+    def load_user_stats(self, user_ids=None):
+        """Dòng user_stats (cột như Leaderboard.SELECT_ROWS) tính từ các trận đã lưu"""
+        rows = {}
+        with self.lock:
+            for game in self.games:
+                if user_ids is not None and game['user_id'] not in user_ids:
+                    continue
+                row = rows.setdefault(game['user_id'], {
+                    'user_id': game['user_id'], 'username': game['username'], 'total_games': 0,
+                    'wins': 0, 'losses': 0, 'current_win_streak': 0, 'longest_win_streak': 0})
+                row['total_games'] += 1
+                if game['result'] == 'win':
+                    row['wins'] += 1
+                    row['current_win_streak'] += 1
+                    row['longest_win_streak'] = max(row['longest_win_streak'], row['current_win_streak'])
+                else:
+                    row['losses'] += 1
+                    row['current_win_streak'] = 0
+        return list(rows.values())
+
+    def get_user_stats(self, user_id):
+        with self.lock:
+            games = [g for g in self.games if g['user_id'] == user_id]
+        if not games:
+            return None
+        wins = sum(1 for g in games if g['result'] == 'win')
+        return {'total_games': len(games), 'total_wins': wins, 'total_losses': len(games) - wins}
+
+    def get_user_stats_by_username(self, username):
+        user = self.get_user_by_username(username)
+        return self.get_user_stats(user['id']) if user else None
+
+    def get_recent_games(self, user_id, limit=10):
+        return self.get_games_page(user_id, limit)['games']
+
+    def get_games_page(self, user_id, limit=20, cursor=None):
+        with self.lock:
+            games = [dict(g, id=index) for index, g in enumerate(self.games) if g['user_id'] == user_id]
+        games.reverse()
+        if cursor:
+            games = [g for g in games if g['id'] < cursor['id']]
+        next_cursor = {'played_at': '', 'id': games[limit - 1]['id']} if len(games) > limit else None
+        return {'games': games[:limit], 'next_cursor': next_cursor}
+
+    def get_win_streak(self, user_id):
+        return {'current_streak': 0, 'longest_streak': 0}
+
+    def get_dashboard(self, user_id, limit=20):
+        page = self.get_games_page(user_id, limit)
+        return {'stats': self.get_user_stats(user_id), 'streak': self.get_win_streak(user_id),
+                'games': page['games'], 'next_cursor': page['next_cursor'], 'charts': None}
+
+
+def run_load_test(args) -> Tuple[LoadStats, float]:
+    """Khởi động server (nếu cần), chạy các cặp bot song song
+
+    Returns:
+        (LoadStats, thời gian chạy tính bằng giây)
+    """
+    server = None
+    database = None
+    if args.port is None:
+        # Server trong cùng process + database trong bộ nhớ hoặc SQLite
+        if args.db == 'sqlite':
+            from models.base_model import Database
+            from models.sqlite_backend import SQLiteBackend
+            db_path = args.db_path or os.path.join(tempfile.mkdtemp(prefix='battleship_'), 'load_test.db')
+            Database.use_backend(SQLiteBackend(db_path))
+            print(f'SQLite database: {db_path}')
+        else:
+            database = MemoryDatabase()
+            database.install()
+        from networking.engines import create_room_server
+        server = create_room_server('127.0.0.1', 0, args.engine)
+        server.start_server()
+        address = ('127.0.0.1', server.host_port)
+    else:
+        address = (args.host, args.port)
+
+    stats = LoadStats()
+    run_id = int(time.time())
+    threads = []
+    for pair_index in range(args.bots // 2):
+        names = [f'bot{run_id}_{pair_index}_{side}' for side in ('h', 'g')]
+        pair = {'names': names, 'rooms': {},
+                'created': [threading.Event() for _ in range(args.games)]}
+        for side, name in enumerate(names):
+            bot = Bot(name, address, stats, pair, side == 0, args.shot_interval, args.timeout,
+                      args.session)
+            threads.append(threading.Thread(target=bot.run, args=(args.games,), daemon=True))
+
+    start = time.time()
+    for thread in threads:
+        thread.start()
+        if args.ramp_up:
+            time.sleep(args.ramp_up / len(threads))
+    for thread in threads:
+        thread.join()
+    duration = time.time() - start
+
+    if server:
+        server.stop_server()
+        stats.history_rows = len(database.games) if database else count_history_rows()
+    return stats, duration
+
+
+def count_history_rows() -> int:
+    """Số dòng game_history trong database thật (--db sqlite)"""
+    from models.base_model import BaseModel
+    row = BaseModel.execute_query("SELECT COUNT(*) AS total FROM game_history", fetch_one=True)
+    return row['total'] if row else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Battleship RoomServer load test')
+    parser.add_argument('--bots', type=int, default=20, help='Number of bot clients (pairs of 2)')
+    parser.add_argument('--games', type=int, default=1, help='Games played by each pair')
+    parser.add_argument('--shot-interval', type=float, default=0.05, help='Seconds between shots')
+    parser.add_argument('--ramp-up', type=float, default=1.0, help='Seconds to start all bots')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Seconds before a request/game counts as stalled')
+    parser.add_argument('--engine', choices=('threaded', 'asyncio'), default=None,
+                        help='Engine of the in-process server (default: SERVER_CONFIG)')
+    parser.add_argument('--session', action='store_true',
+                        help='One session connection per bot instead of one per auth/lobby/room step')
+    parser.add_argument('--db', choices=('memory', 'sqlite'), default='memory',
+                        help='Storage of the in-process server: in-memory stubs or the real models on SQLite')
+    parser.add_argument('--db-path', default=None, help='SQLite file for --db sqlite (default: new temp file)')
+    parser.add_argument('--host', default='127.0.0.1', help='Host of an already running server')
+    parser.add_argument('--port', type=int, default=None,
+                        help='Port of an already running server (omit to start one in-process)')
+    args = parser.parse_args()
+
+    stats, duration = run_load_test(args)
+    print(stats.report(args.bots // 2 * 2, duration))
+
+
+if __name__ == '__main__':
+    main()